@@ -0,0 +1,226 @@
+"""Accuracy versus throughput of classifier configurations on a labeled dataset.
+
+The dataset is JSON lines in the detail-dict format of
+GmailClient.fetch_message_details_batch, plus a "label" of "important" or
+"low_priority". Every combination of model, prompt template, token budget
+and concurrency classifies the whole dataset through llm_classifier.
+Each result reports precision and recall for "important" next to emails/sec
+and latency percentiles. With --min-recall/--min-precision, the fastest
+configuration that meets the bar is picked:
+
+    python -m benchmarks.evaluate --make-dataset data/eval.jsonl --size 500
+    python -m benchmarks.evaluate --dataset data/eval.jsonl --models qwen2.5-coder:14b,llama3.2:3b \\
+        --templates default,compact --concurrency 1,4,8 --min-recall 0.98
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.mailbox import Mailbox
+from benchmarks.run import RESULTS_DIR
+from config import LLM_BACKEND, PROMPT_TOKEN_BUDGET
+from llm_backends import BACKENDS, create_backend
+from llm_classifier import LLMUsage, classify_batch, get_prompt_template
+
+LABELS = ("important", "low_priority")
+_FIELDS = ("id", "from", "subject", "snippet")
+
+
+def load_dataset(path):
+    """Labeled detail dicts from a JSON-lines file."""
+    emails = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            email = json.loads(line)
+            missing = [k for k in _FIELDS + ("label",) if k not in email]
+            if missing:
+                raise ValueError(f"{path}:{lineno}: missing {', '.join(missing)}")
+            if email["label"] not in LABELS:
+                raise ValueError(f"{path}:{lineno}: unknown label '{email['label']}'. Available: {list(LABELS)}")
+            emails.append(email)
+    return emails
+
+
+def mailbox_dataset(size, seed=0):
+    """A synthetic labeled dataset: bulk-mail categories are low priority."""
+    mailbox = Mailbox(size, seed)
+    return [dict(mailbox.message(i), label=mailbox.expected_verdict(i)) for i in range(size)]
+
+
+def write_dataset(emails, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for email in emails:
+            f.write(json.dumps(email) + "\n")
+
+
+def score(labels, verdicts):
+    """Confusion counts and precision/recall/F1 with "important" as the positive class.
+
+    `labels` and `verdicts` map message ID to verdict; IDs without a verdict
+    count as classified important, the classifier's own fallback.
+    """
+    counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+    for mid, label in labels.items():
+        predicted = verdicts.get(mid, "important") == "important"
+        actual = label == "important"
+        counts[("t" if predicted == actual else "f") + ("p" if predicted else "n")] += 1
+    tp, fp, fn = counts["tp"], counts["fp"], counts["fn"]
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    if precision is not None and recall is not None:
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    else:
+        f1 = None
+    return {
+        **counts,
+        "precision": round(precision, 4) if precision is not None else None,
+        "recall": round(recall, 4) if recall is not None else None,
+        "f1": round(f1, 4) if f1 is not None else None,
+        "accuracy": round((tp + counts["tn"]) / len(labels), 4) if labels else None,
+    }
+
+
+def evaluate(
+    emails, backend="ollama", url=None, model=None, template=None, token_budget=None, concurrency=1, warmup=True
+):
+    """Classify `emails` with one configuration; returns its accuracy and speed."""
+    llm = create_backend(backend, url=url, model=model, concurrency=concurrency)
+    if warmup:
+        # Loads the model and opens the connections before the clock starts
+        classify_batch(emails[:concurrency], max_workers=concurrency, backend=llm, template=template,
+                       token_budget=token_budget)
+    usage = LLMUsage()
+    started = time.perf_counter()
+    verdicts = classify_batch(
+        emails, max_workers=concurrency, usage=usage, backend=llm, template=template, token_budget=token_budget
+    )
+    seconds = time.perf_counter() - started
+    cost = usage.cost_summary()
+    return {
+        "config": {
+            "backend": backend,
+            "model": llm.model,
+            "template": template,
+            "token_budget": token_budget,
+            "concurrency": concurrency,
+        },
+        "emails": len(emails),
+        "seconds": round(seconds, 3),
+        "emails_per_second": round(len(emails) / seconds, 1) if seconds else None,
+        "latency_ms": cost["latency_ms"].get("wall", {"count": 0}),
+        "errors": cost["errors"],
+        "prompt_tokens": cost["prompt_tokens"],
+        **score({e["id"]: e["label"] for e in emails}, verdicts),
+    }
+
+
+def pick(results, min_precision=None, min_recall=None):
+    """The fastest result meeting both bars, or None."""
+    passing = [
+        r for r in results
+        if (min_precision is None or (r["precision"] or 0) >= min_precision)
+        and (min_recall is None or (r["recall"] or 0) >= min_recall)
+    ]
+    return max(passing, key=lambda r: r["emails_per_second"] or 0, default=None)
+
+
+def _list(text, cast=str):
+    return [cast(v.strip()) for v in text.split(",") if v.strip()]
+
+
+def _print_result(r, chosen=False):
+    c, lat = r["config"], r["latency_ms"]
+    print(
+        f"{'*' if chosen else ' '} {c['model']:<24} {c['template']:<10} {c['token_budget']:>6} {c['concurrency']:>4} "
+        f"{r['precision']!s:>9} {r['recall']!s:>7} {r['emails_per_second']!s:>9} "
+        f"{lat.get('p50', '-')!s:>8} {lat.get('p95', '-')!s:>8} {r['errors']:>6}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy vs. throughput of classifier configurations")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--dataset", help="labeled JSON-lines dataset")
+    source.add_argument("--mailbox", type=int, metavar="SIZE", help="use a synthetic labeled mailbox of SIZE")
+    parser.add_argument("--make-dataset", metavar="PATH", help="write a synthetic labeled dataset and exit")
+    parser.add_argument("--size", type=int, default=500, help="size for --make-dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default=LLM_BACKEND, choices=sorted(BACKENDS))
+    parser.add_argument("--llm-url", help="inference server URL (default: the backend's)")
+    parser.add_argument("--models", help="comma-separated models (default: the backend's)")
+    parser.add_argument("--templates", default="default", help="comma-separated prompt templates")
+    parser.add_argument("--token-budgets", default=str(PROMPT_TOKEN_BUDGET), help="comma-separated; 0 = no trimming")
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated concurrent request counts")
+    parser.add_argument("--no-warmup", action="store_true", help="time each configuration from a cold start")
+    parser.add_argument("--min-precision", type=float)
+    parser.add_argument("--min-recall", type=float)
+    parser.add_argument("--out", help="results file (default: benchmarks/results/eval-<time>.json)")
+    args = parser.parse_args(argv)
+
+    if args.make_dataset:
+        write_dataset(mailbox_dataset(args.size, args.seed), args.make_dataset)
+        print(f"Wrote {args.size} labeled emails to {args.make_dataset}")
+        return 0
+
+    try:
+        templates = _list(args.templates)
+        for name in templates:
+            get_prompt_template(name)
+        emails = load_dataset(args.dataset) if args.dataset else mailbox_dataset(args.mailbox or 200, args.seed)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    grid = itertools.product(
+        _list(args.models) if args.models else [None], templates,
+        _list(args.token_budgets, int), _list(args.concurrency, int),
+    )
+    important = sum(e["label"] == "important" for e in emails)
+    print(f"{len(emails)} emails, {important} important")
+    print(f"  {'model':<24} {'template':<10} {'budget':>6} {'conc':>4} {'precision':>9} {'recall':>7} "
+          f"{'emails/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    results = []
+    for model, template, budget, concurrency in grid:
+        results.append(evaluate(
+            emails, args.backend, url=args.llm_url, model=model, template=template, token_budget=budget,
+            concurrency=concurrency, warmup=not args.no_warmup,
+        ))
+        _print_result(results[-1])
+
+    bar = args.min_precision is not None or args.min_recall is not None
+    chosen = pick(results, args.min_precision, args.min_recall) if bar else None
+    if chosen is not None:
+        print("\nFastest configuration meeting the bar:")
+        _print_result(chosen, chosen=True)
+    elif bar:
+        print("\nNo configuration meets the bar")
+
+    out = args.out or os.path.join(RESULTS_DIR, "eval-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(
+            {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "dataset": args.dataset or f"mailbox:{len(emails)}:{args.seed}",
+                "emails": len(emails),
+                "important": important,
+                "bar": {"min_precision": args.min_precision, "min_recall": args.min_recall},
+                "chosen": results.index(chosen) if chosen is not None else None,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to {out}")
+    return 1 if bar and chosen is None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
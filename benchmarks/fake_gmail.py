@@ -0,0 +1,161 @@
+"""In-process stand-in for the Gmail API service, backed by a synthetic Mailbox.
+
+Implements the slice of the googleapiclient resource interface GmailClient
+uses: users().messages().list/get/modify, users().labels().list/create,
+users().getProfile and new_batch_http_request(). Every HTTP round trip
+(a single request or a whole batch) sleeps for a sampled latency and is
+counted, so benchmarks see realistic API call counts and overlap.
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+from benchmarks.fake_ollama import LatencyModel
+
+# Gmail rejects batches larger than this
+MAX_BATCH = 100
+
+
+class FakeGmailError(Exception):
+    pass
+
+
+class _Request:
+    def __init__(self, service, method, fn):
+        self.service = service
+        self.method = method
+        self.fn = fn
+
+    def execute(self, http=None, num_retries=0):
+        self.service._round_trip(self.method, 1)
+        return self.fn()
+
+
+class _Batch:
+    def __init__(self, service):
+        self.service = service
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request, callback, request_id))
+
+    def execute(self, http=None):
+        if len(self._requests) > MAX_BATCH:
+            raise FakeGmailError(f"Batch of {len(self._requests)} exceeds {MAX_BATCH} requests")
+        method = self._requests[0][0].method if self._requests else "batch"
+        self.service._round_trip(method, len(self._requests), batch=True)
+        for request, callback, request_id in self._requests:
+            try:
+                response, error = request.fn(), None
+            except Exception as e:
+                response, error = None, e
+            if callback is not None:
+                callback(request_id, response, error)
+
+
+class _Resource:
+    def __init__(self, service):
+        self.service = service
+
+
+class _Messages(_Resource):
+    def list(self, userId="me", q=None, pageToken=None, maxResults=100, **kwargs):
+        def fn():
+            start = int(pageToken or 0)
+            end = min(start + min(maxResults, 500), self.service.mailbox.size)
+            resp = {
+                "messages": [{"id": self.service.mailbox.message_id(i)} for i in range(start, end)],
+                "resultSizeEstimate": self.service.mailbox.size,
+            }
+            if end < self.service.mailbox.size:
+                resp["nextPageToken"] = str(end)
+            return resp
+
+        return _Request(self.service, "messages.list", fn)
+
+    def get(self, userId="me", id=None, format="full", metadataHeaders=None, **kwargs):
+        def fn():
+            msg = self.service.mailbox.message(self.service.mailbox.index_of(id))
+            headers = [
+                {"name": "From", "value": msg["from"]},
+                {"name": "Subject", "value": msg["subject"]},
+                {"name": "Date", "value": msg["date"]},
+            ]
+            return {"id": id, "snippet": msg["snippet"], "payload": {"headers": headers}}
+
+        return _Request(self.service, "messages.get", fn)
+
+    def modify(self, userId="me", id=None, body=None, **kwargs):
+        def fn():
+            self.service.mailbox.message(self.service.mailbox.index_of(id))  # 404 for unknown IDs
+            with self.service._lock:
+                for label_id in (body or {}).get("addLabelIds", []):
+                    self.service.labeled[label_id] += 1
+            return {"id": id}
+
+        return _Request(self.service, "messages.modify", fn)
+
+
+class _Labels(_Resource):
+    def list(self, userId="me"):
+        def fn():
+            with self.service._lock:
+                return {"labels": [{"id": lid, "name": name} for name, lid in self.service.labels.items()]}
+
+        return _Request(self.service, "labels.list", fn)
+
+    def create(self, userId="me", body=None):
+        def fn():
+            with self.service._lock:
+                label_id = self.service.labels.setdefault(body["name"], f"Label_{len(self.service.labels) + 1}")
+            return {"id": label_id, "name": body["name"]}
+
+        return _Request(self.service, "labels.create", fn)
+
+
+class _Users(_Resource):
+    def messages(self):
+        return _Messages(self.service)
+
+    def labels(self):
+        return _Labels(self.service)
+
+    def getProfile(self, userId="me"):
+        return _Request(self.service, "profile", lambda: {"emailAddress": "bench@example.com"})
+
+
+class FakeGmailService:
+    """A googleapiclient-shaped Gmail service over `mailbox`, with per-round-trip latency."""
+
+    def __init__(self, mailbox, latency="fixed:0", seed=0):
+        self.mailbox = mailbox
+        self.latency = latency if isinstance(latency, LatencyModel) else LatencyModel(latency)
+        self.labels = {}
+        self.labeled = Counter()   # label ID -> messages labeled
+        self.calls = Counter()     # method -> HTTP round trips
+        self.requests = Counter()  # method -> API requests, counting each batch entry
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def users(self):
+        return _Users(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self)
+
+    def _round_trip(self, method, requests, batch=False):
+        with self._lock:
+            self.calls["batch" if batch else method] += 1
+            self.requests[method] += requests
+            delay = self.latency.sample(self._rng)
+        if delay:
+            time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "http_calls": dict(self.calls),
+                "api_requests": dict(self.requests),
+                "labeled": sum(self.labeled.values()),
+            }
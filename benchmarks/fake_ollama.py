@@ -0,0 +1,332 @@
+"""Local stand-in for an Ollama server, for offline benchmarks and tests.
+
+Serves /api/tags, /api/chat (streaming and non-streaming), /api/embed and
+/api/embeddings, plus the OpenAI-compatible /v1/models and
+/v1/chat/completions, with configurable latency, parallel slots, error rate
+and deterministic verdicts.
+
+    python -m benchmarks.fake_ollama --port 11434 --latency lognormal:0.4,0.3 --slots 2
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import OLLAMA_MODEL
+
+UNIMPORTANT_PATTERN = re.compile(
+    r"newsletter|unsubscribe|% off|\bsale\b|\bdeal|promo|discount|digest|"
+    r"webinar|no-?reply@.*(shop|store|marketing)|social|followers",
+    re.IGNORECASE,
+)
+
+
+def keyword_verdict(text):
+    """Deterministic verdict: marketing-looking text is UNIMPORTANT."""
+    email_data = text.split("<email_data>")[-1]
+    return "UNIMPORTANT" if UNIMPORTANT_PATTERN.search(email_data) else "IMPORTANT"
+
+
+class LatencyModel:
+    """Samples inference latency in seconds from a named distribution.
+
+    Specs: "fixed:S", "uniform:LO,HI", "normal:MEAN,SD" or
+    "lognormal:MEDIAN,SIGMA".
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec="fixed:0"):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}'. Available: {self.KINDS}")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p] or [0.0]
+        self.spec = spec
+
+    def sample(self, rng):
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = rng.gauss(p[0], p[1])
+        else:
+            value = rng.lognormvariate(math.log(p[0]), p[1])
+        return max(value, 0.0)
+
+
+class FakeOllamaServer:
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        model=OLLAMA_MODEL,
+        latency="fixed:0",
+        slots=1,
+        error_rate=0.0,
+        seed=0,
+        verdict_fn=keyword_verdict,
+        embedding_dim=16,
+    ):
+        self.model = model
+        self.latency = latency if isinstance(latency, LatencyModel) else LatencyModel(latency)
+        self.slots = slots
+        self.error_rate = error_rate
+        self.verdict_fn = verdict_fn
+        self.embedding_dim = embedding_dim
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(slots)
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "waiting": 0,
+            "max_waiting": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Simulation ---
+
+    def _draw(self):
+        with self._rng_lock:
+            return self.latency.sample(self._rng), self._rng.random() < self.error_rate
+
+    def _bump(self, key, delta):
+        with self._stats_lock:
+            self.stats[key] += delta
+            peak = "max_" + key
+            if peak in self.stats:
+                self.stats[peak] = max(self.stats[peak], self.stats[key])
+
+    def infer(self, prompt):
+        """Occupy a slot for one sampled latency; return (verdict, timings) or None on error."""
+        latency, fail = self._draw()
+        self._bump("requests", 1)
+        queued_at = time.perf_counter()
+        self._bump("waiting", 1)
+        with self._slots:
+            self._bump("waiting", -1)
+            self._bump("in_flight", 1)
+            try:
+                time.sleep(latency)
+            finally:
+                self._bump("in_flight", -1)
+        if fail:
+            self._bump("errors", 1)
+            return None
+        total_ns = int((time.perf_counter() - queued_at) * 1e9)
+        latency_ns = int(latency * 1e9)
+        prompt_tokens = max(len(prompt) // 4, 1)
+        timings = {
+            "total_duration": total_ns,
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(latency_ns * 0.8),
+            "eval_count": 2,
+            "eval_duration": latency_ns - int(latency_ns * 0.8),
+        }
+        return self.verdict_fn(prompt), timings
+
+    def embed(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        while len(digest) < self.embedding_dim:
+            digest += hashlib.sha256(digest).digest()
+        vector = [b / 127.5 - 1.0 for b in digest[: self.embedding_dim]]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(_FakeOllamaHandler):
+            fake = server
+
+        return Handler
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK (~40 ms) on every keep-alive request.
+    disable_nagle_algorithm = True
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.fake.model, "model": self.fake.model}]})
+        elif self.path == "/v1/models":
+            self._send_json({"object": "list", "data": [{"id": self.fake.model, "object": "model"}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        if self.path == "/api/chat":
+            self._chat(body)
+        elif self.path == "/v1/chat/completions":
+            self._openai_chat(body)
+        elif self.path == "/api/embed":
+            inputs = body.get("input", "")
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({
+                "model": body.get("model", self.fake.model),
+                "embeddings": [self.fake.embed(text) for text in inputs],
+            })
+        elif self.path == "/api/embeddings":
+            self._send_json({"embedding": self.fake.embed(body.get("prompt", ""))})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _chat(self, body):
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        result = self.fake.infer(prompt)
+        if result is None:
+            self._send_json({"error": "simulated inference failure"}, status=500)
+            return
+        verdict, timings = result
+        model = body.get("model", self.fake.model)
+
+        if not body.get("stream", True):
+            self._send_json({
+                "model": model,
+                "message": {"role": "assistant", "content": verdict},
+                "done": True,
+                "done_reason": "stop",
+                **timings,
+            })
+            return
+
+        # Ollama streams newline-delimited JSON; one chunk per token here.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in (verdict[: len(verdict) // 2], verdict[len(verdict) // 2 :]):
+            self._write_chunk({
+                "model": model,
+                "message": {"role": "assistant", "content": token},
+                "done": False,
+            })
+        self._write_chunk({
+            "model": model,
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            **timings,
+        })
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _openai_chat(self, body):
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        result = self.fake.infer(prompt)
+        if result is None:
+            self._send_json({"error": {"message": "simulated inference failure"}}, status=500)
+            return
+        verdict, timings = result
+        self._send_json({
+            "object": "chat.completion",
+            "model": body.get("model", self.fake.model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": verdict},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": timings["prompt_eval_count"],
+                "completion_tokens": timings["eval_count"],
+                "total_tokens": timings["prompt_eval_count"] + timings["eval_count"],
+            },
+        })
+
+    def _write_chunk(self, obj):
+        data = json.dumps(obj).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, obj, status=200):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default=OLLAMA_MODEL)
+    parser.add_argument(
+        "--latency", default="lognormal:0.3,0.4",
+        help="fixed:S, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA (seconds)",
+    )
+    parser.add_argument("--slots", type=int, default=1, help="requests served in parallel")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FakeOllamaServer(
+        host=args.host,
+        port=args.port,
+        model=args.model,
+        latency=args.latency,
+        slots=args.slots,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    print(f"Fake Ollama listening on {server.url} (latency {args.latency}, {args.slots} slots)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
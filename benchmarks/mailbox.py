@@ -0,0 +1,174 @@
+"""Synthetic mailboxes with realistic sender and subject distributions.
+
+Messages are derived from their index and the seed alone, so a mailbox of a
+million messages costs nothing until a message is asked for, and the same
+seed always yields the same mailbox. Senders follow a Zipf-like
+distribution within each category: a handful of shops and contacts account
+for most of the mail, as in a real inbox.
+
+    python -m benchmarks.mailbox --size 5 --seed 1
+"""
+import argparse
+import bisect
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+
+# category: (share of the mailbox, sender pool, subject templates, snippet templates)
+CATEGORIES = {
+    "personal": (
+        0.15,
+        ["{first} {last} <{first_l}.{last_l}@gmail.com>", "{first} <{first_l}@outlook.com>"],
+        ["Re: {topic}", "{topic}?", "Dinner on {day}", "Photos from {day}", "Quick question"],
+        ["Hey, are we still on for {day}? Let me know.", "Thanks for sending this over, I'll take a look."],
+    ),
+    "work": (
+        0.12,
+        ["{first} {last} <{first_l}.{last_l}@{company}.com>"],
+        ["Re: {topic} review", "Meeting: {topic} sync", "Action needed: {topic}", "Notes from {day}"],
+        ["Can you review the {topic} doc before {day}?", "Attaching the updated plan for {topic}."],
+    ),
+    "finance": (
+        0.06,
+        ["{bank} <alerts@{bank_l}.com>", "Billing <billing@{utility_l}.com>"],
+        ["Your statement is ready", "Payment received", "Invoice #{number}", "Your bill is due {day}"],
+        ["Your {month} statement for account ending {number} is available.", "Amount due: ${amount}."],
+    ),
+    "notifications": (
+        0.07,
+        ["{courier} <tracking@{courier_l}.com>", "Security <security@{service_l}.com>"],
+        ["Your package is out for delivery", "New sign-in on {device}", "Appointment reminder: {day}"],
+        ["Tracking number {number} will arrive {day}.", "We noticed a new sign-in from {device}."],
+    ),
+    "marketing": (
+        0.38,
+        ["{shop} <no-reply@{shop_l}-shop.com>", "{shop} Deals <deals@{shop_l}.com>"],
+        ["{amount}% off everything this weekend", "Flash sale: {product} deals inside",
+         "Last chance for your discount", "New arrivals you'll love"],
+        ["Use code SAVE{amount} for an extra discount. Unsubscribe here.", "Our biggest sale of the season."],
+    ),
+    "newsletters": (
+        0.14,
+        ["{publication} <newsletter@{publication_l}.com>", "{publication} Weekly <digest@{publication_l}.com>"],
+        ["{publication} weekly digest", "This week in {topic}", "Your {month} newsletter"],
+        ["Top stories this week on {topic}. Unsubscribe anytime.", "Webinar: the future of {topic}."],
+    ),
+    "social": (
+        0.08,
+        ["{network} <notification@{network_l}.com>"],
+        ["{first} mentioned you", "You have {amount} new followers", "{first} sent you a message"],
+        ["See what {first} and others shared on {network}.", "You have new social activity."],
+    ),
+}
+
+_WORDS = {
+    "first": ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy", "Mallory",
+              "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent", "Victor", "Walter", "Yara"],
+    "last": ["Smith", "Jones", "Garcia", "Chen", "Khan", "Muller", "Rossi", "Silva", "Novak", "Tanaka"],
+    "company": ["acme", "globex", "initech", "umbrella", "hooli"],
+    "bank": ["First Bank", "Credit Union", "Card Services"],
+    "utility": ["power", "water", "telecom"],
+    "courier": ["UPS", "FedEx", "DHL", "Post"],
+    "service": ["accounts", "cloud", "bank"],
+    "shop": ["MegaMart", "StyleHub", "GadgetZone", "HomeGoods", "ShoeBarn", "BookNook", "PetPlace",
+             "TravelCo", "FoodBox", "BeautyBar", "SportsPro", "KidsWorld"],
+    "publication": ["Tech Times", "Daily Brief", "Dev Weekly", "Market Watch", "Science Today"],
+    "network": ["LinkedIn", "Facebook", "Twitter", "Instagram"],
+    "topic": ["budget", "launch", "roadmap", "hiring", "Q3 plan", "migration", "the offsite", "AI"],
+    "day": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "the weekend"],
+    "month": ["January", "March", "June", "September", "November"],
+    "device": ["Windows", "iPhone", "Android", "Mac"],
+    "product": ["laptop", "sneaker", "kitchen", "toy", "garden"],
+}
+
+_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@lru_cache(maxsize=None)
+def _zipf_cdf(n, s=1.1):
+    cdf, total = [], 0.0
+    for rank in range(1, n + 1):
+        total += 1 / rank ** s
+        cdf.append(total)
+    return cdf
+
+
+def _zipf_pick(rng, items):
+    # Inverse CDF over rank weights 1/rank^1.1
+    cdf = _zipf_cdf(len(items))
+    return items[min(bisect.bisect_left(cdf, rng.random() * cdf[-1]), len(items) - 1)]
+
+
+class Mailbox:
+    """`size` deterministic messages in the detail-dict format of GmailClient.fetch_message_details_batch."""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seed = seed
+        self._categories = list(CATEGORIES)
+        self._cum_shares = []
+        total = 0.0
+        for name in self._categories:
+            total += CATEGORIES[name][0]
+            self._cum_shares.append(total)
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def message_id(index):
+        return f"{index:016x}"
+
+    @staticmethod
+    def index_of(message_id):
+        return int(message_id, 16)
+
+    def ids(self):
+        return (self.message_id(i) for i in range(self.size))
+
+    def category(self, index):
+        x = random.Random(self.seed * 1_000_003 + index).random() * self._cum_shares[-1]
+        return self._categories[min(bisect.bisect_left(self._cum_shares, x), len(self._categories) - 1)]
+
+    def message(self, index):
+        if not 0 <= index < self.size:
+            raise KeyError(self.message_id(index))
+        category = self.category(index)
+        _, senders, subjects, snippets = CATEGORIES[category]
+        rng = random.Random((self.seed * 1_000_003 + index) * 7 + 1)
+        words = {key: _zipf_pick(rng, values) for key, values in _WORDS.items()}
+        for key in list(words):
+            words[key + "_l"] = words[key].lower().replace(" ", "")
+        words["number"] = rng.randint(1000, 9999)
+        words["amount"] = rng.choice([10, 15, 20, 25, 30, 40, 50, 70])
+        # Newest first, as the Gmail API lists them; about 40 messages a day
+        date = _EPOCH - timedelta(minutes=index * 36 + rng.randint(0, 35))
+        return {
+            "id": self.message_id(index),
+            "from": _zipf_pick(rng, senders).format(**words),
+            "subject": rng.choice(subjects).format(**words),
+            "date": format_datetime(date),
+            "snippet": rng.choice(snippets).format(**words),
+        }
+
+    def __iter__(self):
+        return (self.message(i) for i in range(self.size))
+
+    def expected_verdict(self, index):
+        """The category's ground truth: bulk mail is low priority."""
+        return "low_priority" if self.category(index) in ("marketing", "newsletters", "social") else "important"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print messages from a synthetic mailbox as JSON lines")
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    for message in Mailbox(args.size, args.seed):
+        print(json.dumps(message))
+
+
+if __name__ == "__main__":
+    main()
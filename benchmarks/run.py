@@ -0,0 +1,265 @@
+"""End-to-end engine benchmark against local Gmail and Ollama stand-ins.
+
+Runs ClassifierEngine over synthetic mailboxes (benchmarks/mailbox.py) served
+by FakeGmailService and FakeOllamaServer. Reports emails/sec, per-stage busy
+time, peak RSS, checkpoint bytes written and API call counts. Each size runs
+in a fresh process so peak RSS is its own. Results are saved as JSON for
+before/after comparisons:
+
+    python -m benchmarks.run --sizes 1k,10k,100k --llm-latency fixed:0.002 --slots 8
+    python -m benchmarks.run --compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import classifier_engine
+import llm_classifier
+import metrics
+from benchmarks.fake_gmail import FakeGmailService
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.mailbox import Mailbox
+from details_store import peak_rss_mb
+from engine_stats import STAGES
+from gmail_client import API_SECONDS
+from llm_backends import create_backend
+from pipeline import STAGE_ITEMS, STAGE_SECONDS
+from replay import isolated_output
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def parse_size(text):
+    """"1000", "10k" or "1m" -> int."""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def _thread_write_bytes():
+    """Bytes the calling thread has passed to write() so far (Linux only, else None)."""
+    try:
+        with open("/proc/thread-self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+@contextmanager
+def count_checkpoint_bytes(state_cls):
+    """Yields a dict whose "bytes" grows by what each state_cls.save() writes."""
+    total = {"bytes": 0 if _thread_write_bytes() is not None else None}
+    lock = threading.Lock()
+    original = state_cls.save
+
+    def save(self):
+        before = _thread_write_bytes()
+        try:
+            return original(self)
+        finally:
+            if before is not None:
+                with lock:
+                    total["bytes"] += _thread_write_bytes() - before
+
+    state_cls.save = save
+    try:
+        yield total
+    finally:
+        state_cls.save = original
+
+
+def run_benchmark(
+    size,
+    workdir,
+    seed=0,
+    llm_latency="fixed:0",
+    slots=4,
+    gmail_latency="fixed:0",
+    state_backend=None,
+    fetch_workers=None,
+    classify_workers=None,
+    label_workers=None,
+    llm_workers=None,
+):
+    """One full engine run over a `size`-message mailbox; returns the measurements."""
+    service = FakeGmailService(Mailbox(size, seed), latency=gmail_latency, seed=seed)
+    metrics.REGISTRY.reset()
+    previous_backend = llm_classifier._backend
+
+    with FakeOllamaServer(latency=llm_latency, slots=slots, seed=seed) as server, isolated_output(workdir):
+        llm_classifier.set_backend(create_backend("ollama", url=server.url, concurrency=slots))
+        engine = classifier_engine.ClassifierEngine(
+            service,
+            fetch_workers=fetch_workers,
+            classify_workers=classify_workers,
+            label_workers=label_workers,
+            llm_workers=llm_workers,
+            state_backend=state_backend,
+        )
+        try:
+            with count_checkpoint_bytes(engine._state_cls) as checkpoint:
+                started = time.perf_counter()
+                engine.start()
+                engine.join()
+                seconds = time.perf_counter() - started
+        finally:
+            llm_classifier._backend = previous_backend
+        llm_requests = server.stats["requests"]
+
+    summary = engine.last_summary or {}
+    stages = {"list": {"busy_seconds": API_SECONDS.value(method="messages.list")["sum"], "items": size}}
+    for stage in STAGES[1:]:
+        stages[stage] = {
+            "busy_seconds": STAGE_SECONDS.value(stage=stage)["sum"],
+            "batches": STAGE_ITEMS.value(stage=stage),
+        }
+    return {
+        "size": size,
+        "status": engine.status,
+        "seconds": round(seconds, 3),
+        "emails_per_second": round(size / seconds, 1) if seconds else None,
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+        "checkpoint_write_bytes": checkpoint["bytes"],
+        "gmail": service.stats(),
+        "llm_requests": llm_requests,
+        "llm_latency_ms": summary.get("llm_cost", {}).get("latency_ms", {}).get("wall"),
+        "verdicts": {k: summary.get(k) for k in ("important", "low_priority")},
+    }
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(RESULTS_DIR),
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+_RUN_OPTIONS = (
+    "seed", "llm_latency", "slots", "gmail_latency", "state_backend",
+    "fetch_workers", "classify_workers", "label_workers", "llm_workers",
+)
+
+
+def _run_in_child(size, args):
+    argv = [sys.executable, "-m", "benchmarks.run", "--one", str(size)]
+    for name in _RUN_OPTIONS:
+        value = getattr(args, name)
+        if value is not None:
+            argv += ["--" + name.replace("_", "-"), str(value)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(argv, capture_output=True, text=True, cwd=root)
+    if out.returncode != 0:
+        raise RuntimeError(f"Benchmark of {size} messages failed:\n{out.stderr}")
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def compare(before, after):
+    """Rows of (size, metric, before, after, after/before) for sizes present in both results."""
+    old = {r["size"]: r for r in before["results"]}
+    rows = []
+    for new in after["results"]:
+        prev = old.get(new["size"])
+        if prev is None:
+            continue
+        for key in ("emails_per_second", "seconds", "peak_rss_mb", "checkpoint_write_bytes"):
+            a, b = prev.get(key), new.get(key)
+            rows.append((new["size"], key, a, b, round(b / a, 3) if a and b is not None else None))
+        a, b = sum(prev["gmail"]["http_calls"].values()), sum(new["gmail"]["http_calls"].values())
+        rows.append((new["size"], "gmail_http_calls", a, b, round(b / a, 3) if a else None))
+    return rows
+
+
+def _print_header():
+    print(f"{'size':>9} {'emails/s':>10} {'seconds':>9} {'rss MB':>8} {'ckpt KB':>9} {'gmail calls':>12} {'llm reqs':>9}")
+
+
+def _print_result(r):
+    ckpt = r["checkpoint_write_bytes"]
+    print(
+        f"{r['size']:>9} {r['emails_per_second']:>10} {r['seconds']:>9} {r['peak_rss_mb']:>8} "
+        f"{ckpt // 1024 if ckpt is not None else '-':>9} {sum(r['gmail']['http_calls'].values()):>12} "
+        f"{r['llm_requests']:>9}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end ClassifierEngine benchmark")
+    parser.add_argument("--sizes", default="1k,10k", help="comma-separated mailbox sizes, e.g. 1k,100k,1m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", default="fixed:0.001", help="fake Ollama latency spec")
+    parser.add_argument("--slots", type=int, default=4, help="fake Ollama parallel slots")
+    parser.add_argument("--gmail-latency", default="fixed:0.002", help="latency per Gmail HTTP round trip")
+    parser.add_argument("--state-backend")
+    parser.add_argument("--fetch-workers", type=int)
+    parser.add_argument("--classify-workers", type=int)
+    parser.add_argument("--label-workers", type=int)
+    parser.add_argument("--llm-workers", type=int)
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--in-process", action="store_true", help="run every size in this process")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two results files")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)  # child mode: one size, JSON on stdout
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        print(f"{'size':>9} {'metric':<24} {'before':>12} {'after':>12} {'ratio':>7}")
+        for size, key, a, b, ratio in compare(before, after):
+            print(f"{size:>9} {key:<24} {a!s:>12} {b!s:>12} {ratio!s:>7}")
+        return 0
+
+    options = {name: getattr(args, name) for name in _RUN_OPTIONS}
+    if args.one is not None:
+        with tempfile.TemporaryDirectory() as workdir:
+            print(json.dumps(run_benchmark(args.one, workdir, **options)))
+        return 0
+
+    results = []
+    _print_header()
+    for size in (parse_size(s) for s in args.sizes.split(",")):
+        if args.in_process:
+            with tempfile.TemporaryDirectory() as workdir:
+                results.append(run_benchmark(size, workdir, **options))
+        else:
+            results.append(_run_in_child(size, args))
+        _print_result(results[-1])
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(
+            {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "options": options,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,70 @@
-import html
-import json
 import logging
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 
+import metrics
 from config import (
     DEFAULT_QUERY,
     LABEL_IMPORTANT,
     LABEL_LOW_PRIORITY,
+    CLASSIFY_WORKERS,
+    FETCH_WORKERS,
+    LABEL_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    PROFILE_MEMORY,
+    PROFILE_MODE,
+    PROMPT_TEMPLATE,
+    PROMPT_TOKEN_BUDGET,
     REPORT_FILE,
     RUN_HISTORY_FILE,
+    TRACE_ENABLED,
+    TRACE_FILE,
     BATCH_SIZE,
 )
+from details_store import DetailsStore, peak_rss_mb
+from engine_stats import EngineStats
 from gmail_client import GmailClient
-from llm_classifier import classify_batch
-from state import RunState
+from llm_classifier import LLMUsage, classify_batch, get_backend
+from msg_trace import MessageTrace
+from pipeline import Pipeline, Stage
+from profiling import RunProfiler
+from report import ReportWriter
+from run_history import RunHistory
+from state import CheckpointWriter, get_state_class
 
 log = logging.getLogger(__name__)
 
+RUNS = metrics.counter("engine_runs_total", "Finished engine runs", ("status",))
+LAST_RUN_EMAILS = metrics.gauge("engine_last_run_emails", "Emails processed by the last run")
+LAST_RUN_SECONDS = metrics.gauge("engine_last_run_seconds", "Duration of the last run")
+LAST_RUN_RATE = metrics.gauge("engine_last_run_emails_per_second", "Classification throughput of the last run")
+LAST_RUN_TIME = metrics.gauge("engine_last_run_timestamp_seconds", "Unix time the last run finished")
+
+
+def _chunked(iterable, size):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
 
 class ClassifierEngine:
-    def __init__(self, service, progress_cb=None, log_cb=None, query=None):
+    def __init__(
+        self,
+        service,
+        progress_cb=None,
+        log_cb=None,
+        query=None,
+        fetch_workers=None,
+        classify_workers=None,
+        label_workers=None,
+        llm_workers=None,
+        state_backend=None,
+        trace_file=None,
+        profile=None,
+        profile_memory=None,
+    ):
         self.service = service
         self.gmail = GmailClient(service)
         self.query = query or DEFAULT_QUERY
@@ -31,7 +73,28 @@ class ClassifierEngine:
         self._stop_event = threading.Event()
         self._thread = None
         self.state = None
-        self._details_cache = {}
+        self._details_cache = DetailsStore()
+        self.usage = LLMUsage()
+        self.fetch_workers = fetch_workers or FETCH_WORKERS
+        self.classify_workers = classify_workers or CLASSIFY_WORKERS
+        self.label_workers = label_workers or LABEL_WORKERS
+        self.llm_workers = llm_workers  # None: the backend's own concurrency
+        self.pipeline = None
+        self._progress_lock = threading.Lock()
+        self._state_cls = get_state_class(state_backend)
+        self.status = None  # "completed", "stopped", "empty" or "error" once a run ends
+        self.last_summary = None
+        self.stats = EngineStats()
+        self._done = 0
+        self._total = 0
+        self._resumed = 0
+        # Per-message trace (msg_trace.py); None disables it
+        self.trace_file = trace_file or (TRACE_FILE if TRACE_ENABLED else None)
+        self.trace = None
+        # "cprofile" or "sample" (profiling.py), plus optional tracemalloc marks
+        self.profile = profile or PROFILE_MODE
+        self.profile_memory = PROFILE_MEMORY if profile_memory is None else profile_memory
+        self._profiler = None
 
     def start(self, resume=False):
         self._stop_event.clear()
@@ -44,231 +107,252 @@ class ClassifierEngine:
     def is_running(self):
         return self._thread is not None and self._thread.is_alive()
 
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.is_running()
+
+    def snapshot(self):
+        """Live rates, ETA, queue depths, LLM latency and cache stats for the dashboard."""
+        caches = {
+            "checkpoint_resumed": round(self._resumed / self._total, 3) if self._total else None,
+            "llm_connection_reuse": get_backend().connection_stats()["reuse_ratio"],
+            "details_spilled": self._details_cache.spilled,
+        }
+        return self.stats.snapshot(
+            self._done,
+            self._total,
+            usage=self.usage,
+            queues=self.pipeline.queue_depths() if self.pipeline else {},
+            caches=caches,
+        )
+
     def _run(self, resume):
+        self.status = None
+        self.last_summary = None
         try:
+            profiler = RunProfiler(self.profile, self.profile_memory)
+            self._profiler = profiler.start() if profiler else None
             self._pipeline(resume)
         except Exception as e:
+            self.status = "error"
             log.exception("Engine error")
             self.log_cb(f"ERROR: {e}")
+        finally:
+            # Also on errors, so the next run never clears a state that is still
+            # open and the details spill file never outlives its run
+            if self.state is not None:
+                self.state.close()
+            self._details_cache.close()
+            if self.trace is not None:
+                self.trace.close()
+                self.log_cb(f"Trace saved to {self.trace.path}")
+                self.trace = None
+            if self._profiler is not None:
+                self.log_cb(f"Profile saved to {self._profiler.finish()}")
+                self._profiler = None
+        if self.status:
+            RUNS.inc(status=self.status)
 
     def _pipeline(self, resume):
         self._start_time = time.time()
+        self.usage = LLMUsage()
+        self._details_cache = DetailsStore()
+        self.stats = EngineStats()
 
         # Load or create state
         if resume:
-            self.state = RunState.load()
+            self.state = self._state_cls.load()
             if not self.state:
                 self.log_cb("No checkpoint found. Starting fresh.")
-                self.state = RunState()
+                self.state = self._state_cls()
             else:
                 self.log_cb(
-                    f"Resumed: {len(self.state.processed)}/{len(self.state.all_message_ids)} already done."
+                    f"Resumed: {self.state.processed_count()}/{self.state.total()} already done."
                 )
         else:
-            self.state = RunState()
-            RunState.clear()
+            self._state_cls.clear()
+            self.state = self._state_cls()
 
         # Ensure labels exist
         self.log_cb("Ensuring Gmail labels exist...")
         self.gmail.ensure_labels_exist()
 
         # Fetch IDs if not resuming with existing IDs
-        if not self.state.all_message_ids:
+        if not self.state.has_message_ids():
             self.log_cb(f"Fetching message IDs (query: {self.query})...")
-            self.state.all_message_ids = self.gmail.fetch_message_ids(self.query)
+            self.state.set_message_ids(
+                self.gmail.fetch_message_ids(self.query, on_page=lambda n: self.stats.add("list", n))
+            )
             self.state.save()
-            self.log_cb(f"Found {len(self.state.all_message_ids)} messages.")
+            self.log_cb(f"Found {self.state.total()} messages.")
+
+        self._mark("ids_listed")
+        if self.trace_file:
+            self.trace = MessageTrace(self.trace_file, backend=get_backend().describe())
+            self.trace.listed()
 
-        total = len(self.state.all_message_ids)
+        total = self.state.total()
         if total == 0:
             self.log_cb("No messages found.")
+            self.status = "empty"
             return
 
-        # Classify
-        ids_to_process = [
-            mid for mid in self.state.all_message_ids if mid not in self.state.processed
-        ]
-        self.log_cb(f"Classifying {len(ids_to_process)} remaining messages...")
-
-        # Build list of batch ID chunks
-        batch_chunks = [
-            ids_to_process[i : i + BATCH_SIZE]
-            for i in range(0, len(ids_to_process), BATCH_SIZE)
-        ]
-
-        # Prefetch pipeline: fetch next batch details while classifying current
-        prefetch_executor = ThreadPoolExecutor(max_workers=1)
-        prefetch_future = None
-
-        for batch_idx, batch_ids in enumerate(batch_chunks):
-            if self._stop_event.is_set():
-                self.log_cb("Stopped by user. Checkpoint saved.")
-                self.state.save()
-                prefetch_executor.shutdown(wait=False)
-                self._save_run_summary("stopped")
-                return
-
-            # Get details for current batch (from prefetch or direct fetch)
-            if prefetch_future is not None:
-                details = prefetch_future.result()
-            else:
-                details = self.gmail.fetch_message_details_batch(batch_ids)
-
-            # Cache details for report
-            self._details_cache.update(details)
-
-            # Start prefetching next batch
-            next_idx = batch_idx + 1
-            if next_idx < len(batch_chunks):
-                next_batch_ids = batch_chunks[next_idx]
-                prefetch_future = prefetch_executor.submit(
-                    self.gmail.fetch_message_details_batch, next_batch_ids
-                )
-            else:
-                prefetch_future = None
-
-            # Classify entire batch concurrently
-            classifications = classify_batch(list(details.values()))
-
-            # Update state with results
-            for mid, classification in classifications.items():
-                self.state.processed[mid] = classification
-
-                done = len(self.state.processed)
-                email = details.get(mid, {})
-                self.progress_cb(done, total, classification)
-                self.log_cb(
-                    f"[{done}/{total}] {classification.upper()}: {email.get('subject', '')[:60]}"
-                )
-
-            self.state.save()
+        # Classify and label in overlapping stages: metadata fetchers feed
+        # classifiers, which feed labelers, through bounded queues.
+        self.log_cb(f"Classifying {total - self.state.processed_count()} remaining messages...")
 
-        prefetch_executor.shutdown(wait=False)
+        self._total = total
+        self._done = self._resumed = self.state.processed_count()
+        self._label_ids = {
+            "important": self.gmail.get_label_id(LABEL_IMPORTANT),
+            "low_priority": self.gmail.get_label_id(LABEL_LOW_PRIORITY),
+        }
+        self.pipeline = Pipeline(
+            [
+                Stage("fetch", self._fetch_stage, workers=self.fetch_workers),
+                Stage("classify", self._classify_stage, workers=self.classify_workers),
+                Stage("label", self._label_stage, workers=self.label_workers, skip_on_stop=False),
+            ],
+            stop_event=self._stop_event,
+            queue_size=PIPELINE_QUEUE_SIZE,
+        )
+        self._checkpoint = CheckpointWriter(self.state)
+        try:
+            # The lister: hands out batches of IDs, blocking while fetchers are busy
+            self.pipeline.run(_chunked(self.state.unprocessed_ids(), BATCH_SIZE))
+        finally:
+            # Flush the last consistent snapshot, also when a stage crashed
+            self._checkpoint.close()
+        self._mark("classified")
+
+        if self._stop_event.is_set():
+            self.log_cb("Stopped by user. Checkpoint saved.")
+            self._save_run_summary("stopped")
+            return
 
         self.state.save()
-        self.log_cb("Classification complete. Applying labels...")
+        self.log_cb("Classification complete. Applying remaining labels...")
 
-        # Apply labels
+        # Label anything classified but not yet labeled (e.g. from an older checkpoint)
         self._apply_labels()
+        self._mark("labeled")
 
         # Generate report
         self._generate_report()
+        self._mark("report_written")
 
-        RunState.clear()
         self._save_run_summary("completed")
+        self.state.close()  # before its files are deleted
+        self._state_cls.clear()
         self.log_cb("Done!")
 
+    def _mark(self, phase):
+        # Run phase boundary for the memory profiler
+        if self._profiler is not None:
+            self._profiler.mark(phase)
+
+    def _fetch_stage(self, batch_ids):
+        details = self.gmail.fetch_message_details_batch(batch_ids)
+        self.stats.add("fetch", len(details))
+        if self.trace is not None:
+            self.trace.mark(details, "fetched")
+        # Cache details for report
+        self._details_cache.update(details)
+        return details or None
+
+    def _classify_stage(self, details):
+        classifications = classify_batch(
+            list(details.values()), max_workers=self.llm_workers, usage=self.usage, trace=self.trace
+        )
+
+        with self._progress_lock:
+            for mid, classification in classifications.items():
+                done = self._done = self.state.record_verdicts({mid: classification})
+                email = details.get(mid, {})
+                self.progress_cb(done, self._total, classification)
+                self.log_cb(
+                    f"[{done}/{self._total}] {classification.upper()}: {email.get('subject', '')[:60]}"
+                )
+
+        self.stats.add("classify", len(classifications))
+        self._checkpoint.note(len(classifications))
+        return classifications
+
+    def _label_stage(self, classifications):
+        for cls, label_id in self._label_ids.items():
+            ids = [mid for mid, c in classifications.items() if c == cls]
+            if ids:
+                self.gmail.apply_label_batch(ids, label_id)
+                self.state.mark_labeled(ids)
+                if self.trace is not None:
+                    self.trace.finish(ids)
+                self.stats.add("label", len(ids))
+                self._checkpoint.note(len(ids))
+
     def _save_run_summary(self, status):
-        important = sum(1 for c in self.state.processed.values() if c == "important")
-        low_priority = sum(1 for c in self.state.processed.values() if c == "low_priority")
+        self.status = status
+        counts = self.state.counts()
         entry = {
             "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "query": self.query,
             "status": status,
-            "total": len(self.state.processed),
-            "important": important,
-            "low_priority": low_priority,
+            "total": self.state.processed_count(),
+            # Classified by this run; "total" also counts earlier runs of a resumed mailbox
+            "classified": self._done - self._resumed,
+            "important": counts["important"],
+            "low_priority": counts["low_priority"],
             "duration_seconds": round(time.time() - self._start_time, 1),
+            "prompt_template": PROMPT_TEMPLATE,
+            "prompt_token_budget": PROMPT_TOKEN_BUDGET,
+            "prompt_tokens": self.usage.summary(),
+            "llm_cost": self.usage.cost_summary(),
+            "llm_connections": get_backend().connection_stats(),
+            "memory": {"details": self._details_cache.stats(), "peak_rss_mb": peak_rss_mb()},
         }
-        try:
-            with open(RUN_HISTORY_FILE, "r", encoding="utf-8") as f:
-                history = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            history = []
-        history.append(entry)
-        with open(RUN_HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=2)
+        if self._profiler is not None:
+            entry["profile"] = self._profiler.out_dir
+        self.last_summary = entry
+        LAST_RUN_EMAILS.set(entry["total"])
+        LAST_RUN_SECONDS.set(entry["duration_seconds"])
+        LAST_RUN_RATE.set(
+            round(entry["classified"] / entry["duration_seconds"], 2) if entry["duration_seconds"] else 0
+        )
+        LAST_RUN_TIME.set(round(time.time()))
+        RunHistory(RUN_HISTORY_FILE).append(entry)
         log.info("Run summary saved to %s", RUN_HISTORY_FILE)
 
     def _apply_labels(self):
-        important_ids = [
-            mid
-            for mid, cls in self.state.processed.items()
-            if cls == "important" and mid not in self.state.labeled
-        ]
-        low_ids = [
-            mid
-            for mid, cls in self.state.processed.items()
-            if cls == "low_priority" and mid not in self.state.labeled
-        ]
+        important_ids = self.state.classified_unlabeled("important")
+        low_ids = self.state.classified_unlabeled("low_priority")
 
         if important_ids:
             label_id = self.gmail.get_label_id(LABEL_IMPORTANT)
             self.log_cb(f"Applying '{LABEL_IMPORTANT}' to {len(important_ids)} messages...")
             self.gmail.apply_label_batch(important_ids, label_id)
-            self.state.labeled.update(important_ids)
+            self.state.mark_labeled(important_ids)
 
         if low_ids:
             label_id = self.gmail.get_label_id(LABEL_LOW_PRIORITY)
             self.log_cb(f"Applying '{LABEL_LOW_PRIORITY}' to {len(low_ids)} messages...")
             self.gmail.apply_label_batch(low_ids, label_id)
-            self.state.labeled.update(low_ids)
+            self.state.mark_labeled(low_ids)
 
         self.state.save()
 
     def _generate_report(self):
-        important = {
-            mid: cls for mid, cls in self.state.processed.items() if cls == "important"
-        }
-        low = {
-            mid: cls
-            for mid, cls in self.state.processed.items()
-            if cls == "low_priority"
-        }
+        writer = ReportWriter(REPORT_FILE)
 
-        # Use cached details if available, otherwise fall back to API fetch
+        # Use cached details if available, otherwise fetch them batch by batch
         if self._details_cache:
-            details = self._details_cache
+            for mid, info in self._details_cache.items():
+                writer.add(mid, info, self.state.verdict(mid) or "unknown")
         else:
-            all_ids = list(self.state.processed.keys())
             self.log_cb("Fetching details for report...")
-            details = self.gmail.fetch_message_details_batch(all_ids)
-
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        rows_important = ""
-        rows_low = ""
-
-        for mid, info in details.items():
-            cls = self.state.processed.get(mid, "unknown")
-            row = (
-                f"<tr><td>{html.escape(info.get('date', ''))}</td>"
-                f"<td>{html.escape(info.get('from', ''))}</td>"
-                f"<td>{html.escape(info.get('subject', ''))}</td></tr>\n"
-            )
-            if cls == "important":
-                rows_important += row
-            else:
-                rows_low += row
-
-        report = f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8">
-<title>Gmail Cleanup Report</title>
-<style>
-body {{ font-family: Arial, sans-serif; margin: 2em; }}
-h1 {{ color: #333; }}
-table {{ border-collapse: collapse; width: 100%; margin-bottom: 2em; }}
-th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-th {{ background: #4285f4; color: white; }}
-tr:nth-child(even) {{ background: #f2f2f2; }}
-.summary {{ background: #e8f5e9; padding: 1em; border-radius: 8px; margin-bottom: 2em; }}
-</style></head><body>
-<h1>Gmail Cleanup Report</h1>
-<div class="summary">
-<p><strong>Generated:</strong> {now}</p>
-<p><strong>Total processed:</strong> {len(self.state.processed)}</p>
-<p><strong>Important:</strong> {len(important)}</p>
-<p><strong>Low Priority:</strong> {len(low)}</p>
-</div>
-
-<h2>Important ({len(important)})</h2>
-<table><tr><th>Date</th><th>From</th><th>Subject</th></tr>
-{rows_important}</table>
-
-<h2>Low Priority ({len(low)})</h2>
-<table><tr><th>Date</th><th>From</th><th>Subject</th></tr>
-{rows_low}</table>
-</body></html>"""
-
-        with open(REPORT_FILE, "w", encoding="utf-8") as f:
-            f.write(report)
-        self.log_cb(f"Report saved to {REPORT_FILE}")
+            all_ids = (mid for mid, _ in self.state.iter_verdicts())
+            for batch in _chunked(all_ids, BATCH_SIZE):
+                for mid, info in self.gmail.fetch_message_details_batch(batch).items():
+                    writer.add(mid, info, self.state.verdict(mid) or "unknown")
+
+        files = writer.close(self.state.counts(), self.state.processed_count())
+        self.log_cb(f"Report saved to {', '.join(files)}")
@@ -0,0 +1,276 @@
+"""Headless entry point: python cli.py [options] (or python main.py [options])."""
+
+import argparse
+import json
+import logging
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+import metrics
+from config import (
+    DEFAULT_QUERY,
+    DAEMON_INTERVAL,
+    LLM_BACKEND,
+    LLM_CONCURRENCY,
+    LLM_MODEL,
+    LLM_URL,
+    METRICS_PORT,
+    METRICS_SNAPSHOT_FILE,
+    STATE_BACKEND,
+    TRACE_FILE,
+)
+from classifier_engine import ClassifierEngine
+from llm_backends import BACKENDS, create_backend
+from llm_classifier import set_backend
+from main import setup_logging
+from preflight import Preflight, run_steps
+from profiling import PROFILE_MODES
+from replay import (
+    Archive,
+    Recorder,
+    RecordingBackend,
+    RecordingGmailService,
+    ReplayBackend,
+    ReplayGmailService,
+    isolated_output,
+    run_archive_path,
+)
+from startup import mark, timings
+from state import STATE_BACKENDS
+
+log = logging.getLogger(__name__)
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_UNAVAILABLE = 2
+EXIT_STOPPED = 130
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="gmail-cleanup", description="Classify and label Gmail messages without the GUI."
+    )
+    parser.add_argument("--query", default=DEFAULT_QUERY, help="Gmail search query (default: %(default)s)")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--backend", default=LLM_BACKEND, choices=sorted(BACKENDS))
+    parser.add_argument("--llm-url", default=LLM_URL, help="inference server URL (default: LLM_URL or the backend's)")
+    parser.add_argument("--model", default=LLM_MODEL, help="model name (default: LLM_MODEL or the backend's)")
+    parser.add_argument("--fetch-workers", type=int)
+    parser.add_argument("--classify-workers", type=int)
+    parser.add_argument("--label-workers", type=int)
+    parser.add_argument("--llm-workers", type=int, help="concurrent LLM requests")
+    parser.add_argument("--state-backend", default=STATE_BACKEND, choices=sorted(STATE_BACKENDS))
+    parser.add_argument("--json", action="store_true", help="write progress as JSON lines on stdout")
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="keep running, starting a run every --interval seconds (resumes interrupted runs)",
+    )
+    parser.add_argument("--interval", type=float, default=DAEMON_INTERVAL, help="seconds between daemon runs")
+    parser.add_argument("--max-runs", type=int, help="stop the daemon after this many runs")
+    parser.add_argument(
+        "--trace", nargs="?", const=TRACE_FILE, metavar="FILE",
+        help=f"write a per-message trace (default file: {TRACE_FILE}); summarize it with msg_trace.py",
+    )
+    parser.add_argument(
+        "--profile", choices=PROFILE_MODES,
+        help="profile the run with cProfile or a stack sampler; artifacts go to output/profiles/",
+    )
+    parser.add_argument(
+        "--profile-memory", action="store_true", help="record tracemalloc snapshots between run phases"
+    )
+    traffic = parser.add_mutually_exclusive_group()
+    traffic.add_argument("--record", metavar="FILE", help="record Gmail and LLM traffic to a .gz archive")
+    traffic.add_argument("--replay", metavar="FILE", help="serve Gmail and LLM traffic from a recorded archive")
+    parser.add_argument(
+        "--replay-speed", type=float, default=1.0,
+        help="replay timing: 1 = as recorded, 10 = ten times faster, 0 = no delays",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=METRICS_PORT,
+        help="serve Prometheus metrics on localhost:PORT/metrics (default: off)",
+    )
+    parser.add_argument(
+        "--metrics-file", default=METRICS_SNAPSHOT_FILE,
+        help="rewrite a JSON metrics snapshot to FILE every METRICS_SNAPSHOT_SECONDS (default: off)",
+    )
+    return parser
+
+
+class Reporter:
+    """Writes engine progress either as text or as one JSON object per line."""
+
+    def __init__(self, as_json, stream=None):
+        self.as_json = as_json
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        with self._lock:
+            if self.as_json:
+                line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+            elif event == "log":
+                line = fields["message"]
+            elif event == "progress":
+                # Text mode already gets one log line per message
+                return
+            else:
+                line = f"[{event}] " + " ".join(f"{k}={v}" for k, v in fields.items())
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def progress(self, done, total, classification):
+        self.emit("progress", done=done, total=total, classification=classification)
+
+    def log(self, message):
+        self.emit("log", message=message)
+
+
+def run_once(args, reporter, stop_event, service=None):
+    """One engine run; returns an exit code."""
+    if not args.replay:
+        return _run_engine(args, reporter, stop_event, service)
+    # A replayed run must not clear the real checkpoint or add to the real run history
+    with tempfile.TemporaryDirectory(prefix="gmail-cleanup-replay-") as workdir, isolated_output(workdir):
+        return _run_engine(args, reporter, stop_event, service)
+
+
+def _run_engine(args, reporter, stop_event, service):
+    archive = None
+    try:
+        if args.replay:
+            archive = Archive.load(args.replay)
+            backend = ReplayBackend(archive, speed=args.replay_speed)
+            service = ReplayGmailService(archive, speed=args.replay_speed)
+        else:
+            backend = create_backend(
+                args.backend, url=args.llm_url, model=args.model, concurrency=args.llm_workers or LLM_CONCURRENCY
+            )
+    except (OSError, ValueError) as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_ERROR
+    # LLM health check and Gmail auth run concurrently
+    steps = [step for step in run_steps(backend, service) if step.name != "profile"]
+    preflight = Preflight(steps).start()
+    while not preflight.wait(timeout=0.2) and not preflight.failures():
+        if stop_event.is_set():
+            preflight.cancel()
+            reporter.emit("error", message="Cancelled during startup")
+            return EXIT_STOPPED
+    failures = preflight.failures()
+    if failures:
+        for step, error in failures.items():
+            prefix = "Gmail auth failed: " if step == "gmail" else ""
+            reporter.emit("error", message=prefix + error)
+        return EXIT_UNAVAILABLE
+    service = preflight.results["gmail"]
+    recorder = None
+    if args.record:
+        # Each daemon run gets its own archive instead of overwriting the last one
+        path = run_archive_path(args.record) if args.daemon else args.record
+        try:
+            recorder = Recorder(path, backend)
+        except OSError as e:
+            reporter.emit("error", message=f"Cannot record to {path}: {e}")
+            return EXIT_ERROR
+        backend = RecordingBackend(backend, recorder)
+        service = RecordingGmailService(service, recorder)
+    try:
+        set_backend(backend)
+        mark("gmail_service_ready")
+        reporter.emit("startup", **timings(), preflight=preflight.seconds)
+
+        engine = ClassifierEngine(
+            service=service,
+            progress_cb=reporter.progress,
+            log_cb=reporter.log,
+            query=args.query,
+            fetch_workers=args.fetch_workers,
+            classify_workers=args.classify_workers,
+            label_workers=args.label_workers,
+            llm_workers=args.llm_workers,
+            state_backend=args.state_backend,
+            trace_file=args.trace,
+            profile=args.profile,
+            profile_memory=args.profile_memory or None,
+        )
+        started = time.time()
+        reporter.emit("run_started", query=args.query, resume=args.resume, backend=backend.describe())
+        engine.start(resume=args.resume)
+        while not engine.join(timeout=0.2):
+            if stop_event.is_set():
+                engine.stop()
+                engine.join()
+    finally:
+        if recorder is not None:
+            recorder.close()
+    if recorder is not None:
+        reporter.emit("recorded", path=recorder.path, records=recorder.records)
+    summary = engine.last_summary or {}
+    replayed = {"misses": archive.misses} if archive is not None else {}
+    reporter.emit(
+        "run_finished",
+        status=engine.status,
+        seconds=round(time.time() - started, 1),
+        **{k: summary[k] for k in ("total", "important", "low_priority") if k in summary},
+        **replayed,
+    )
+    if archive is not None and archive.misses:
+        # The classifier turns LLM failures into "important", so a replay that
+        # drifted off its archive would otherwise look like a clean run
+        reporter.emit("error", message=f"{archive.misses} requests had no recorded response")
+        return EXIT_ERROR
+    return {"completed": EXIT_OK, "empty": EXIT_OK, "stopped": EXIT_STOPPED}.get(
+        engine.status, EXIT_ERROR
+    )
+
+
+def run_daemon(args, reporter, stop_event, service=None):
+    runs = 0
+    code = EXIT_OK
+    while not stop_event.is_set():
+        code = run_once(args, reporter, stop_event, service)
+        runs += 1
+        if args.max_runs and runs >= args.max_runs:
+            break
+        next_run = time.time() + args.interval
+        reporter.emit("sleeping", seconds=args.interval, next_run=round(next_run, 3))
+        stop_event.wait(args.interval)
+    return EXIT_STOPPED if stop_event.is_set() else code
+
+
+def _install_signal_handlers(stop_event):
+    def handle(signum, frame):
+        log.info("Received signal %d, stopping after the current batch", signum)
+        stop_event.set()
+
+    for sig in (signal.SIGINT, getattr(signal, "SIGTERM", None)):
+        if sig is not None:
+            signal.signal(sig, handle)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging()
+    if args.daemon:
+        # Interrupted scheduled runs pick up where they left off
+        args.resume = True
+
+    reporter = Reporter(args.json)
+    stop_event = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        _install_signal_handlers(stop_event)
+
+    exporters = metrics.start_exporters(port=args.metrics_port, snapshot_file=args.metrics_file)
+    try:
+        if args.daemon:
+            return run_daemon(args, reporter, stop_event)
+        return run_once(args, reporter, stop_event)
+    finally:
+        metrics.stop_exporters(exporters)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+import json
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+
+from config import CHECKPOINT_FSYNC, COMPACT_CHECKPOINT_FILE
+
+_MAGIC = b"GCK1"
+_HEADER = struct.Struct("<4sQQ")   # magic, message count, overflow JSON length
+_HEX_ID = re.compile(r"[0-9a-f]{16}")
+
+_CODES = {"important": 1, "low_priority": 2}
+_NAMES = {code: name for name, code in _CODES.items()}
+
+
+def _pack(mid):
+    """Gmail IDs are 16 hex digits and fit a uint64; anything else returns None."""
+    return int(mid, 16) if _HEX_ID.fullmatch(mid) else None
+
+
+def _little_endian(arr):
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr
+
+
+class CompactRunState:
+    """RunState packed into flat arrays: about 21 bytes per message instead of hundreds.
+
+    IDs are uint64s in listing order (array('Q')) with a sorted copy plus
+    positions for lookup, verdicts are one byte each (0 = unprocessed) and
+    labeled is a bitmap. IDs that are not 16 hex digits are kept as strings
+    on the side. Strings only exist at the API boundary.
+
+    The checkpoint is the same arrays written raw to COMPACT_CHECKPOINT_FILE;
+    after the first save only the changed verdict and bitmap bytes are
+    rewritten in place.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._set_ids(array("Q"), {})
+        self._needs_full_save = True
+
+    def _set_ids(self, ids, overflow):
+        n = len(ids)
+        self._ids = ids
+        self._overflow = overflow                       # position -> str ID
+        self._overflow_index = {mid: i for i, mid in overflow.items()}
+        order = sorted((i for i in range(n) if i not in overflow), key=ids.__getitem__)
+        self._sorted_keys = array("Q", (ids[i] for i in order))
+        self._sorted_pos = array("I", order)
+        self._verdicts = bytearray(n)
+        self._labeled = bytearray((n + 7) // 8)
+        self._processed = 0
+        self._dirty = None                              # (lo, hi) verdict/bitmap index range
+
+    def _id_at(self, i):
+        if self._overflow and i in self._overflow:
+            return self._overflow[i]
+        return format(self._ids[i], "016x")
+
+    def _index(self, mid):
+        key = _pack(mid)
+        if key is None:
+            return self._overflow_index.get(mid)
+        j = bisect_left(self._sorted_keys, key)
+        if j < len(self._sorted_keys) and self._sorted_keys[j] == key:
+            return self._sorted_pos[j]
+        return None
+
+    def _touch(self, i):
+        lo, hi = self._dirty or (i, i)
+        self._dirty = (min(lo, i), max(hi, i))
+
+    def _is_labeled(self, i):
+        return self._labeled[i >> 3] & (1 << (i & 7))
+
+    # --- Mutation ---
+
+    def set_message_ids(self, ids):
+        packed = array("Q")
+        overflow = {}
+        for i, mid in enumerate(ids):
+            key = _pack(mid)
+            if key is None:
+                overflow[i] = mid
+                key = 0
+            packed.append(key)
+        with self._lock:
+            self._set_ids(packed, overflow)
+            self._needs_full_save = True
+
+    def record_verdicts(self, verdicts):
+        """Store {id: classification} results; returns the processed count."""
+        with self._lock:
+            for mid, cls in verdicts.items():
+                i = self._index(mid)
+                if i is None:
+                    continue
+                if not self._verdicts[i]:
+                    self._processed += 1
+                self._verdicts[i] = _CODES[cls]
+                self._touch(i)
+            return self._processed
+
+    def mark_labeled(self, ids):
+        with self._lock:
+            for mid in ids:
+                i = self._index(mid)
+                if i is not None:
+                    self._labeled[i >> 3] |= 1 << (i & 7)
+                    self._touch(i)
+
+    # --- Queries ---
+
+    def total(self):
+        return len(self._ids)
+
+    def processed_count(self):
+        return self._processed
+
+    def has_message_ids(self):
+        return len(self._ids) > 0
+
+    def unprocessed_ids(self):
+        i = self._verdicts.find(0)
+        while i != -1:
+            yield self._id_at(i)
+            i = self._verdicts.find(0, i + 1)
+
+    def verdict(self, mid):
+        i = self._index(mid)
+        return _NAMES.get(self._verdicts[i]) if i is not None else None
+
+    def iter_verdicts(self):
+        for code, name in _NAMES.items():
+            i = self._verdicts.find(code)
+            while i != -1:
+                yield self._id_at(i), name
+                i = self._verdicts.find(code, i + 1)
+
+    def classified_unlabeled(self, cls):
+        code = _CODES[cls]
+        ids = []
+        with self._lock:
+            i = self._verdicts.find(code)
+            while i != -1:
+                if not self._is_labeled(i):
+                    ids.append(self._id_at(i))
+                i = self._verdicts.find(code, i + 1)
+        return ids
+
+    def counts(self):
+        return {name: self._verdicts.count(code) for name, code in _CODES.items()}
+
+    def memory_bytes(self):
+        return (
+            self._ids.itemsize * len(self._ids)
+            + self._sorted_keys.itemsize * len(self._sorted_keys)
+            + self._sorted_pos.itemsize * len(self._sorted_pos)
+            + len(self._verdicts)
+            + len(self._labeled)
+        )
+
+    # --- Persistence ---
+
+    def save(self):
+        with self._save_lock:
+            os.makedirs(os.path.dirname(COMPACT_CHECKPOINT_FILE), exist_ok=True)
+            with self._lock:
+                full = self._needs_full_save or not os.path.exists(COMPACT_CHECKPOINT_FILE)
+                dirty = self._dirty
+                if full:
+                    ids = _little_endian(self._ids)
+                    overflow = json.dumps(self._overflow).encode("utf-8")
+                    verdicts = bytes(self._verdicts)
+                    labeled = bytes(self._labeled)
+                elif dirty:
+                    lo, hi = dirty
+                    verdicts = bytes(self._verdicts[lo : hi + 1])
+                    labeled = bytes(self._labeled[lo >> 3 : (hi >> 3) + 1])
+                    n = len(self._ids)
+                self._dirty = None
+                self._needs_full_save = False
+
+            if full:
+                tmp = COMPACT_CHECKPOINT_FILE + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(_HEADER.pack(_MAGIC, len(ids), len(overflow)))
+                    ids.tofile(f)
+                    f.write(verdicts)
+                    f.write(labeled)
+                    f.write(overflow)
+                    self._sync(f, snapshot=True)
+                os.replace(tmp, COMPACT_CHECKPOINT_FILE)
+            elif dirty:
+                # Verdicts and label bits are independent bytes, so a torn
+                # in-place write only loses some of the newest progress.
+                verdict_offset = _HEADER.size + 8 * n
+                labeled_offset = verdict_offset + n
+                with open(COMPACT_CHECKPOINT_FILE, "r+b") as f:
+                    f.seek(verdict_offset + lo)
+                    f.write(verdicts)
+                    f.seek(labeled_offset + (lo >> 3))
+                    f.write(labeled)
+                    self._sync(f, snapshot=False)
+
+    @staticmethod
+    def _sync(f, snapshot):
+        if CHECKPOINT_FSYNC == "always" or (snapshot and CHECKPOINT_FSYNC == "snapshot"):
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def load(cls):
+        if not os.path.exists(COMPACT_CHECKPOINT_FILE):
+            return None
+        with open(COMPACT_CHECKPOINT_FILE, "rb") as f:
+            magic, n, overflow_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{COMPACT_CHECKPOINT_FILE} is not a compact checkpoint")
+            ids = array("Q")
+            ids.fromfile(f, n)
+            ids = _little_endian(ids)
+            verdicts = f.read(n)
+            labeled = f.read((n + 7) // 8)
+            overflow = {int(i): mid for i, mid in json.loads(f.read(overflow_len)).items()}
+
+        state = cls()
+        state._set_ids(ids, overflow)
+        state._verdicts[:] = verdicts
+        state._labeled[:] = labeled
+        state._processed = n - state._verdicts.count(0)
+        state._needs_full_save = False
+        return state
+
+    def close(self):
+        pass
+
+    @classmethod
+    def clear(cls):
+        if os.path.exists(COMPACT_CHECKPOINT_FILE):
+            os.remove(COMPACT_CHECKPOINT_FILE)
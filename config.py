@@ -6,19 +6,95 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
 CLIENT_SECRET_FILE = os.path.join(CREDENTIALS_DIR, "client_secret.json")
 TOKEN_FILE = os.path.join(CREDENTIALS_DIR, "token.json")
+DISCOVERY_CACHE_FILE = os.path.join(OUTPUT_DIR, "gmail.v1.discovery.json")
 CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "checkpoint.json")
+STATE_DB_FILE = os.path.join(OUTPUT_DIR, "state.sqlite3")
+COMPACT_CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "checkpoint.bin")
 REPORT_FILE = os.path.join(OUTPUT_DIR, "report.html")
 LOG_FILE = os.path.join(OUTPUT_DIR, "gmail-cleanup.log")
-RUN_HISTORY_FILE = os.path.join(OUTPUT_DIR, "run_history.json")
+RUN_HISTORY_FILE = os.path.join(OUTPUT_DIR, "run_history.jsonl")
 
 GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
 
 LABEL_IMPORTANT = "AI/Important"
 LABEL_LOW_PRIORITY = "AI/Low Priority"
 
+# Run history: rolling throughput covers the last RUN_HISTORY_WINDOW runs; the
+# History tab loads RUN_HISTORY_PAGE_SIZE entries at a time.
+RUN_HISTORY_WINDOW = 20
+RUN_HISTORY_PAGE_SIZE = 50
+
+# Message details kept for the report spill to DETAILS_SPILL_FILE once they
+# pass DETAILS_MEMORY_BUDGET_MB (estimated).
+DETAILS_SPILL_FILE = os.path.join(OUTPUT_DIR, "details.sqlite3")
+DETAILS_MEMORY_BUDGET_MB = 64
+
+# The GUI applies engine progress/log events once per GUI_FRAME_MS, inserting
+# at most GUI_MAX_LOG_LINES_PER_FRAME of the newest log lines per frame.
+GUI_FRAME_MS = 50
+GUI_MAX_LOG_LINES_PER_FRAME = 200
+# Dashboard: rates are averaged over DASHBOARD_WINDOW_SECONDS and sparklines
+# keep DASHBOARD_HISTORY samples, one per DASHBOARD_REFRESH_MS.
+DASHBOARD_WINDOW_SECONDS = 10
+DASHBOARD_REFRESH_MS = 1000
+DASHBOARD_HISTORY = 120
+# Lines kept by the GUI log view; the log file has the full history.
+GUI_LOG_CAPACITY = 5000
+
+# Per-message trace (listed/fetched/queued/classified/labeled timestamps),
+# written in the background when TRACE_ENABLED or cli.py --trace is given.
+TRACE_ENABLED = False
+TRACE_FILE = os.path.join(OUTPUT_DIR, "trace.jsonl")
+
+# Profiling (cli.py --profile, or "profile"/"profile_memory" in settings.json):
+# PROFILE_MODE "cprofile" (every call) or "sample" (stacks every
+# PROFILE_SAMPLE_INTERVAL seconds); PROFILE_MEMORY adds tracemalloc snapshots
+# between run phases. Artifacts go to a per-run folder under PROFILE_DIR.
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_MODE = None
+PROFILE_MEMORY = False
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_DIR = os.path.join(OUTPUT_DIR, "profiles")
+
+# Seconds between runs in headless daemon mode (cli.py --daemon)
+DAEMON_INTERVAL = 3600
+
+# Metrics exporters, both off by default: a Prometheus-format endpoint on
+# METRICS_HOST:METRICS_PORT, and a JSON snapshot written to
+# METRICS_SNAPSHOT_FILE (e.g. os.path.join(OUTPUT_DIR, "metrics.json")) every
+# METRICS_SNAPSHOT_SECONDS.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None
+METRICS_SNAPSHOT_FILE = None
+METRICS_SNAPSHOT_SECONDS = 15
+
+# Report sections longer than REPORT_PAGE_SIZE rows are split into linked
+# pages. REPORT_FORMATS may add "csv" and "jsonl" exports next to the HTML.
+REPORT_PAGE_SIZE = 5000
+REPORT_FORMATS = ["html"]
+
 BATCH_SIZE = 25
 LLM_WORKERS = 4
+# Checkpoints are written in the background after CHECKPOINT_INTERVAL new
+# verdicts or label commits, or CHECKPOINT_MAX_SECONDS after the first unsaved one.
 CHECKPOINT_INTERVAL = 10
+CHECKPOINT_MAX_SECONDS = 5
+# Checkpoints append new verdicts/labels to a journal next to the snapshot and
+# rewrite the snapshot every CHECKPOINT_COMPACT_EVERY journal records.
+# CHECKPOINT_FSYNC: "always" (every append), "snapshot" or "never".
+CHECKPOINT_COMPACT_EVERY = 500
+CHECKPOINT_FSYNC = "snapshot"
+# Run state backend: "json" (in memory, checkpointed to CHECKPOINT_FILE),
+# "compact" (packed arrays, ~21 bytes/message, binary COMPACT_CHECKPOINT_FILE)
+# or "sqlite" (rows in STATE_DB_FILE; memory stays flat on huge mailboxes).
+STATE_BACKEND = "json"
+
+# Engine pipeline: worker threads per stage, and how many batches may wait
+# between stages before the upstream stage blocks.
+FETCH_WORKERS = 2
+CLASSIFY_WORKERS = 1
+LABEL_WORKERS = 1
+PIPELINE_QUEUE_SIZE = 4
 
 DEFAULT_QUERY = "is:unread"
 
@@ -26,3 +102,32 @@ SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
 
 OLLAMA_URL = "http://localhost:11434"
 OLLAMA_MODEL = "qwen2.5-coder:14b"
+
+# Inference backend: "ollama", "llamacpp" (llama-server) or "openai" (any
+# OpenAI-compatible /v1/chat/completions server such as vLLM). URL, model and
+# concurrency fall back to the backend's own defaults when left as None.
+LLM_BACKEND = "ollama"
+LLM_URL = None
+LLM_MODEL = None
+LLM_CONCURRENCY = None
+LLAMACPP_URL = "http://localhost:8080"
+OPENAI_URL = "http://localhost:8000"
+# Default URL per backend, for UIs that list backends without importing them
+LLM_BACKEND_URLS = {"ollama": OLLAMA_URL, "llamacpp": LLAMACPP_URL, "openai": OPENAI_URL}
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+
+# HTTP connection pool for the LLM backend. The pool for the inference
+# endpoint is sized to the backend's concurrency unless HTTP_POOL_SIZE is set;
+# connections idle longer than HTTP_IDLE_TIMEOUT seconds are closed.
+HTTP_POOL_SIZE = None
+HTTP_IDLE_TIMEOUT = 30
+HTTP_MAX_RETRIES = 2
+HTTP_TCP_KEEPALIVE = True
+
+# Prompt template used for classification ("default" or "compact"), and an
+# optional per-email prompt token budget (0 disables trimming). Trimming
+# assumes PROMPT_CHARS_PER_TOKEN, a fixed ratio so the same email always gets
+# the same prompt; each run history entry records the ratio the model reported.
+PROMPT_TEMPLATE = "default"
+PROMPT_TOKEN_BUDGET = 0
+PROMPT_CHARS_PER_TOKEN = 4.0
@@ -0,0 +1,121 @@
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+
+from config import DASHBOARD_HISTORY
+from engine_stats import STAGES
+
+
+def sparkline_points(values, width, height, pad=2):
+    """Flat [x0, y0, x1, y1, ...] coordinates scaling values into a width x height box."""
+    values = [v for v in values if v is not None]
+    if len(values) < 2:
+        return []
+    top = max(values) or 1.0
+    step = (width - 2 * pad) / (len(values) - 1)
+    points = []
+    for i, v in enumerate(values):
+        points.append(pad + i * step)
+        points.append(height - pad - (v / top) * (height - 2 * pad))
+    return points
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {secs:02d}s"
+
+
+class Sparkline(tk.Canvas):
+    def __init__(self, parent, color="#4285f4", width=220, height=36, **kwargs):
+        super().__init__(parent, width=width, height=height, highlightthickness=0, **kwargs)
+        self.color = color
+        self.values = deque(maxlen=DASHBOARD_HISTORY)
+
+    def push(self, value):
+        self.values.append(value)
+        self.delete("line")
+        points = sparkline_points(self.values, int(self["width"]), int(self["height"]))
+        if points:
+            self.create_line(*points, fill=self.color, width=2, tags="line")
+
+    def clear(self):
+        self.values.clear()
+        self.delete("line")
+
+
+class Dashboard(ttk.Frame):
+    """Live rates, ETA, LLM latency, queue depths and cache stats from ClassifierEngine.snapshot()."""
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.vars = {}
+
+        top = ttk.Frame(self)
+        top.pack(fill="x")
+        for col, (key, title) in enumerate(
+            (("rate", "Emails/sec"), ("eta", "ETA"), ("latency", "LLM p50/p95/p99 (ms)"), ("elapsed", "Elapsed"))
+        ):
+            ttk.Label(top, text=title).grid(row=0, column=col, sticky="w", padx=(0, 20))
+            self.vars[key] = tk.StringVar(value="-")
+            ttk.Label(top, textvariable=self.vars[key], font=("TkDefaultFont", 12, "bold")).grid(
+                row=1, column=col, sticky="w", padx=(0, 20)
+            )
+
+        charts = ttk.Frame(self)
+        charts.pack(fill="x", pady=(8, 0))
+        ttk.Label(charts, text="Emails/sec").grid(row=0, column=0, sticky="w")
+        self.rate_line = Sparkline(charts, color="#34a853")
+        self.rate_line.grid(row=1, column=0, sticky="w", padx=(0, 20))
+        ttk.Label(charts, text="LLM p95 latency").grid(row=0, column=1, sticky="w")
+        self.latency_line = Sparkline(charts, color="#ea4335")
+        self.latency_line.grid(row=1, column=1, sticky="w")
+
+        columns = ("stage", "per_second", "total", "queued")
+        self.stage_tree = ttk.Treeview(self, columns=columns, show="headings", height=len(STAGES))
+        for col, title, width in (
+            ("stage", "Stage", 110), ("per_second", "Emails/sec", 100),
+            ("total", "Total", 90), ("queued", "Queued batches", 110),
+        ):
+            self.stage_tree.heading(col, text=title)
+            self.stage_tree.column(col, width=width, anchor="w" if col == "stage" else "center")
+        self.stage_tree.pack(fill="x", pady=(8, 0))
+        for stage in STAGES:
+            self.stage_tree.insert("", "end", iid=stage, values=(stage, "-", "-", "-"))
+
+        self.vars["caches"] = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.vars["caches"]).pack(fill="x", pady=(8, 0))
+
+    def reset(self):
+        self.rate_line.clear()
+        self.latency_line.clear()
+        for key in ("rate", "eta", "latency", "elapsed"):
+            self.vars[key].set("-")
+
+    def update_from(self, snap):
+        if not snap:
+            return
+        self.vars["rate"].set(f"{snap['emails_per_second']:.1f}")
+        self.vars["eta"].set(format_duration(snap["eta_seconds"]))
+        self.vars["elapsed"].set(format_duration(snap["elapsed_seconds"]))
+        latency = snap["llm_latency_ms"]
+        if latency:
+            self.vars["latency"].set(f"{latency['p50']:.0f} / {latency['p95']:.0f} / {latency['p99']:.0f}")
+        self.rate_line.push(snap["emails_per_second"])
+        self.latency_line.push(latency["p95"] if latency else None)
+
+        for stage, stats in snap["stages"].items():
+            # Batches waiting in the stage's inbox; the lister has none
+            queued = snap["queues"].get(stage, "")
+            self.stage_tree.item(stage, values=(stage, f"{stats['per_second']:.1f}", stats["total"], queued))
+
+        caches = snap["caches"]
+        parts = []
+        if caches.get("checkpoint_resumed") is not None:
+            parts.append(f"resumed from checkpoint: {caches['checkpoint_resumed']:.0%}")
+        if caches.get("llm_connection_reuse") is not None:
+            parts.append(f"LLM connection reuse: {caches['llm_connection_reuse']:.0%}")
+        parts.append("details cache: " + ("spilled to disk" if caches.get("details_spilled") else "in memory"))
+        self.vars["caches"].set("   ".join(parts))
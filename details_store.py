@@ -0,0 +1,141 @@
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+from config import DETAILS_MEMORY_BUDGET_MB, DETAILS_SPILL_FILE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+log = logging.getLogger(__name__)
+
+# Only what the report shows; snippets are needed for classification only
+FIELDS = ("date", "from", "subject")
+# Rough per-entry cost of the dict slot, key and tuple beyond the characters
+_ENTRY_OVERHEAD = 250
+_PAGE = 1000
+
+
+def peak_rss_mb():
+    """Process memory high-water mark in MB, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class DetailsStore:
+    """Report details per message, kept in memory up to a budget, then in SQLite.
+
+    Once the estimated size passes `budget_mb`, everything moves to a scratch
+    SQLite file and later updates are written there, so memory stays flat no
+    matter how many messages a run has. close() removes the file.
+    """
+
+    def __init__(self, budget_mb=None, path=None):
+        budget_mb = DETAILS_MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.path = path or DETAILS_SPILL_FILE
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._db = None
+        self._count = 0
+        self.memory_bytes = 0
+        self.high_water_bytes = 0
+
+    def update(self, details):
+        rows = {mid: tuple(info.get(k, "") for k in FIELDS) for mid, info in details.items()}
+        with self._lock:
+            if self._db is None:
+                for mid, row in rows.items():
+                    if mid not in self._memory:
+                        self._count += 1
+                        self.memory_bytes += _ENTRY_OVERHEAD + len(mid) + sum(map(len, row))
+                    self._memory[mid] = row
+                self.high_water_bytes = max(self.high_water_bytes, self.memory_bytes)
+                if self.memory_bytes > self.budget_bytes:
+                    self._spill()
+            else:
+                self._insert(rows.items())
+
+    def _spill(self):
+        log.info(
+            "Details cache passed %.0f MB; spilling %d entries to %s",
+            self.budget_bytes / (1024 * 1024), len(self._memory), self.path,
+        )
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        # Scratch data: a crash just means the report re-fetches details
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE details (id TEXT PRIMARY KEY, date TEXT, sender TEXT, subject TEXT)"
+        )
+        self._count = 0
+        self._insert(self._memory.items())
+        self._memory = {}
+        self.memory_bytes = 0
+
+    def _insert(self, rows):
+        before = self._db.total_changes
+        # Details of a message never change, so repeats can be ignored
+        self._db.executemany(
+            "INSERT OR IGNORE INTO details VALUES (?, ?, ?, ?)",
+            ((mid, *row) for mid, row in rows),
+        )
+        self._db.commit()
+        self._count += self._db.total_changes - before
+
+    def items(self):
+        """Yield (id, {date, from, subject}) for every stored message."""
+        if self._db is None:
+            with self._lock:
+                snapshot = list(self._memory.items())
+            for mid, row in snapshot:
+                yield mid, dict(zip(FIELDS, row))
+            return
+        last = ""
+        while True:
+            with self._lock:
+                page = self._db.execute(
+                    "SELECT id, date, sender, subject FROM details WHERE id > ? ORDER BY id LIMIT ?",
+                    (last, _PAGE),
+                ).fetchall()
+            if not page:
+                return
+            for mid, *row in page:
+                yield mid, dict(zip(FIELDS, row))
+            last = page[-1][0]
+
+    @property
+    def spilled(self):
+        return self._db is not None
+
+    def __len__(self):
+        return self._count
+
+    def stats(self):
+        return {
+            "entries": self._count,
+            "spilled": self.spilled,
+            "memory_budget_mb": round(self.budget_bytes / (1024 * 1024), 1),
+            "memory_high_water_mb": round(self.high_water_bytes / (1024 * 1024), 2),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+            self._memory = {}
+            self._count = 0
+            self.memory_bytes = 0
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import deque
+
+from config import DASHBOARD_WINDOW_SECONDS
+from perf_stats import summarize
+
+STAGES = ("list", "fetch", "classify", "label")
+# Latency percentiles cover this many of the most recent LLM calls
+_LATENCY_SAMPLES = 500
+
+
+class RateTracker:
+    """Events per second over a sliding window, in one-second buckets."""
+
+    def __init__(self, window=None, clock=time.monotonic):
+        self.window = window or DASHBOARD_WINDOW_SECONDS
+        self.clock = clock
+        self.total = 0
+        self._buckets = deque()  # [second, count]
+        self._lock = threading.Lock()
+
+    def add(self, n=1):
+        now = int(self.clock())
+        with self._lock:
+            self.total += n
+            if self._buckets and self._buckets[-1][0] == now:
+                self._buckets[-1][1] += n
+            else:
+                self._buckets.append([now, n])
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def rate(self):
+        now = self.clock()
+        with self._lock:
+            self._trim(int(now))
+            if not self._buckets:
+                return 0.0
+            count = sum(n for _, n in self._buckets)
+            # Young trackers divide by the time they have actually covered
+            span = min(self.window, now - self._buckets[0][0])
+        return count / max(span, 1.0)
+
+
+class EngineStats:
+    """Live per-stage counters for the dashboard, fed by the engine's stages."""
+
+    def __init__(self, window=None, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.stages = {name: RateTracker(window, clock) for name in STAGES}
+
+    def add(self, stage, n=1):
+        self.stages[stage].add(n)
+
+    def snapshot(self, done, total, usage=None, queues=None, caches=None):
+        rate = self.stages["classify"].rate()
+        remaining = max(0, total - done)
+        snap = {
+            "elapsed_seconds": round(self.clock() - self.started, 1),
+            "done": done,
+            "total": total,
+            "emails_per_second": round(rate, 2),
+            "eta_seconds": round(remaining / rate) if rate and remaining else None,
+            "stages": {
+                name: {"per_second": round(t.rate(), 2), "total": t.total}
+                for name, t in self.stages.items()
+            },
+            "queues": queues or {},
+            "caches": caches or {},
+            "llm_latency_ms": None,
+        }
+        if usage is not None:
+            recent = usage.recent_latencies(_LATENCY_SAMPLES)
+            if recent:
+                snap["llm_latency_ms"] = summarize(recent, scale=1e6, digits=1)
+        return snap
@@ -0,0 +1,62 @@
+from collections import deque
+from dataclasses import dataclass, field
+
+from config import GUI_MAX_LOG_LINES_PER_FRAME
+
+
+@dataclass
+class Frame:
+    """Everything published since the previous drain, aggregated for one UI update."""
+
+    done: int = None
+    total: int = None
+    counts: dict = field(default_factory=dict)  # classification -> new verdicts
+    logs: list = field(default_factory=list)
+    skipped_logs: int = 0
+
+    def __bool__(self):
+        return self.done is not None or bool(self.logs) or bool(self.skipped_logs)
+
+
+class EventBus:
+    """Engine-to-GUI progress and log events, drained once per UI frame.
+
+    Producers (engine worker threads) only append to a deque, which is atomic
+    without a lock. The GUI calls drain() on a timer and applies one Frame, so
+    the cost per frame does not depend on how fast verdicts arrive. At most
+    `max_log_lines` of the newest log lines are kept per frame.
+    """
+
+    def __init__(self, max_log_lines=None):
+        self.max_log_lines = max_log_lines or GUI_MAX_LOG_LINES_PER_FRAME
+        self._events = deque()
+
+    def progress(self, done, total, classification):
+        self._events.append((done, total, classification))
+
+    def log(self, message):
+        self._events.append(message)
+
+    def drain(self):
+        frame = Frame()
+        logs = deque(maxlen=self.max_log_lines)
+        seen_logs = 0
+        popleft = self._events.popleft
+        while True:
+            try:
+                event = popleft()
+            except IndexError:
+                break
+            if isinstance(event, str):
+                logs.append(event)
+                seen_logs += 1
+            else:
+                done, total, classification = event
+                # Workers may finish out of order; the counter only moves forward
+                if frame.done is None or done > frame.done:
+                    frame.done = done
+                frame.total = total
+                frame.counts[classification] = frame.counts.get(classification, 0) + 1
+        frame.logs = list(logs)
+        frame.skipped_logs = seen_logs - len(logs)
+        return frame
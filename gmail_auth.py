@@ -1,14 +1,22 @@
+import json
+import logging
 import os
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from config import CLIENT_SECRET_FILE, DISCOVERY_CACHE_FILE, TOKEN_FILE, GMAIL_SCOPES
+from startup import timed
 
-from config import CLIENT_SECRET_FILE, TOKEN_FILE, GMAIL_SCOPES
+log = logging.getLogger(__name__)
+
+# Parsed discovery documents, loaded once per process
+_discovery = {}
 
 
 def get_gmail_service():
+    # The google-auth/discovery stack takes a few hundred ms to import, so it
+    # is loaded on first use rather than at startup.
+    with timed("import_google_auth"):
+        from google.oauth2.credentials import Credentials
+
     creds = None
 
     if os.path.exists(TOKEN_FILE):
@@ -16,6 +24,8 @@ def get_gmail_service():
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
+
             creds.refresh(Request())
         else:
             if not os.path.exists(CLIENT_SECRET_FILE):
@@ -23,6 +33,8 @@ def get_gmail_service():
                     f"Missing {CLIENT_SECRET_FILE}. "
                     "Download OAuth client JSON from Google Cloud Console."
                 )
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
             flow = InstalledAppFlow.from_client_secrets_file(
                 CLIENT_SECRET_FILE, GMAIL_SCOPES
             )
@@ -31,4 +43,44 @@ def get_gmail_service():
         with open(TOKEN_FILE, "w") as f:
             f.write(creds.to_json())
 
-    return build("gmail", "v1", credentials=creds)
+    return build_service(creds)
+
+
+def build_service(creds):
+    """Build the Gmail client from a locally cached discovery document."""
+    with timed("import_googleapiclient"):
+        from googleapiclient.discovery import build, build_from_document
+
+    with timed("gmail_service_build"):
+        doc = discovery_document()
+        if doc is None:
+            return build("gmail", "v1", credentials=creds)
+        return build_from_document(doc, credentials=creds)
+
+
+def discovery_document():
+    """The parsed Gmail v1 discovery document, or None if none is available offline.
+
+    Loaded once per process from DISCOVERY_CACHE_FILE, which is seeded from the
+    copy bundled with google-api-python-client. Delete the file to refresh it.
+    """
+    if "gmail" in _discovery:
+        return _discovery["gmail"]
+    doc = None
+    try:
+        with open(DISCOVERY_CACHE_FILE, encoding="utf-8") as f:
+            doc = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        from googleapiclient.discovery_cache import get_static_doc
+
+        text = get_static_doc("gmail", "v1")
+        if text:
+            doc = json.loads(text)
+            try:
+                os.makedirs(os.path.dirname(DISCOVERY_CACHE_FILE), exist_ok=True)
+                with open(DISCOVERY_CACHE_FILE, "w", encoding="utf-8") as f:
+                    f.write(text)
+            except OSError:
+                log.warning("Could not cache discovery document at %s", DISCOVERY_CACHE_FILE)
+    _discovery["gmail"] = doc
+    return doc
@@ -1,23 +1,69 @@
 import logging
+import threading
 
-from googleapiclient.http import BatchHttpRequest
-
+import metrics
 from config import LABEL_IMPORTANT, LABEL_LOW_PRIORITY, BATCH_SIZE
 
 log = logging.getLogger(__name__)
 
+# One HTTP round trip each; a batch counts once here and per message in API_REQUESTS
+API_CALLS = metrics.counter("gmail_http_calls_total", "Gmail HTTP round trips", ("method",))
+API_SECONDS = metrics.histogram("gmail_http_seconds", "Gmail HTTP round trip time", ("method",))
+API_REQUESTS = metrics.counter("gmail_api_requests_total", "Gmail API requests, batched or not", ("method",))
+API_ERRORS = metrics.counter("gmail_api_errors_total", "Failed Gmail API requests", ("method",))
+BATCH_SIZES = metrics.histogram(
+    "gmail_batch_size", "Messages per Gmail batch request", ("method",), buckets=metrics.SIZE_BUCKETS
+)
+
 
 class GmailClient:
     def __init__(self, service):
         self.service = service
         self.user = "me"
         self._label_ids = {}
-
-    def fetch_message_ids(self, query):
+        self._local = threading.local()
+
+    def _thread_http(self):
+        # httplib2 is not thread-safe, so pipeline workers each get their own
+        # authorized connection sharing the service's credentials.
+        http = getattr(self._local, "http", None)
+        if http is None:
+            credentials = getattr(getattr(self.service, "_http", None), "credentials", None)
+            if credentials is None:
+                return None
+            # Only loaded once there is a real service to talk to
+            import httplib2
+            from google.auth.credentials import Credentials
+            from google_auth_httplib2 import AuthorizedHttp
+
+            if not isinstance(credentials, Credentials):
+                return None
+            http = AuthorizedHttp(credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _execute(self, request, method, size=None):
+        http = self._thread_http()
+        API_CALLS.inc(method=method)
+        if size is None:
+            API_REQUESTS.inc(method=method)
+        else:
+            API_REQUESTS.inc(size, method=method)
+            BATCH_SIZES.observe(size, method=method)
+        try:
+            with API_SECONDS.time(method=method):
+                if http is None:
+                    return request.execute()
+                return request.execute(http=http)
+        except Exception:
+            API_ERRORS.inc(size or 1, method=method)
+            raise
+
+    def fetch_message_ids(self, query, on_page=None):
         ids = []
         page_token = None
         while True:
-            resp = (
+            resp = self._execute(
                 self.service.users()
                 .messages()
                 .list(
@@ -25,11 +71,14 @@ class GmailClient:
                     q=query,
                     pageToken=page_token,
                     maxResults=500,
-                )
-                .execute()
+                ),
+                "messages.list",
             )
-            for msg in resp.get("messages", []):
+            messages = resp.get("messages", [])
+            for msg in messages:
                 ids.append(msg["id"])
+            if on_page:
+                on_page(len(messages))
             page_token = resp.get("nextPageToken")
             if not page_token:
                 break
@@ -44,6 +93,7 @@ class GmailClient:
 
             def _callback(req_id, response, exception):
                 if exception:
+                    API_ERRORS.inc(method="messages.get")
                     log.warning("Batch fetch error for %s: %s", req_id, exception)
                     return
                 headers = {}
@@ -72,12 +122,12 @@ class GmailClient:
                     callback=_callback,
                     request_id=mid,
                 )
-            batch.execute()
+            self._execute(batch, "messages.get", size=len(chunk))
 
         return results
 
     def ensure_labels_exist(self):
-        resp = self.service.users().labels().list(userId=self.user).execute()
+        resp = self._execute(self.service.users().labels().list(userId=self.user), "labels.list")
         existing = {lb["name"]: lb["id"] for lb in resp.get("labels", [])}
 
         for name in (LABEL_IMPORTANT, LABEL_LOW_PRIORITY):
@@ -89,11 +139,8 @@ class GmailClient:
                     "labelListVisibility": "labelShow",
                     "messageListVisibility": "show",
                 }
-                created = (
-                    self.service.users()
-                    .labels()
-                    .create(userId=self.user, body=body)
-                    .execute()
+                created = self._execute(
+                    self.service.users().labels().create(userId=self.user, body=body), "labels.create"
                 )
                 self._label_ids[name] = created["id"]
                 log.info("Created label %s", name)
@@ -108,6 +155,7 @@ class GmailClient:
 
             def _callback(req_id, response, exception):
                 if exception:
+                    API_ERRORS.inc(method="messages.modify")
                     log.warning("Label apply error for %s: %s", req_id, exception)
 
             for mid in chunk:
@@ -122,4 +170,4 @@ class GmailClient:
                     callback=_callback,
                     request_id=mid,
                 )
-            batch.execute()
+            self._execute(batch, "messages.modify", size=len(chunk))
@@ -1,20 +1,33 @@
+import importlib.util
 import json
 import logging
 import threading
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-
-from config import DEFAULT_QUERY, OLLAMA_URL, RUN_HISTORY_FILE, SETTINGS_FILE
-from gmail_auth import get_gmail_service
-from llm_classifier import check_ollama_available
-from classifier_engine import ClassifierEngine
-
-try:
-    import pystray
-    from PIL import Image, ImageDraw
-    HAS_TRAY = True
-except ImportError:
-    HAS_TRAY = False
+from tkinter import ttk, messagebox
+
+from config import (
+    DASHBOARD_REFRESH_MS,
+    DEFAULT_QUERY,
+    GUI_FRAME_MS,
+    LLM_BACKEND,
+    LLM_BACKEND_URLS,
+    LLM_CONCURRENCY,
+    LLM_MODEL,
+    LLM_URL,
+    PROFILE_MODES,
+    RUN_HISTORY_PAGE_SIZE,
+    SETTINGS_FILE,
+)
+import metrics
+from dashboard import Dashboard
+from events import EventBus
+from log_view import LogView
+from preflight import Preflight, run_steps
+from run_history import RunHistory
+from startup import log_timings, mark, timed
+
+# pystray and Pillow are imported by the tray thread, after the window is up
+HAS_TRAY = all(importlib.util.find_spec(m) is not None for m in ("pystray", "PIL"))
 
 log = logging.getLogger(__name__)
 
@@ -51,6 +64,10 @@ class GmailCleanupGUI:
         self.engine = None
         self.service = None
         self._tray_icon = None
+        self.events = EventBus()
+        self.preflight = None
+        self._engine_started = False
+        self._exporters = []
 
         self.style = ttk.Style()
         self.style.theme_use("clam")
@@ -62,6 +79,13 @@ class GmailCleanupGUI:
             self._start_tray()
 
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after_idle(self._on_ready)
+        self.root.after(GUI_FRAME_MS, self._drain_events)
+
+    def _on_ready(self):
+        mark("window_interactive")
+        log_timings()
+        self._exporters = metrics.start_exporters()
 
     def _build_ui(self):
         # --- Input row ---
@@ -74,19 +98,30 @@ class GmailCleanupGUI:
             row=0, column=1, padx=(5, 20)
         )
 
-        ttk.Label(self.input_frame, text="Ollama URL:").grid(row=0, column=2, sticky="w")
-        self.ollama_var = tk.StringVar(value=OLLAMA_URL)
+        ttk.Label(self.input_frame, text="LLM URL:").grid(row=0, column=2, sticky="w")
+        self.ollama_var = tk.StringVar(value=LLM_URL or LLM_BACKEND_URLS[LLM_BACKEND])
         ttk.Entry(self.input_frame, textvariable=self.ollama_var, width=25).grid(
             row=0, column=3, padx=5
         )
 
+        # Backend row
+        ttk.Label(self.input_frame, text="Backend:").grid(row=1, column=0, sticky="w", pady=(5, 0))
+        self.backend_var = tk.StringVar(value=LLM_BACKEND)
+        self._backend_name = LLM_BACKEND
+        backend_box = ttk.Combobox(
+            self.input_frame, textvariable=self.backend_var,
+            values=sorted(LLM_BACKEND_URLS), state="readonly", width=12,
+        )
+        backend_box.grid(row=1, column=1, sticky="w", padx=(5, 20), pady=(5, 0))
+        backend_box.bind("<<ComboboxSelected>>", self._on_backend_change)
+
         # Connected email row
-        ttk.Label(self.input_frame, text="Connected:").grid(row=1, column=0, sticky="w", pady=(5, 0))
+        ttk.Label(self.input_frame, text="Connected:").grid(row=2, column=0, sticky="w", pady=(5, 0))
         self.email_var = tk.StringVar(value="Not connected")
         self.email_entry = ttk.Entry(
             self.input_frame, textvariable=self.email_var, state="readonly", width=60
         )
-        self.email_entry.grid(row=1, column=1, columnspan=3, sticky="we", padx=5, pady=(5, 0))
+        self.email_entry.grid(row=2, column=1, columnspan=3, sticky="we", padx=5, pady=(5, 0))
 
         self.input_frame.columnconfigure(3, weight=1)
 
@@ -150,7 +185,7 @@ class GmailCleanupGUI:
             fill="x", pady=(5, 0)
         )
 
-        # --- Notebook (Log + History) ---
+        # --- Notebook (Log + Dashboard + History) ---
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill="both", expand=True, padx=10, pady=(5, 10))
 
@@ -158,15 +193,27 @@ class GmailCleanupGUI:
         self.log_frame = ttk.Frame(self.notebook, padding=8)
         self.notebook.add(self.log_frame, text="Log")
 
-        self.log_text = scrolledtext.ScrolledText(
-            self.log_frame, height=10, state="disabled", wrap="word"
-        )
-        self.log_text.pack(fill="both", expand=True)
+        self.log_view = LogView(self.log_frame)
+        self.log_view.pack(fill="both", expand=True)
+        self.log_text = self.log_view.text
 
-        # Tab 2 — History
+        # Tab 2 — Dashboard
+        self.dashboard = Dashboard(self.notebook, padding=8)
+        self.notebook.add(self.dashboard, text="Dashboard")
+
+        # Tab 3 — History
         self.history_frame = ttk.Frame(self.notebook, padding=8)
         self.notebook.add(self.history_frame, text="History")
 
+        history_bar = ttk.Frame(self.history_frame)
+        history_bar.pack(side="bottom", fill="x", pady=(5, 0))
+        self.history_summary_var = tk.StringVar(value="")
+        ttk.Label(history_bar, textvariable=self.history_summary_var).pack(side="left")
+        self.history_more_btn = ttk.Button(
+            history_bar, text="Load more", command=self._load_more_history
+        )
+        self.history_more_btn.pack(side="right")
+
         columns = ("date", "status", "total", "important", "low_priority", "duration")
         self.history_tree = ttk.Treeview(
             self.history_frame, columns=columns, show="headings", height=10
@@ -192,6 +239,8 @@ class GmailCleanupGUI:
         self.history_tree.pack(side="left", fill="both", expand=True)
         history_scroll.pack(side="right", fill="y")
 
+        self.history = RunHistory()
+        self._history_cursor = None
         self._refresh_history()
 
         # Counters
@@ -211,9 +260,12 @@ class GmailCleanupGUI:
         settings = {
             "query": self.query_var.get(),
             "ollama_url": self.ollama_var.get(),
+            "llm_backend": self.backend_var.get(),
             "dark_mode": self.dark_mode_var.get(),
             "geometry": self.root.geometry(),
         }
+        # No widgets for these; kept as edited in settings.json
+        settings.update({k: v for k, v in self._profile_settings.items() if v})
         try:
             with open(SETTINGS_FILE, "w") as f:
                 json.dump(settings, f, indent=2)
@@ -222,12 +274,24 @@ class GmailCleanupGUI:
 
     def _load_and_apply_settings(self):
         settings = self._load_settings()
+        self._profile_settings = {
+            "profile": settings.get("profile"), "profile_memory": settings.get("profile_memory")
+        }
+        if self._profile_settings["profile"] not in (None, *PROFILE_MODES):
+            log.warning(
+                "Ignoring unknown profile mode '%s' in settings. Available: %s",
+                self._profile_settings["profile"], list(PROFILE_MODES),
+            )
+            self._profile_settings["profile"] = None
         if not settings:
             self._apply_theme()
             return
 
         if "query" in settings:
             self.query_var.set(settings["query"])
+        if settings.get("llm_backend") in LLM_BACKEND_URLS:
+            self.backend_var.set(settings["llm_backend"])
+            self._backend_name = settings["llm_backend"]
         if "ollama_url" in settings:
             self.ollama_var.set(settings["ollama_url"])
         if "dark_mode" in settings:
@@ -237,6 +301,13 @@ class GmailCleanupGUI:
 
         self._apply_theme()
 
+    def _on_backend_change(self, event=None):
+        # Follow the new backend's default URL unless the user customized it
+        old_default = LLM_BACKEND_URLS[self._backend_name]
+        self._backend_name = self.backend_var.get()
+        if self.ollama_var.get().rstrip("/") == old_default.rstrip("/"):
+            self.ollama_var.set(LLM_BACKEND_URLS[self._backend_name])
+
     # --- Dark Mode ---
 
     def _on_dark_toggle(self):
@@ -281,6 +352,8 @@ class GmailCleanupGUI:
     # --- System Tray ---
 
     def _create_tray_image(self):
+        from PIL import Image, ImageDraw
+
         img = Image.new("RGBA", (64, 64), (66, 133, 244, 255))
         draw = ImageDraw.Draw(img)
         # White envelope outline
@@ -290,6 +363,17 @@ class GmailCleanupGUI:
         return img
 
     def _start_tray(self):
+        t = threading.Thread(target=self._run_tray, daemon=True)
+        t.start()
+
+    def _run_tray(self):
+        try:
+            with timed("import_tray"):
+                import pystray
+        except Exception:
+            # e.g. no display server; the window still works without a tray
+            log.warning("System tray unavailable", exc_info=True)
+            return
         menu = pystray.Menu(
             pystray.MenuItem("Show", self._tray_show, default=True),
             pystray.MenuItem("Exit", self._tray_exit),
@@ -298,8 +382,7 @@ class GmailCleanupGUI:
             "gmail-cleanup", self._create_tray_image(),
             "Gmail Cleanup Tool", menu
         )
-        t = threading.Thread(target=self._tray_icon.run, daemon=True)
-        t.start()
+        self._tray_icon.run()
 
     def _tray_show(self, icon=None, item=None):
         self.root.after(0, self._show_window)
@@ -314,6 +397,7 @@ class GmailCleanupGUI:
 
     def _quit(self):
         self._save_settings()
+        metrics.stop_exporters(self._exporters)
         if self._tray_icon:
             self._tray_icon.stop()
         self.root.destroy()
@@ -323,33 +407,40 @@ class GmailCleanupGUI:
             self.root.withdraw()
         else:
             self._save_settings()
+            metrics.stop_exporters(self._exporters)
             self.root.destroy()
 
     # --- Logging / Progress ---
 
-    def _log(self, msg):
-        def _update():
-            self.log_text.config(state="normal")
-            self.log_text.insert("end", f"> {msg}\n")
-            self.log_text.see("end")
-            self.log_text.config(state="disabled")
+    # Engine threads only publish to the event bus; _drain_events applies
+    # everything published since the last frame in one pass.
 
-        self.root.after(0, _update)
+    def _log(self, msg):
+        # Also to the rotating log file, which keeps what the view drops
+        log.info(msg)
+        self.events.log(msg)
 
     def _progress(self, done, total, classification):
-        def _update():
-            if classification == "important":
-                self._important_count += 1
-            else:
-                self._low_count += 1
-
-            self.progress_bar["maximum"] = total
-            self.progress_bar["value"] = done
-            self.progress_label.set(f"{done}/{total}")
+        self.events.progress(done, total, classification)
+
+    def _drain_events(self):
+        frame = self.events.drain()
+        if frame.logs or frame.skipped_logs:
+            lines = frame.logs
+            if frame.skipped_logs:
+                lines = [f"... {frame.skipped_logs} more lines (see the log file)"] + lines
+            self.log_view.extend(lines)
+        if frame.done is not None:
+            important = frame.counts.get("important", 0)
+            self._important_count += important
+            self._low_count += sum(frame.counts.values()) - important
+
+            self.progress_bar["maximum"] = frame.total
+            self.progress_bar["value"] = frame.done
+            self.progress_label.set(f"{frame.done}/{frame.total}")
             self.important_var.set(f"Important: {self._important_count}")
             self.low_var.set(f"Low Priority: {self._low_count}")
-
-        self.root.after(0, _update)
+        self.root.after(GUI_FRAME_MS, self._drain_events)
 
     def _set_running(self, running):
         self.start_btn.config(state="disabled" if running else "normal")
@@ -358,54 +449,106 @@ class GmailCleanupGUI:
         self.status_var.set("Running..." if running else "Idle")
 
     def _launch_engine(self, resume=False):
+        # requests and urllib3 load on the first start, not with the window
+        from llm_backends import create_backend
+
         # Reset counters
         self._important_count = 0
         self._low_count = 0
 
-        # Check Ollama
-        self._log("Checking Ollama...")
-        ok, msg = check_ollama_available()
-        if not ok:
-            messagebox.showerror("Ollama Error", msg)
+        try:
+            backend = create_backend(
+                self.backend_var.get(), url=self.ollama_var.get(), model=LLM_MODEL, concurrency=LLM_CONCURRENCY
+            )
+        except ValueError as e:
+            messagebox.showerror("LLM Backend Error", str(e))
             return
 
-        # Auth Gmail
-        self._log("Authenticating with Gmail...")
-        try:
-            self.service = get_gmail_service()
-        except Exception as e:
-            messagebox.showerror("Gmail Auth Error", str(e))
+        # The LLM check and Gmail auth run concurrently off the Tk thread
+        self._log(f"Checking {backend.describe()} and authenticating with Gmail...")
+        self._set_running(True)
+        self.status_var.set("Preparing...")
+        self.preflight = Preflight(run_steps(backend)).start()
+        self._engine_started = False
+        self._poll_preflight(backend, resume)
+
+    def _poll_preflight(self, backend, resume):
+        preflight = self.preflight
+        if preflight.cancelled:
+            self._log("Start cancelled.")
+            self.preflight = None
+            self._set_running(False)
             return
 
-        # Fetch connected email
-        try:
-            profile = self.service.users().getProfile(userId="me").execute()
-            self.email_var.set(profile["emailAddress"])
-        except Exception:
-            log.warning("Could not fetch email address")
+        if preflight.state["profile"] == "ok" and self.email_var.get() != preflight.results["profile"]:
+            self.email_var.set(preflight.results["profile"])
+
+        failures = preflight.failures()
+        if failures:
+            step, error = next(iter(failures.items()))
+            if step == "llm":
+                messagebox.showerror("LLM Backend Error", error)
+            else:
+                messagebox.showerror("Gmail Auth Error", error)
+            preflight.cancel()
+            self.preflight = None
+            self._set_running(False)
+            return
+
+        if not self._engine_started and preflight.ready():
+            self._engine_started = True
+            self._start_engine(backend, preflight.results["gmail"], resume)
+        elif not self._engine_started:
+            self.status_var.set(f"Preparing... {preflight.describe()}")
+
+        if preflight.finished():
+            if preflight.state["profile"] == "failed":
+                log.warning("Could not fetch email address")
+            self.preflight = None
+        else:
+            self.root.after(100, self._poll_preflight, backend, resume)
+
+    def _start_engine(self, backend, service, resume):
+        from classifier_engine import ClassifierEngine
+        from llm_classifier import set_backend
 
+        set_backend(backend)
+        self.service = service
         self._log("Starting classifier engine...")
-        self._set_running(True)
+        self.status_var.set("Running...")
 
         self.engine = ClassifierEngine(
             service=self.service,
             progress_cb=self._progress,
             log_cb=self._log,
             query=self.query_var.get(),
+            profile=self._profile_settings["profile"],
+            profile_memory=self._profile_settings["profile_memory"],
         )
         self.engine.start(resume=resume)
 
+        self.dashboard.reset()
         self._poll_engine()
+        self._refresh_dashboard()
 
     def _refresh_history(self):
         for row in self.history_tree.get_children():
             self.history_tree.delete(row)
-        try:
-            with open(RUN_HISTORY_FILE, "r", encoding="utf-8") as f:
-                history = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            history = []
-        for entry in reversed(history):
+        self._history_cursor = None
+        self._load_more_history()
+
+        summary = self.history.summary()
+        self.history_summary_var.set(
+            f"{summary['runs']} runs, {summary['emails']} emails "
+            f"({summary['important']} important, {summary['low_priority']} low priority), "
+            f"recent throughput {summary['recent_emails_per_second']} emails/s"
+        )
+
+    def _load_more_history(self):
+        entries, self._history_cursor = self.history.read_recent(
+            RUN_HISTORY_PAGE_SIZE, before=self._history_cursor
+        )
+        for entry in entries:
             self.history_tree.insert("", "end", values=(
                 entry.get("date", ""),
                 entry.get("status", ""),
@@ -414,6 +557,17 @@ class GmailCleanupGUI:
                 entry.get("low_priority", 0),
                 entry.get("duration_seconds", ""),
             ))
+        self.history_more_btn.configure(state="normal" if self._history_cursor else "disabled")
+
+    def _refresh_dashboard(self):
+        if not self.engine:
+            return
+        try:
+            self.dashboard.update_from(self.engine.snapshot())
+        except Exception:
+            log.debug("Dashboard refresh failed", exc_info=True)
+        if self.engine.is_running():
+            self.root.after(DASHBOARD_REFRESH_MS, self._refresh_dashboard)
 
     def _poll_engine(self):
         if self.engine and self.engine.is_running():
@@ -426,7 +580,9 @@ class GmailCleanupGUI:
         self._launch_engine(resume=False)
 
     def _on_stop(self):
-        if self.engine:
+        if self.preflight and not self._engine_started:
+            self.preflight.cancel()
+        elif self.engine:
             self.engine.stop()
             self._log("Stop requested...")
 
@@ -0,0 +1,152 @@
+import logging
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+import metrics
+from config import HTTP_IDLE_TIMEOUT, HTTP_MAX_RETRIES, HTTP_TCP_KEEPALIVE
+
+log = logging.getLogger(__name__)
+
+RETRIES = metrics.counter("http_retries_total", "LLM HTTP requests retried after a failed connect")
+_local = threading.local()
+
+
+def thread_retries():
+    """Retries made so far by requests on the calling thread."""
+    return getattr(_local, "retries", 0)
+
+
+def _keepalive_socket_options():
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # Linux / macOS knobs; start probing after 30s idle, every 10s
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10))
+    return options
+
+
+class _CountingRetry(Retry):
+    def increment(self, *args, **kwargs):
+        # Raises once retries are exhausted, so only real retries are counted
+        retry = super().increment(*args, **kwargs)
+        RETRIES.inc()
+        _local.retries = thread_retries() + 1
+        return retry
+
+
+class PoolAdapter(HTTPAdapter):
+    """HTTPAdapter with a blocking pool of fixed size and optional TCP keep-alive."""
+
+    def __init__(self, pool_size, max_retries=HTTP_MAX_RETRIES, tcp_keepalive=HTTP_TCP_KEEPALIVE):
+        self.pool_size = pool_size
+        self.tcp_keepalive = tcp_keepalive
+        # Only retry failed connects: the request never reached the server,
+        # so it is safe even for POST. Read and status errors surface as-is.
+        retries = _CountingRetry(total=max_retries, connect=max_retries, read=0, status=0,
+                                 other=0, backoff_factor=0.2, raise_on_status=False)
+        # pool_block keeps the pool at pool_size instead of opening extra
+        # connections under load and discarding them afterwards.
+        super().__init__(pool_connections=4, pool_maxsize=pool_size,
+                         max_retries=retries, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.tcp_keepalive:
+            kwargs["socket_options"] = _keepalive_socket_options()
+        super().init_poolmanager(*args, **kwargs)
+
+    def connection_counts(self):
+        opened = requests_sent = 0
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+        return opened, requests_sent
+
+
+class PooledSession(requests.Session):
+    """Session with per-endpoint adapters, idle reaping and reuse statistics."""
+
+    def __init__(self, idle_timeout=HTTP_IDLE_TIMEOUT):
+        super().__init__()
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        self._retired = [0, 0]   # opened / requests of pools closed by reaping
+        self._reaped = 0
+
+    def mount_endpoint(self, prefix, pool_size, **adapter_kwargs):
+        adapter = PoolAdapter(pool_size, **adapter_kwargs)
+        with self._lock:
+            old = self.adapters.get(prefix)
+            if isinstance(old, PoolAdapter):
+                self._retire(old)
+            self.mount(prefix, adapter)
+        return adapter
+
+    def ensure_capacity(self, prefix, pool_size):
+        """Grow the pool for prefix so pool_size requests can run at once."""
+        adapter = self.adapters.get(prefix)
+        if isinstance(adapter, PoolAdapter) and adapter.pool_size >= pool_size:
+            return adapter
+        log.info("Growing HTTP pool for %s to %d connections", prefix, pool_size)
+        return self.mount_endpoint(prefix, pool_size)
+
+    def request(self, method, url, *args, **kwargs):
+        now = time.monotonic()
+        if self.idle_timeout and now - self._last_used > self.idle_timeout:
+            # The server has most likely dropped our idle keep-alive sockets;
+            # close them rather than fail the first request on a dead one.
+            self.reap_idle()
+        self._last_used = now
+        return super().request(method, url, *args, **kwargs)
+
+    def reap_idle(self):
+        with self._lock:
+            for adapter in self.adapters.values():
+                if isinstance(adapter, PoolAdapter):
+                    self._retire(adapter)
+                    adapter.poolmanager.clear()
+            self._reaped += 1
+
+    def _retire(self, adapter):
+        opened, sent = adapter.connection_counts()
+        self._retired[0] += opened
+        self._retired[1] += sent
+
+    def connection_stats(self):
+        with self._lock:
+            opened, sent = self._retired
+            pool_sizes = {}
+            for prefix, adapter in self.adapters.items():
+                if isinstance(adapter, PoolAdapter):
+                    o, s = adapter.connection_counts()
+                    opened += o
+                    sent += s
+                    pool_sizes[prefix] = adapter.pool_size
+            reaped = self._reaped
+        return {
+            "requests": sent,
+            "connections_opened": opened,
+            "connections_reused": max(sent - opened, 0),
+            "reuse_ratio": round(1 - opened / sent, 3) if sent else None,
+            "idle_reaps": reaped,
+            "pool_sizes": pool_sizes,
+        }
+
+
+def build_session(base_url, hot_path, pool_size, idle_timeout=HTTP_IDLE_TIMEOUT):
+    """Session with a pool_size adapter for base_url + hot_path and a small one for the rest."""
+    session = PooledSession(idle_timeout=idle_timeout)
+    session.mount_endpoint(f"{base_url}/", 2)
+    session.mount_endpoint(f"{base_url}{hot_path}", pool_size)
+    return session
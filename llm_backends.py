@@ -0,0 +1,218 @@
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+import requests
+
+from config import (
+    HTTP_POOL_SIZE,
+    LLAMACPP_URL,
+    LLM_WORKERS,
+    OLLAMA_MODEL,
+    OLLAMA_URL,
+    OPENAI_API_KEY,
+    OPENAI_URL,
+)
+from http_pool import build_session
+
+log = logging.getLogger(__name__)
+
+# Usage fields are normalized to Ollama's names (durations in nanoseconds) so
+# callers can treat every backend the same way.
+USAGE_FIELDS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
+
+@dataclass
+class ChatResult:
+    content: str
+    usage: dict = field(default_factory=dict)
+
+
+class InferenceBackend(ABC):
+    name = None
+    default_url = None
+    chat_path = None
+    # Parallel requests the server handles well, and whether it batches
+    # concurrent requests together (continuous batching) or queues them.
+    default_concurrency = 1
+    continuous_batching = False
+
+    def __init__(self, url=None, model=None, concurrency=None, timeout=120):
+        self.url = (url or self.default_url).rstrip("/")
+        self.model = model or OLLAMA_MODEL
+        self.max_concurrency = concurrency or self.default_concurrency
+        self.timeout = timeout
+        self.session = build_session(
+            self.url, self.chat_path, HTTP_POOL_SIZE or self.max_concurrency
+        )
+
+    def ensure_concurrency(self, workers):
+        self.session.ensure_capacity(f"{self.url}{self.chat_path}", workers)
+
+    def connection_stats(self):
+        return self.session.connection_stats()
+
+    def describe(self):
+        batching = "continuous batching" if self.continuous_batching else "queued"
+        return f"{self.name} at {self.url} ({self.max_concurrency} parallel, {batching})"
+
+    @abstractmethod
+    def check_available(self):
+        """(ok, message) for the server and model."""
+
+    @abstractmethod
+    def chat(self, system, user, max_tokens=10, temperature=0.1):
+        """One chat completion as a ChatResult."""
+
+
+class OllamaBackend(InferenceBackend):
+    name = "ollama"
+    default_url = OLLAMA_URL
+    chat_path = "/api/chat"
+    default_concurrency = LLM_WORKERS
+
+    def check_available(self):
+        try:
+            r = self.session.get(f"{self.url}/api/tags", timeout=5)
+            r.raise_for_status()
+            models = [m["name"] for m in r.json().get("models", [])]
+            if not any(self.model in m for m in models):
+                return False, f"Model '{self.model}' not found. Available: {models}"
+            return True, "OK"
+        except requests.ConnectionError:
+            return False, f"Cannot connect to Ollama at {self.url}"
+        except Exception as e:
+            return False, str(e)
+
+    def chat(self, system, user, max_tokens=10, temperature=0.1):
+        r = self.session.post(
+            f"{self.url}{self.chat_path}",
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                "stream": False,
+                "options": {
+                    "temperature": temperature,
+                    "num_predict": max_tokens,
+                },
+            },
+            timeout=self.timeout,
+        )
+        r.raise_for_status()
+        data = r.json()
+        usage = {k: data[k] for k in USAGE_FIELDS if k in data}
+        return ChatResult(data["message"]["content"], usage)
+
+
+class OpenAICompatibleBackend(InferenceBackend):
+    name = "openai"
+    default_url = OPENAI_URL
+    chat_path = "/v1/chat/completions"
+    default_concurrency = 16
+    continuous_batching = True
+
+    def __init__(self, url=None, model=None, concurrency=None, timeout=120, api_key=None):
+        super().__init__(url, model, concurrency, timeout)
+        api_key = OPENAI_API_KEY if api_key is None else api_key
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def check_available(self):
+        try:
+            r = self.session.get(f"{self.url}/v1/models", timeout=5)
+            r.raise_for_status()
+            models = [m["id"] for m in r.json().get("data", [])]
+            if models and not any(self.model in m for m in models):
+                return False, f"Model '{self.model}' not found. Available: {models}"
+            return True, "OK"
+        except requests.ConnectionError:
+            return False, f"Cannot connect to {self.name} server at {self.url}"
+        except Exception as e:
+            return False, str(e)
+
+    def chat(self, system, user, max_tokens=10, temperature=0.1):
+        r = self.session.post(
+            f"{self.url}{self.chat_path}",
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stream": False,
+            },
+            timeout=self.timeout,
+        )
+        r.raise_for_status()
+        data = r.json()
+        return ChatResult(data["choices"][0]["message"]["content"], self._usage(data))
+
+    def _usage(self, data):
+        usage = {}
+        counts = data.get("usage") or {}
+        if "prompt_tokens" in counts:
+            usage["prompt_eval_count"] = counts["prompt_tokens"]
+        if "completion_tokens" in counts:
+            usage["eval_count"] = counts["completion_tokens"]
+        return usage
+
+
+class LlamaCppBackend(OpenAICompatibleBackend):
+    name = "llamacpp"
+    default_url = LLAMACPP_URL
+    # Matches a llama-server started with --parallel 8.
+    default_concurrency = 8
+
+    def check_available(self):
+        try:
+            r = self.session.get(f"{self.url}/health", timeout=5)
+            if r.status_code == 503:
+                return False, "llama.cpp server is still loading the model"
+            r.raise_for_status()
+            return True, "OK"
+        except requests.ConnectionError:
+            return False, f"Cannot connect to llama.cpp server at {self.url}"
+        except Exception as e:
+            return False, str(e)
+
+    def _usage(self, data):
+        usage = super()._usage(data)
+        timings = data.get("timings") or {}
+        if "prompt_n" in timings:
+            usage["prompt_eval_count"] = timings["prompt_n"]
+            usage["prompt_eval_duration"] = int(timings.get("prompt_ms", 0) * 1e6)
+        if "predicted_n" in timings:
+            usage["eval_count"] = timings["predicted_n"]
+            usage["eval_duration"] = int(timings.get("predicted_ms", 0) * 1e6)
+        if "prompt_eval_duration" in usage or "eval_duration" in usage:
+            usage["total_duration"] = (
+                usage.get("prompt_eval_duration", 0) + usage.get("eval_duration", 0)
+            )
+        return usage
+
+
+BACKENDS = {
+    cls.name: cls for cls in (OllamaBackend, LlamaCppBackend, OpenAICompatibleBackend)
+}
+
+
+def create_backend(name, url=None, model=None, concurrency=None, **kwargs):
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown LLM backend '{name}'. Available: {sorted(BACKENDS)}"
+        ) from None
+    return cls(url=url, model=model, concurrency=concurrency, **kwargs)
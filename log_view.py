@@ -0,0 +1,207 @@
+import re
+import tkinter as tk
+import webbrowser
+from collections import deque
+from pathlib import Path
+from tkinter import ttk
+from typing import NamedTuple
+
+from config import GUI_LOG_CAPACITY, LOG_FILE
+
+LEVELS = ("info", "warning", "error")
+_VERDICT_RE = re.compile(r"^\[\d+/\d+\] (IMPORTANT|LOW_PRIORITY):")
+
+
+class LogLine(NamedTuple):
+    seq: int
+    level: str
+    verdict: str  # "important", "low_priority" or "" for non-verdict lines
+    text: str
+
+
+def parse_line(seq, text):
+    upper = text[:8].upper()
+    if upper.startswith("ERROR"):
+        level = "error"
+    elif upper.startswith("WARN"):
+        level = "warning"
+    else:
+        level = "info"
+    m = _VERDICT_RE.match(text)
+    return LogLine(seq, level, m.group(1).lower() if m else "", text)
+
+
+class LogBuffer:
+    """The newest `capacity` log lines plus the filtered view the GUI renders.
+
+    The view is kept up to date as lines arrive and fall off the front, so
+    appending and rendering a window of it cost the same at any run size.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or GUI_LOG_CAPACITY
+        self._lines = deque(maxlen=self.capacity)
+        self._seq = 0
+        self.dropped = 0
+        self.levels = set(LEVELS)
+        self.verdict = ""   # "" shows every line
+        self.search = ""
+        self._view = []
+        self._view_start = 0
+
+    def append(self, text):
+        self._seq += 1
+        line = parse_line(self._seq, text)
+        if len(self._lines) == self.capacity:
+            evicted = self._lines[0]
+            self.dropped += 1
+            if self._view_start < len(self._view) and self._view[self._view_start] is evicted:
+                self._view_start += 1
+                if self._view_start > len(self._view) // 2:
+                    del self._view[: self._view_start]
+                    self._view_start = 0
+        self._lines.append(line)
+        if self._matches(line):
+            self._view.append(line)
+
+    def extend(self, texts):
+        for text in texts:
+            self.append(text)
+
+    def set_filter(self, levels=None, verdict=None, search=None):
+        if levels is not None:
+            self.levels = set(levels)
+        if verdict is not None:
+            self.verdict = verdict
+        if search is not None:
+            self.search = search.lower()
+        self._view = [line for line in self._lines if self._matches(line)]
+        self._view_start = 0
+
+    def _matches(self, line):
+        return (
+            line.level in self.levels
+            and (not self.verdict or line.verdict == self.verdict)
+            and (not self.search or self.search in line.text.lower())
+        )
+
+    def __len__(self):
+        """Number of lines in the filtered view."""
+        return len(self._view) - self._view_start
+
+    def window(self, start, count):
+        start = max(0, min(start, len(self) - 1))
+        begin = self._view_start + start
+        return self._view[begin:begin + count]
+
+    def clear(self):
+        self._lines.clear()
+        self._view = []
+        self._view_start = 0
+
+
+class LogView(ttk.Frame):
+    """Filterable log that only renders the lines currently on screen."""
+
+    def __init__(self, parent, buffer=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.buffer = buffer or LogBuffer()
+        self.first = 0          # index of the top visible line in the view
+        self.follow = True      # keep the newest line in view
+
+        bar = ttk.Frame(self)
+        bar.pack(side="top", fill="x", pady=(0, 5))
+        ttk.Label(bar, text="Show:").pack(side="left")
+        self.level_var = tk.StringVar(value="All")
+        level_box = ttk.Combobox(
+            bar, textvariable=self.level_var, state="readonly", width=9,
+            values=("All", "Warnings", "Errors"),
+        )
+        level_box.pack(side="left", padx=(5, 10))
+        self.verdict_var = tk.StringVar(value="All verdicts")
+        verdict_box = ttk.Combobox(
+            bar, textvariable=self.verdict_var, state="readonly", width=13,
+            values=("All verdicts", "Important", "Low Priority"),
+        )
+        verdict_box.pack(side="left", padx=(0, 10))
+        self.search_var = tk.StringVar()
+        search = ttk.Entry(bar, textvariable=self.search_var, width=20)
+        search.pack(side="left")
+        ttk.Button(bar, text="Open full log", command=self.open_log_file).pack(side="right")
+        for box in (level_box, verdict_box):
+            box.bind("<<ComboboxSelected>>", lambda e: self._apply_filter())
+        search.bind("<KeyRelease>", lambda e: self._apply_filter())
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.text = tk.Text(self, height=10, wrap="none", state="disabled")
+        self.text.pack(side="left", fill="both", expand=True)
+        self.text.bind("<Configure>", lambda e: self.render())
+        self.text.bind("<MouseWheel>", self._on_wheel)
+        self.text.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.text.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def extend(self, lines):
+        self.buffer.extend(lines)
+        self.render()
+
+    def clear(self):
+        self.buffer.clear()
+        self.first = 0
+        self.follow = True
+        self.render()
+
+    def _visible_rows(self):
+        linespace = max(1, self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace"))
+        return max(1, self.text.winfo_height() // linespace)
+
+    def render(self):
+        rows = self._visible_rows()
+        total = len(self.buffer)
+        if self.follow:
+            self.first = max(0, total - rows)
+        self.first = max(0, min(self.first, max(0, total - rows)))
+
+        lines = self.buffer.window(self.first, rows) if total else []
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("end", "\n".join(f"> {line.text}" for line in lines))
+        self.text.config(state="disabled")
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, delta):
+        rows = self._visible_rows()
+        self.first = max(0, self.first + delta)
+        self.follow = self.first + rows >= len(self.buffer)
+        self.render()
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        rows = self._visible_rows()
+        if action == "moveto":
+            self.first = int(float(amount) * len(self.buffer))
+            self.follow = self.first + rows >= len(self.buffer)
+            self.render()
+        elif action == "scroll":
+            self.scroll(int(amount) * (rows if unit == "pages" else 1))
+
+    def _apply_filter(self):
+        levels = {"All": LEVELS, "Warnings": ("warning", "error"), "Errors": ("error",)}
+        verdicts = {"All verdicts": "", "Important": "important", "Low Priority": "low_priority"}
+        self.buffer.set_filter(
+            levels=levels[self.level_var.get()],
+            verdict=verdicts[self.verdict_var.get()],
+            search=self.search_var.get(),
+        )
+        self.follow = True
+        self.render()
+
+    @staticmethod
+    def open_log_file():
+        # The complete history, including lines the buffer has dropped
+        webbrowser.open(Path(LOG_FILE).resolve().as_uri())
@@ -1,20 +1,21 @@
+import startup  # first, so startup timings are measured from process start
+
 import logging
 import os
-import tkinter as tk
+import sys
 from logging.handlers import RotatingFileHandler
 
 from config import CREDENTIALS_DIR, LOG_FILE, OUTPUT_DIR
-from gui import GmailCleanupGUI
 
 
-def main():
+def setup_logging(level=logging.INFO):
     os.makedirs(CREDENTIALS_DIR, exist_ok=True)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     log_format = "%(asctime)s %(levelname)s %(name)s: %(message)s"
 
     logging.basicConfig(
-        level=logging.INFO,
+        level=level,
         format=log_format,
     )
 
@@ -25,10 +26,23 @@ def main():
     file_handler.setFormatter(logging.Formatter(log_format))
     logging.getLogger().addHandler(file_handler)
 
+
+def main():
+    # Any arguments select the headless CLI, which must not touch Tk
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        return cli_main(sys.argv[1:])
+
+    setup_logging()
+
+    with startup.timed("import_gui"):
+        import tkinter as tk
+        from gui import GmailCleanupGUI
+
     root = tk.Tk()
     GmailCleanupGUI(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""Process-wide counters, gauges and histograms, exported for monitoring.
+
+Modules declare their metrics at import time (metrics.counter(...) etc.) and
+update them inline. The values can be served in the Prometheus text format
+from a local HTTP endpoint (MetricsServer) and written to a JSON file every
+few seconds (SnapshotWriter), so scheduled headless runs can be scraped or
+tailed by whatever does the alerting.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_HOST, METRICS_PORT, METRICS_SNAPSHOT_FILE, METRICS_SNAPSHOT_SECONDS
+
+log = logging.getLogger(__name__)
+
+# Seconds; from a cached Gmail call to a cold model load
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                f"Metric '{self.name}' takes labels {list(self.labels)}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def _label_dict(self, key):
+        return dict(zip(self.labels, key))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._label_dict(k), v) for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed, cumulative buckets plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (not cumulative), then sum
+                series = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def value(self, **labels):
+        """{"count": n, "sum": s, "buckets": {bound: cumulative count}} for one series."""
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            series = list(series) if series else [0] * len(self.buckets) + [0.0]
+        return self._summarize(series)
+
+    def _summarize(self, series):
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.buckets, series):
+            cumulative += n
+            buckets[_format_value(bound)] = cumulative
+        return {"count": cumulative, "sum": round(series[-1], 6), "buckets": buckets}
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        samples = []
+        for key, series in items:
+            labels = self._label_dict(key)
+            summary = self._summarize(series)
+            for bound, n in summary["buckets"].items():
+                samples.append((f"{self.name}_bucket", {**labels, "le": bound}, n))
+            samples.append((f"{self.name}_sum", labels, summary["sum"]))
+            samples.append((f"{self.name}_count", labels, summary["count"]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            elif type(metric) is not cls or metric.labels != tuple(labels):
+                raise ValueError(f"Metric '{name}' is already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda m: m.name)
+
+    def reset(self):
+        for metric in self.metrics():
+            metric.reset()
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """{name: value} for unlabeled metrics, {name: [{labels..., "value": v}]} otherwise."""
+        snap = {}
+        for metric in self.metrics():
+            with metric._lock:
+                keys = list(metric._values)
+            if not metric.labels:
+                snap[metric.name] = metric.value()
+            else:
+                snap[metric.name] = [
+                    {**metric._label_dict(key), "value": metric.value(**metric._label_dict(key))}
+                    for key in keys
+                ]
+        return snap
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return str(value)
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text format) and /metrics.json on a local port."""
+
+    def __init__(self, port=None, host=None, registry=REGISTRY):
+        # Only needed when the endpoint is enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry_.render_prometheus().encode()
+                    ctype = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry_.snapshot()).encode()
+                    ctype = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug("metrics: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host or METRICS_HOST, METRICS_PORT if port is None else port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        log.info("Serving metrics on http://%s:%d/metrics", *self._server.server_address[:2])
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SnapshotWriter:
+    """Rewrites a JSON snapshot of the registry every `interval` seconds, and once more on stop()."""
+
+    def __init__(self, path, interval=None, registry=REGISTRY):
+        self.path = path
+        self.interval = interval or METRICS_SNAPSHOT_SECONDS
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        data = {"time": round(time.time(), 3), "metrics": self.registry.snapshot()}
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.warning("Could not write metrics snapshot %s: %s", self.path, e)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
+
+
+def start_exporters(port=None, snapshot_file=None, interval=None):
+    """Start the HTTP endpoint and the snapshot file writer, each only when configured.
+
+    Returns the started exporters; pass them to stop_exporters() on shutdown.
+    """
+    exporters = []
+    port = METRICS_PORT if port is None else port
+    if port is not None:
+        try:
+            exporters.append(MetricsServer(port).start())
+        except OSError as e:
+            log.warning("Metrics endpoint disabled, cannot listen on port %s: %s", port, e)
+    snapshot_file = snapshot_file or METRICS_SNAPSHOT_FILE
+    interval = METRICS_SNAPSHOT_SECONDS if interval is None else interval
+    if snapshot_file and interval:
+        exporters.append(SnapshotWriter(snapshot_file, interval).start())
+    return exporters
+
+
+def stop_exporters(exporters):
+    for exporter in exporters:
+        exporter.stop()
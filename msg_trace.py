@@ -0,0 +1,217 @@
+"""Per-message trace of an engine run, and an analyzer for it.
+
+python msg_trace.py [output/trace.jsonl] [--top N] prints the per-stage
+latency breakdown and the slowest messages of a recorded run.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+from config import TRACE_FILE
+from perf_stats import summarize
+
+log = logging.getLogger(__name__)
+
+# Record fields in pipeline order; a stage's latency is the gap to the previous event
+EVENTS = ("listed", "fetched", "classify_queued", "classify_started", "classified", "labeled")
+STAGES = {
+    "fetched": "fetch",            # waiting for a fetcher plus the metadata batch
+    "classify_queued": "handoff",  # queued between fetchers and classifiers
+    "classify_started": "llm_queue",  # waiting for a free LLM worker
+    "classified": "llm",
+    "labeled": "label",            # label queue plus the modify batch
+}
+_CLOSE = object()
+
+
+class TraceWriter:
+    """Appends records to a JSONL file from a background thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self.written = 0
+        self._queue = queue.SimpleQueue()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        self._queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is _CLOSE:
+                break
+            lines = [record]
+            # Write whatever else is already queued in one go
+            while True:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    record = None
+                    break
+                if record is _CLOSE:
+                    break
+                lines.append(record)
+            self._file.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in lines))
+            self.written += len(lines)
+            if record is _CLOSE:
+                break
+        self._file.close()
+
+    def close(self):
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+
+class MessageTrace:
+    """Collects event timestamps per message and writes one record when it is labeled.
+
+    Only messages in flight are held in memory. The "listed" time is shared
+    by every message of the run (IDs are listed, or loaded from the
+    checkpoint, before any is fetched). close() writes the records of
+    messages that never got labeled, e.g. on stop.
+    """
+
+    def __init__(self, path=None, backend=None, clock=time.time):
+        self.backend = backend
+        self.clock = clock
+        self.listed_at = None
+        self._records = {}
+        self._lock = threading.Lock()
+        self._writer = TraceWriter(path or TRACE_FILE)
+
+    @property
+    def path(self):
+        return self._writer.path
+
+    def listed(self):
+        self.listed_at = self._now()
+
+    def _now(self):
+        return round(self.clock(), 4)
+
+    def mark(self, ids, event, **fields):
+        now = self._now()
+        with self._lock:
+            for mid in ids:
+                record = self._records.get(mid)
+                if record is None:
+                    record = self._records[mid] = {
+                        "id": mid, "backend": self.backend, "listed": self.listed_at, "retries": 0
+                    }
+                record[event] = now
+                record.update(fields)
+
+    def add_retries(self, mid, retries):
+        if retries:
+            with self._lock:
+                if mid in self._records:
+                    self._records[mid]["retries"] += retries
+
+    def finish(self, ids):
+        self.mark(ids, "labeled")
+        with self._lock:
+            records = [self._records.pop(mid) for mid in ids if mid in self._records]
+        for record in records:
+            self._writer.write(record)
+
+    def close(self):
+        with self._lock:
+            records = list(self._records.values())
+            self._records.clear()
+        for record in records:
+            self._writer.write(record)
+        self._writer.close()
+
+
+def read_trace(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def stage_latencies(record):
+    """{stage: seconds} between consecutive events present in the record."""
+    latencies = {}
+    prev = record.get("listed")
+    for event in EVENTS[1:]:
+        ts = record.get(event)
+        if ts is None:
+            continue
+        if prev is not None:
+            latencies[STAGES[event]] = ts - prev
+        prev = ts
+    return latencies
+
+
+def analyze(records, top=10):
+    """Per-stage latency percentiles (ms) and the `top` slowest messages end to end."""
+    per_stage = {stage: [] for stage in STAGES.values()}
+    slowest = []
+    count = 0
+    for record in records:
+        count += 1
+        latencies = stage_latencies(record)
+        for stage, seconds in latencies.items():
+            per_stage[stage].append(seconds)
+        if latencies:
+            total = sum(latencies.values())
+            entry = (total, record["id"], latencies, record.get("retries", 0))
+            if len(slowest) < top:
+                slowest.append(entry)
+                slowest.sort(reverse=True)
+            elif total > slowest[-1][0]:
+                slowest[-1] = entry
+                slowest.sort(reverse=True)
+    return {
+        "messages": count,
+        "stages_ms": {stage: summarize(v, scale=1e-3) for stage, v in per_stage.items() if v},
+        "slowest": [
+            {
+                "id": mid,
+                "total_ms": round(total * 1e3, 1),
+                "retries": retries,
+                "stages_ms": {s: round(v * 1e3, 1) for s, v in latencies.items()},
+            }
+            for total, mid, latencies, retries in slowest
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a per-message trace.")
+    parser.add_argument("path", nargs="?", default=TRACE_FILE)
+    parser.add_argument("--top", type=int, default=10, help="slowest messages to list")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = analyze(read_trace(args.path), top=args.top)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"{result['messages']} messages")
+    print(f"{'stage':<10} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for stage, s in result["stages_ms"].items():
+        print(
+            f"{stage:<10} {s['count']:>7} {s['mean']:>9} {s['p50']:>9} {s['p95']:>9} {s['p99']:>9} {s['max']:>9}"
+        )
+    print("\nSlowest messages:")
+    for entry in result["slowest"]:
+        stages = ", ".join(f"{s} {v}" for s, v in entry["stages_ms"].items())
+        print(f"  {entry['id']}  {entry['total_ms']} ms  ({stages}; retries {entry['retries']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
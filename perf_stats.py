@@ -0,0 +1,32 @@
+import math
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile (q in 0..100) of an already sorted sequence."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = math.ceil(pos)
+    if lo == hi:
+        return sorted_values[lo]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(values, scale=1.0, digits=1):
+    """count/mean/p50/p95/p99/max of values, each divided by scale."""
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def fmt(v):
+        return round(v / scale, digits)
+
+    return {
+        "count": len(values),
+        "mean": fmt(sum(values) / len(values)),
+        "p50": fmt(percentile(values, 50)),
+        "p95": fmt(percentile(values, 95)),
+        "p99": fmt(percentile(values, 99)),
+        "max": fmt(values[-1]),
+    }
@@ -0,0 +1,119 @@
+import logging
+import queue
+import threading
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+QUEUE_DEPTH = metrics.gauge("pipeline_queue_depth", "Items waiting in a stage's inbox", ("stage",))
+STAGE_SECONDS = metrics.histogram("pipeline_stage_seconds", "Time a stage spends on one item", ("stage",))
+STAGE_ITEMS = metrics.counter("pipeline_items_total", "Items processed per stage", ("stage",))
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a Pipeline: `workers` threads applying fn to items from a bounded inbox.
+
+    fn returns the item to hand to the next stage, or None to hand nothing.
+    When the pipeline is stopped, stages with skip_on_stop discard the items
+    still queued for them; the others keep draining so that work already done
+    upstream is not lost.
+    """
+
+    def __init__(self, name, fn, workers=1, skip_on_stop=True):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.skip_on_stop = skip_on_stop
+        self.inbox = None
+        self.outbox = None
+        self.downstream = None
+        self.processed = 0
+        self._alive = 0
+
+
+class Pipeline:
+    """Stages connected by bounded queues, fed from an iterable on the calling thread.
+
+    A full queue blocks the stage feeding it, so a slow stage applies
+    backpressure all the way to the source instead of letting work pile up in
+    memory.
+    """
+
+    def __init__(self, stages, stop_event=None, queue_size=4):
+        self.stages = stages
+        self.stop_event = stop_event or threading.Event()
+        self.error = None
+        self._lock = threading.Lock()
+        self._threads = []
+        for stage in stages:
+            stage.inbox = queue.Queue(maxsize=queue_size)
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.outbox = downstream.inbox
+            upstream.downstream = downstream.name
+
+    def queue_depths(self):
+        return {stage.name: stage.inbox.qsize() for stage in self.stages}
+
+    def run(self, items):
+        """Feed items through every stage and block until all of them are done.
+
+        Re-raises the first exception raised by any stage.
+        """
+        for stage in self.stages:
+            stage._alive = stage.workers
+            for i in range(stage.workers):
+                t = threading.Thread(
+                    target=self._worker, args=(stage,), name=f"{stage.name}-{i}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+
+        source = self.stages[0].inbox
+        try:
+            for item in items:
+                if self.stop_event.is_set() or self.error is not None:
+                    break
+                source.put(item)
+                QUEUE_DEPTH.set(source.qsize(), stage=self.stages[0].name)
+        finally:
+            source.put(_DONE)
+            for t in self._threads:
+                t.join()
+
+        if self.error is not None:
+            raise self.error
+
+    def _worker(self, stage):
+        while True:
+            item = stage.inbox.get()
+            QUEUE_DEPTH.set(stage.inbox.qsize(), stage=stage.name)
+            if item is _DONE:
+                # Leave the marker for this stage's other workers
+                stage.inbox.put(_DONE)
+                break
+            if self.error is not None or (stage.skip_on_stop and self.stop_event.is_set()):
+                continue
+            try:
+                with STAGE_SECONDS.time(stage=stage.name):
+                    result = stage.fn(item)
+            except BaseException as e:
+                log.exception("Pipeline stage %s failed", stage.name)
+                with self._lock:
+                    if self.error is None:
+                        self.error = e
+                continue
+            with self._lock:
+                stage.processed += 1
+            STAGE_ITEMS.inc(stage=stage.name)
+            if result is not None and stage.outbox is not None:
+                stage.outbox.put(result)
+                QUEUE_DEPTH.set(stage.outbox.qsize(), stage=stage.downstream)
+
+        with self._lock:
+            stage._alive -= 1
+            last = stage._alive == 0
+        if last and stage.outbox is not None:
+            stage.outbox.put(_DONE)
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+# Step states; everything but pending/running is final
+PENDING, RUNNING, OK, FAILED, SKIPPED, CANCELLED = (
+    "pending", "running", "ok", "failed", "skipped", "cancelled"
+)
+FINAL = {OK, FAILED, SKIPPED, CANCELLED}
+
+
+class PreflightError(Exception):
+    """A check failed with a message meant for the user."""
+
+
+@dataclass
+class Step:
+    name: str
+    fn: object          # fn(results) -> result; results holds the `after` steps' results
+    after: tuple = ()
+    required: bool = True
+    label: str = None
+
+
+class Preflight:
+    """Runs startup checks on background threads, each as soon as its dependencies finish.
+
+    Independent steps (e.g. the LLM health check and Gmail auth) overlap, so
+    the whole job takes as long as the slowest chain rather than the sum.
+    cancel() marks unfinished steps cancelled; a step blocked in I/O keeps
+    running in its daemon thread but its result is discarded.
+    """
+
+    def __init__(self, steps):
+        self.steps = {step.name: step for step in steps}
+        self.state = {name: PENDING for name in self.steps}
+        self.results = {}
+        self.errors = {}
+        self.seconds = {}
+        self._cond = threading.Condition()
+        self._cancelled = False
+
+    def start(self):
+        for step in self.steps.values():
+            threading.Thread(
+                target=self._run_step, args=(step,), name=f"preflight-{step.name}", daemon=True
+            ).start()
+        return self
+
+    def _run_step(self, step):
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._cancelled or all(self.state[d] in FINAL for d in step.after)
+            )
+            if self._cancelled:
+                self._finish(step.name, CANCELLED)
+                return
+            if any(self.state[d] != OK for d in step.after):
+                self._finish(step.name, SKIPPED)
+                return
+            deps = {d: self.results[d] for d in step.after}
+            self.state[step.name] = RUNNING
+            self._cond.notify_all()
+
+        started = time.monotonic()
+        try:
+            result = step.fn(deps)
+        except Exception as e:
+            if not isinstance(e, PreflightError):
+                log.exception("Preflight step %s failed", step.name)
+            with self._cond:
+                self.seconds[step.name] = round(time.monotonic() - started, 3)
+                self.errors[step.name] = str(e)
+                self._finish(step.name, CANCELLED if self._cancelled else FAILED)
+            return
+        with self._cond:
+            self.seconds[step.name] = round(time.monotonic() - started, 3)
+            if self._cancelled:
+                self._finish(step.name, CANCELLED)
+            else:
+                self.results[step.name] = result
+                self._finish(step.name, OK)
+
+    def _finish(self, name, state):
+        self.state[name] = state
+        self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self._cancelled = True
+            for name, state in self.state.items():
+                if state not in FINAL:
+                    self.state[name] = CANCELLED
+            self._cond.notify_all()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def ready(self):
+        """All required steps succeeded."""
+        with self._cond:
+            return all(self.state[n] == OK for n, s in self.steps.items() if s.required)
+
+    def failures(self):
+        """{step: error} for required steps that failed or could not run."""
+        with self._cond:
+            return {
+                n: self.errors.get(n, "a step it depends on failed")
+                for n, s in self.steps.items()
+                if s.required and self.state[n] in (FAILED, SKIPPED)
+            }
+
+    def finished(self):
+        with self._cond:
+            return all(state in FINAL for state in self.state.values())
+
+    def wait(self, timeout=None):
+        """Block until the required steps are done, one fails, or cancel(); returns ready()."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._cancelled
+                or all(self.state[n] in FINAL for n, s in self.steps.items() if s.required),
+                timeout,
+            )
+        return self.ready() and not self._cancelled
+
+    def describe(self):
+        """One-line status, e.g. "LLM: ok, Gmail: running"."""
+        with self._cond:
+            return ", ".join(
+                f"{step.label or step.name}: {self.state[name]}" for name, step in self.steps.items()
+            )
+
+
+def run_steps(backend, service=None):
+    """The checks needed before a run: LLM health, Gmail auth, and the account address."""
+
+    def check_llm(_):
+        ok, msg = backend.check_available()
+        if not ok:
+            raise PreflightError(msg)
+        return backend
+
+    def auth_gmail(_):
+        if service is not None:
+            return service
+        from gmail_auth import get_gmail_service
+
+        return get_gmail_service()
+
+    def fetch_profile(deps):
+        return deps["gmail"].users().getProfile(userId="me").execute()["emailAddress"]
+
+    return [
+        Step("llm", check_llm, label="LLM"),
+        Step("gmail", auth_gmail, label="Gmail"),
+        Step("profile", fetch_profile, after=("gmail",), required=False, label="Account"),
+    ]
@@ -0,0 +1,259 @@
+"""CPU and allocation profiling of an engine run.
+
+RunProfiler covers the engine thread and every thread started while it is
+active (pipeline workers, LLM pools), either with cProfile or with a
+low-overhead stack sampler. With memory profiling on, tracemalloc snapshots
+taken at phase boundaries record what was allocated in between. Artifacts go
+to a per-run directory under PROFILE_DIR.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from config import PROFILE_DIR, PROFILE_MODES, PROFILE_SAMPLE_INTERVAL
+
+log = logging.getLogger(__name__)
+
+# Lines listed in the text summaries
+_TOP = 40
+
+
+class _CProfileCollector:
+    """One cProfile.Profile per thread, merged into one set of stats at the end.
+
+    Before Python 3.12 a profile only sees the thread that enabled it, so new
+    threads enable their own via threading.setprofile. From 3.12 a single
+    profile already covers every thread.
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+        self._per_thread = sys.version_info < (3, 12)
+
+    def _new_profile(self):
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def _thread_hook(self, frame, event, arg):
+        # Runs once in each new thread, then the profile replaces this hook
+        sys.setprofile(None)
+        self._new_profile()
+
+    def start(self):
+        if self._per_thread:
+            threading.setprofile(self._thread_hook)
+        self._new_profile()
+
+    def stop(self):
+        if self._per_thread:
+            threading.setprofile(None)
+        with self._lock:
+            profiles = list(self.profiles)
+        for profile in profiles:
+            # Only affects the calling thread; the others' threads have ended
+            profile.disable()
+        return profiles
+
+    def write(self, out_dir):
+        stats = None
+        for profile in self.stop():
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                pass  # a thread that made no calls
+        if stats is None:
+            return []
+        prof_path = os.path.join(out_dir, "cpu.prof")
+        stats.dump_stats(prof_path)
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(_TOP)
+        stats.sort_stats("tottime").print_stats(_TOP)
+        txt_path = os.path.join(out_dir, "cpu.txt")
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        return [prof_path, txt_path]
+
+
+class StackSampler:
+    """Samples every thread's stack each `interval` seconds from a background thread.
+
+    Costs one frame walk per thread per sample instead of a hook on every
+    call, so it is safe to leave on for production-sized runs. Stacks are
+    kept as folded "thread;outer;...;inner" counts, the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or PROFILE_SAMPLE_INTERVAL
+        self.samples = 0
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)).split("-")[0])
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def top(self, n=_TOP):
+        """(function, self samples, inclusive samples) for the n busiest functions."""
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        return [(fn, own[fn], inclusive[fn]) for fn, _ in inclusive.most_common(n)]
+
+    def write(self, out_dir):
+        self.stop()
+        folded_path = os.path.join(out_dir, "samples.folded")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        txt_path = os.path.join(out_dir, "samples.txt")
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(f"{self.samples} samples every {self.interval * 1000:g} ms\n\n")
+            f.write(f"{'self':>7} {'total':>7}  function\n")
+            for fn, own, inclusive in self.top():
+                f.write(f"{own:>7} {inclusive:>7}  {fn}\n")
+        return [folded_path, txt_path]
+
+
+class MemoryMarks:
+    """tracemalloc snapshots at named points; each mark records the growth since the previous one."""
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.marks = []
+        self._previous = None
+        self._started_here = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+        self._previous = tracemalloc.take_snapshot()
+
+    def mark(self, name, top=10):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        growth = snapshot.compare_to(self._previous, "lineno")[:top]
+        self._previous = snapshot
+        self.marks.append({
+            "mark": name,
+            "current_mb": round(current / 2**20, 2),
+            "peak_mb": round(peak / 2**20, 2),
+            "top_growth": [
+                {
+                    "where": str(stat.traceback[0]),
+                    "size_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count_diff,
+                }
+                for stat in growth
+            ],
+        })
+
+    def stop(self):
+        if self._started_here:
+            tracemalloc.stop()
+            self._started_here = False
+
+    def write(self, out_dir):
+        self.stop()
+        path = os.path.join(out_dir, "memory.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.marks, f, indent=2)
+        return [path]
+
+
+class RunProfiler:
+    """Profiles one engine run; start() on the engine thread, finish() when the run ends."""
+
+    def __init__(self, mode=None, memory=False, out_dir=None, interval=None):
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Available: {list(PROFILE_MODES)}")
+        self.mode = mode
+        self.out_dir = out_dir or os.path.join(PROFILE_DIR, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.cpu = {"cprofile": _CProfileCollector, "sample": lambda: StackSampler(interval)}.get(
+            mode, lambda: None
+        )()
+        self.memory = MemoryMarks() if memory else None
+        self._started = None
+
+    def __bool__(self):
+        return self.cpu is not None or self.memory is not None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.memory is not None:
+            self.memory.start()
+        if self.cpu is not None:
+            self.cpu.start()
+        return self
+
+    def mark(self, name):
+        if self.memory is not None:
+            self.memory.mark(name)
+
+    def finish(self):
+        """Stop profiling and write the artifacts; returns the directory they are in."""
+        seconds = round(time.perf_counter() - self._started, 3)
+        if self.memory is not None:
+            self.memory.mark("end")
+        os.makedirs(self.out_dir, exist_ok=True)
+        files = []
+        for part in (self.cpu, self.memory):
+            if part is not None:
+                files.extend(part.write(self.out_dir))
+        with open(os.path.join(self.out_dir, "profile.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "mode": self.mode,
+                    "memory": self.memory is not None,
+                    "seconds": seconds,
+                    "files": [os.path.basename(p) for p in files],
+                },
+                f,
+                indent=2,
+            )
+        log.info("Profile written to %s", self.out_dir)
+        return self.out_dir
@@ -0,0 +1,373 @@
+"""Record Gmail and LLM traffic from a real run, and replay it deterministically.
+
+Recording wraps the Gmail service and the inference backend. Each Gmail API
+request (including every entry of a batch) and each LLM chat call is
+appended to a gzip-compressed JSONL archive with its response and round-trip
+time. Replaying puts a service and a backend built from the archive in front
+of the unchanged GmailClient and llm_classifier. Each call sleeps for its
+recorded time divided by `speed` (0 means no delay), so a production run's
+traffic shape can be rerun offline as a performance regression test.
+
+    python main.py --record output/run.replay.gz
+    python main.py --replay output/run.replay.gz --replay-speed 10
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from llm_backends import ChatResult
+
+log = logging.getLogger(__name__)
+
+FORMAT = "gmail-cleanup-replay"
+VERSION = 1
+# Resource methods; any other call on a resource builds a request
+_RESOURCES = ("users", "messages", "labels")
+
+
+class ReplayError(Exception):
+    """A request the archive has no recorded response for, or a recorded failure."""
+
+
+# (module, attribute, file name): everything a run writes, redirected to a scratch dir
+_OUTPUT_PATHS = (
+    ("state", "CHECKPOINT_FILE", "checkpoint.json"),
+    ("compact_state", "COMPACT_CHECKPOINT_FILE", "checkpoint.bin"),
+    ("sqlite_state", "STATE_DB_FILE", "state.sqlite3"),
+    ("details_store", "DETAILS_SPILL_FILE", "details.sqlite3"),
+    ("classifier_engine", "REPORT_FILE", "report.html"),
+    ("classifier_engine", "RUN_HISTORY_FILE", "run_history.jsonl"),
+)
+
+
+@contextmanager
+def isolated_output(workdir):
+    """Point the run's checkpoint, report and history files into `workdir` for the duration."""
+    saved = []
+    for module_name, attr, filename in _OUTPUT_PATHS:
+        module = sys.modules.get(module_name) or __import__(module_name)
+        saved.append((module, attr, getattr(module, attr)))
+        setattr(module, attr, os.path.join(workdir, filename))
+    try:
+        yield
+    finally:
+        for module, attr, value in saved:
+            setattr(module, attr, value)
+
+
+def _request_key(method, kwargs):
+    return method + " " + json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def _prompt_key(system, user):
+    return hashlib.sha256(f"{system}\0{user}".encode("utf-8")).hexdigest()
+
+
+def run_archive_path(path, when=None):
+    """`path` stamped with the run's start time: run.replay.gz -> run-20250101-120000.replay.gz."""
+    directory, name = os.path.split(path)
+    stem, dot, ext = name.partition(".")
+    stamped = f"{stem}-{(when or datetime.now()).strftime('%Y%m%d-%H%M%S')}"
+    candidate, n = os.path.join(directory, stamped + dot + ext), 1
+    while os.path.exists(candidate):
+        n += 1
+        candidate = os.path.join(directory, f"{stamped}-{n}{dot}{ext}")
+    return candidate
+
+
+class Recorder:
+    """Appends traffic records to a gzip JSONL archive; safe to call from any thread."""
+
+    def __init__(self, path, backend=None):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=5)
+        self._write({
+            "format": FORMAT,
+            "version": VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "backend": backend.describe() if backend is not None else None,
+            "concurrency": getattr(backend, "max_concurrency", None),
+        })
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def record(self, kind, key, duration, response=None, error=None):
+        record = {
+            "kind": kind,
+            "key": key,
+            "at": round(time.monotonic() - self._started, 4),
+            "duration": round(duration, 5),
+        }
+        if error is not None:
+            record["error"] = error
+        else:
+            record["response"] = response
+        self._write(record)
+        with self._lock:
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+# --- Recording wrappers ---
+
+
+class _RecordingRequest:
+    def __init__(self, recorder, request, key):
+        self._recorder = recorder
+        self._request = request
+        self._key = key
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self._request.execute(*args, **kwargs)
+        except Exception as e:
+            self._recorder.record("gmail", self._key, time.perf_counter() - started, error=str(e))
+            raise
+        self._recorder.record("gmail", self._key, time.perf_counter() - started, response=response)
+        return response
+
+
+class _RecordingBatch:
+    def __init__(self, recorder, batch):
+        self._recorder = recorder
+        self._batch = batch
+        self._entries = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._entries.append((request._key, callback, request_id))
+        self._batch.add(request._request, callback=self._callback, request_id=request_id)
+
+    def _callback(self, request_id, response, exception):
+        self._results[request_id] = (response, exception)
+
+    def execute(self, *args, **kwargs):
+        self._results = {}
+        started = time.perf_counter()
+        self._batch.execute(*args, **kwargs)
+        # One round trip for the whole batch, spread over its entries
+        share = (time.perf_counter() - started) / max(len(self._entries), 1)
+        for key, callback, request_id in self._entries:
+            response, exception = self._results.get(request_id, (None, None))
+            if exception is not None:
+                self._recorder.record("gmail", key, share, error=str(exception))
+            else:
+                self._recorder.record("gmail", key, share, response=response)
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class _RecordingResource:
+    def __init__(self, recorder, resource, name):
+        self._recorder = recorder
+        self._resource = resource
+        self._name = name
+
+    def __getattr__(self, attr):
+        method = getattr(self._resource, attr)
+
+        def call(**kwargs):
+            result = method(**kwargs)
+            if attr in _RESOURCES:
+                return _RecordingResource(self._recorder, result, attr)
+            return _RecordingRequest(self._recorder, result, _request_key(f"{self._name}.{attr}", kwargs))
+
+        return call
+
+
+class RecordingGmailService:
+    """Wraps a Gmail API service and records every request it executes."""
+
+    def __init__(self, service, recorder):
+        self._service = service
+        self._recorder = recorder
+        # GmailClient builds per-thread connections from the service's credentials
+        self._http = getattr(service, "_http", None)
+
+    def users(self):
+        return _RecordingResource(self._recorder, self._service.users(), "users")
+
+    def new_batch_http_request(self, *args, **kwargs):
+        return _RecordingBatch(self._recorder, self._service.new_batch_http_request(*args, **kwargs))
+
+
+class RecordingBackend:
+    """Wraps an inference backend and records every chat call."""
+
+    def __init__(self, backend, recorder):
+        self._backend = backend
+        self._recorder = recorder
+
+    def __getattr__(self, attr):
+        return getattr(self._backend, attr)
+
+    def chat(self, system, user, max_tokens=10, temperature=0.1):
+        key = _prompt_key(system, user)
+        started = time.perf_counter()
+        try:
+            result = self._backend.chat(system, user, max_tokens=max_tokens, temperature=temperature)
+        except Exception as e:
+            self._recorder.record("llm", key, time.perf_counter() - started, error=str(e))
+            raise
+        self._recorder.record(
+            "llm", key, time.perf_counter() - started,
+            response={"content": result.content, "usage": result.usage},
+        )
+        return result
+
+
+# --- Replay ---
+
+
+class Archive:
+    """Recorded responses by request, in recording order."""
+
+    def __init__(self, header, entries):
+        self.header = header
+        self._entries = entries
+        self._lock = threading.Lock()
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        entries = defaultdict(deque)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT:
+                raise ValueError(f"{path} is not a replay archive")
+            for line in f:
+                record = json.loads(line)
+                entries[(record["kind"], record["key"])].append(record)
+        return cls(header, dict(entries))
+
+    def take(self, kind, key):
+        """The next recorded record for this request; the last one repeats once used up."""
+        with self._lock:
+            queue = self._entries.get((kind, key))
+            if not queue:
+                self.misses += 1
+                raise ReplayError(f"No recorded {kind} response for {key[:120]}")
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def __len__(self):
+        return sum(len(q) for q in self._entries.values())
+
+
+def _replay(record, speed):
+    if speed and record["duration"]:
+        time.sleep(record["duration"] / speed)
+    if "error" in record:
+        raise ReplayError(record["error"])
+    return record["response"]
+
+
+class _ReplayRequest:
+    def __init__(self, service, key):
+        self.service = service
+        self.key = key
+
+    def execute(self, *args, **kwargs):
+        return _replay(self.service.archive.take("gmail", self.key), self.service.speed)
+
+
+class _ReplayBatch:
+    def __init__(self, service):
+        self.service = service
+        self._entries = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._entries.append((request.key, callback, request_id))
+
+    def execute(self, *args, **kwargs):
+        records = []
+        for key, callback, request_id in self._entries:
+            try:
+                records.append((self.service.archive.take("gmail", key), callback, request_id))
+            except ReplayError as e:
+                records.append(({"duration": 0, "error": str(e)}, callback, request_id))
+        # The batch costs what its entries cost together when recorded
+        if self.service.speed:
+            time.sleep(sum(r["duration"] for r, _, _ in records) / self.service.speed)
+        for record, callback, request_id in records:
+            if callback is None:
+                continue
+            if "error" in record:
+                callback(request_id, None, ReplayError(record["error"]))
+            else:
+                callback(request_id, record["response"], None)
+
+
+class _ReplayResource:
+    def __init__(self, service, name):
+        self._service = service
+        self._name = name
+
+    def __getattr__(self, attr):
+        def call(**kwargs):
+            if attr in _RESOURCES:
+                return _ReplayResource(self._service, attr)
+            return _ReplayRequest(self._service, _request_key(f"{self._name}.{attr}", kwargs))
+
+        return call
+
+
+class ReplayGmailService:
+    """A Gmail API service answering from an Archive."""
+
+    def __init__(self, archive, speed=1.0):
+        self.archive = archive
+        self.speed = speed
+
+    def users(self):
+        return _ReplayResource(self, "users")
+
+    def new_batch_http_request(self, *args, **kwargs):
+        return _ReplayBatch(self)
+
+
+class ReplayBackend:
+    """An inference backend answering from an Archive, with the recorded concurrency."""
+
+    name = "replay"
+
+    def __init__(self, archive, speed=1.0):
+        self.archive = archive
+        self.speed = speed
+        self.max_concurrency = archive.header.get("concurrency") or 1
+        self.recorded_backend = archive.header.get("backend")
+
+    def ensure_concurrency(self, workers):
+        pass
+
+    def connection_stats(self):
+        return {"requests": 0, "reuse_ratio": None}
+
+    def describe(self):
+        timing = f"{self.speed:g}x speed" if self.speed else "no delays"
+        return f"replay of {self.recorded_backend} ({self.max_concurrency} parallel, {timing})"
+
+    def check_available(self):
+        return True, "OK"
+
+    def chat(self, system, user, max_tokens=10, temperature=0.1):
+        response = _replay(self.archive.take("llm", _prompt_key(system, user)), self.speed)
+        return ChatResult(response["content"], response.get("usage", {}))
@@ -0,0 +1,191 @@
+import csv
+import glob
+import html
+import json
+import os
+from datetime import datetime
+
+from config import REPORT_FILE, REPORT_FORMATS, REPORT_PAGE_SIZE
+
+SECTIONS = (("important", "Important"), ("low_priority", "Low Priority"))
+
+_STYLE = """<style>
+body { font-family: Arial, sans-serif; margin: 2em; }
+h1 { color: #333; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 2em; }
+th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+th { background: #4285f4; color: white; }
+tr:nth-child(even) { background: #f2f2f2; }
+.summary { background: #e8f5e9; padding: 1em; border-radius: 8px; margin-bottom: 2em; }
+nav { margin-bottom: 1em; }
+</style>"""
+
+_TABLE_HEAD = "<table><tr><th>Date</th><th>From</th><th>Subject</th></tr>\n"
+_BUFFER = 1 << 16
+
+
+def _head(title):
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8">\n'
+        f"<title>{title}</title>\n{_STYLE}</head><body>\n"
+    )
+
+
+def _row(info):
+    return (
+        f"<tr><td>{html.escape(info.get('date', ''))}</td>"
+        f"<td>{html.escape(info.get('from', ''))}</td>"
+        f"<td>{html.escape(info.get('subject', ''))}</td></tr>\n"
+    )
+
+
+class _Section:
+    """Rows of one class: buffered up to a page, then streamed to page files."""
+
+    def __init__(self, writer, key, title):
+        self.writer = writer
+        self.key = key
+        self.title = title
+        self.rows = []
+        self.pages = 0
+        self.page_rows = 0
+        self.file = None
+
+    def add(self, row):
+        if self.file is None and len(self.rows) < self.writer.page_size:
+            self.rows.append(row)
+            return
+        if self.file is None:
+            # Too big to inline: switch to paged output
+            self._open_page()
+            self.file.writelines(self.rows)
+            self.page_rows = len(self.rows)
+            self.rows = []
+        if self.page_rows >= self.writer.page_size:
+            self._close_page(has_next=True)
+            self._open_page()
+        self.file.write(row)
+        self.page_rows += 1
+
+    @property
+    def paged(self):
+        return self.pages > 0
+
+    def page_name(self, n):
+        return f"{self.key}-{n:04d}.html"
+
+    def _open_page(self):
+        self.pages += 1
+        self.page_rows = 0
+        path = os.path.join(self.writer.pages_dir, self.page_name(self.pages))
+        self.file = open(path, "w", encoding="utf-8", buffering=_BUFFER)
+        self.file.write(_head(f"{self.title} - page {self.pages}"))
+        self.file.write(f"<h2>{self.title} (page {self.pages})</h2>\n{_TABLE_HEAD}")
+
+    def _close_page(self, has_next):
+        self.file.write("</table>\n")
+        self.file.write(self._nav(has_next))
+        self.file.write("</body></html>")
+        self.file.close()
+        self.file = None
+
+    def _nav(self, has_next):
+        index = os.path.relpath(self.writer.path, self.writer.pages_dir)
+        links = [f'<a href="{html.escape(index)}">Index</a>']
+        if self.pages > 1:
+            links.append(f'<a href="{self.page_name(self.pages - 1)}">Previous</a>')
+        if has_next:
+            links.append(f'<a href="{self.page_name(self.pages + 1)}">Next</a>')
+        return f"<nav>{' | '.join(links)}</nav>\n"
+
+    def finish(self):
+        if self.file is not None:
+            self._close_page(has_next=False)
+
+
+class ReportWriter:
+    """Streams report rows to disk as they are added.
+
+    Sections that fit in `page_size` rows are inlined in the main report;
+    larger ones go to numbered pages under `<report>_pages/`, linked from the
+    main report, so memory stays bounded by one page per section. "csv" and
+    "jsonl" in `formats` write the same rows next to the report.
+    """
+
+    def __init__(self, path=None, page_size=None, formats=None):
+        self.path = path or REPORT_FILE
+        self.page_size = max(1, page_size or REPORT_PAGE_SIZE)
+        self.formats = set(formats if formats is not None else REPORT_FORMATS)
+        base = os.path.splitext(self.path)[0]
+        self.pages_dir = base + "_pages"
+        self.sections = {key: _Section(self, key, title) for key, title in SECTIONS}
+        self.files = [self.path]
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        os.makedirs(self.pages_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(self.pages_dir, "*.html")):
+            os.remove(stale)
+
+        self._csv_file = self._jsonl_file = None
+        if "csv" in self.formats:
+            self._csv_file = open(base + ".csv", "w", encoding="utf-8", newline="", buffering=_BUFFER)
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(["id", "classification", "date", "from", "subject"])
+            self.files.append(self._csv_file.name)
+        if "jsonl" in self.formats:
+            self._jsonl_file = open(base + ".jsonl", "w", encoding="utf-8", buffering=_BUFFER)
+            self.files.append(self._jsonl_file.name)
+
+    def add(self, mid, info, cls):
+        # Anything not classified important is listed as low priority
+        section = self.sections["important" if cls == "important" else "low_priority"]
+        section.add(_row(info))
+        if self._csv_file:
+            self._csv.writerow(
+                [mid, cls, info.get("date", ""), info.get("from", ""), info.get("subject", "")]
+            )
+        if self._jsonl_file:
+            record = {"id": mid, "classification": cls}
+            record.update((k, info.get(k, "")) for k in ("date", "from", "subject"))
+            self._jsonl_file.write(json.dumps(record) + "\n")
+
+    def close(self, counts, processed):
+        for section in self.sections.values():
+            section.finish()
+        for f in (self._csv_file, self._jsonl_file):
+            if f:
+                f.close()
+
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        pages_rel = os.path.relpath(self.pages_dir, os.path.dirname(self.path) or ".")
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", buffering=_BUFFER) as f:
+            f.write(_head("Gmail Cleanup Report"))
+            f.write(
+                "<h1>Gmail Cleanup Report</h1>\n<div class=\"summary\">\n"
+                f"<p><strong>Generated:</strong> {now}</p>\n"
+                f"<p><strong>Total processed:</strong> {processed}</p>\n"
+                f"<p><strong>Important:</strong> {counts['important']}</p>\n"
+                f"<p><strong>Low Priority:</strong> {counts['low_priority']}</p>\n"
+                "</div>\n"
+            )
+            for key, section in self.sections.items():
+                f.write(f"\n<h2>{section.title} ({counts.get(key, 0)})</h2>\n")
+                if section.paged:
+                    f.write("<ul>\n")
+                    for n in range(1, section.pages + 1):
+                        href = f"{pages_rel}/{section.page_name(n)}"
+                        f.write(f'<li><a href="{html.escape(href)}">Page {n}</a></li>\n')
+                    f.write("</ul>\n")
+                else:
+                    f.write(_TABLE_HEAD)
+                    f.writelines(section.rows)
+                    f.write("</table>\n")
+            f.write("</body></html>")
+        os.replace(tmp, self.path)
+        if not any(s.paged for s in self.sections.values()):
+            try:
+                os.rmdir(self.pages_dir)
+            except OSError:
+                pass
+        return self.files
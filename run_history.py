@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+
+from config import RUN_HISTORY_FILE, RUN_HISTORY_WINDOW
+
+log = logging.getLogger(__name__)
+
+_BLOCK = 64 * 1024
+
+
+def _empty_index():
+    return {
+        "size": 0,
+        "runs": 0,
+        "emails": 0,
+        "important": 0,
+        "low_priority": 0,
+        "duration_seconds": 0.0,
+        "statuses": {},
+        "queries": {},
+        "recent": [],   # [emails classified, duration_seconds] of the last RUN_HISTORY_WINDOW runs
+    }
+
+
+class RunHistory:
+    """Run summaries as append-only JSON lines plus a small aggregate index.
+
+    append() writes one line and rewrites the index (a few hundred bytes), so
+    its cost does not grow with the number of runs. read_recent() reads the
+    file backwards from a byte cursor, so a page of the newest entries is
+    cheap no matter how long the history is. A legacy run_history.json list
+    next to the file is migrated on first use.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or RUN_HISTORY_FILE
+        self.index_path = self.path + ".index"
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        with self._lock:
+            self._migrate_legacy()
+            index = self._load_index()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(json.dumps(entry).encode("utf-8") + b"\n")
+                index["size"] = f.tell()
+            _add_to_index(index, entry)
+            self._write_index(index)
+            return index
+
+    def summary(self):
+        """Aggregates over all runs: totals, per-status/per-query stats, rolling throughput."""
+        with self._lock:
+            self._migrate_legacy()
+            index = self._load_index()
+        recent_emails = sum(e for e, _ in index["recent"])
+        recent_seconds = sum(d for _, d in index["recent"])
+        return {
+            "runs": index["runs"],
+            "emails": index["emails"],
+            "important": index["important"],
+            "low_priority": index["low_priority"],
+            "duration_seconds": round(index["duration_seconds"], 1),
+            "statuses": index["statuses"],
+            "queries": index["queries"],
+            "emails_per_second": _rate(index["emails"], index["duration_seconds"]),
+            "recent_emails_per_second": _rate(recent_emails, recent_seconds),
+        }
+
+    def read_recent(self, limit=50, before=None):
+        """Newest-first page of up to `limit` entries ending at byte offset `before`.
+
+        Returns (entries, cursor); pass the cursor back as `before` for the
+        next page. The cursor is 0 once the oldest entry has been returned.
+        """
+        with self._lock:
+            self._migrate_legacy()
+        if not os.path.exists(self.path):
+            return [], 0
+        entries = []
+        with open(self.path, "rb") as f:
+            pos = f.seek(0, os.SEEK_END) if before is None else before
+            tail = b""
+            while len(entries) < limit and pos > 0:
+                step = min(_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                lines = (f.read(step) + tail).split(b"\n")
+                # lines[0] may be cut off; keep it until the previous block is read
+                tail = lines.pop(0)
+                for i in range(len(lines) - 1, -1, -1):
+                    if not lines[i]:
+                        continue
+                    entries.append(_parse(lines[i]))
+                    if len(entries) == limit:
+                        cursor = pos + len(tail) + 1 + sum(len(l) + 1 for l in lines[:i])
+                        return [e for e in entries if e is not None], cursor
+            if tail and len(entries) < limit:
+                entries.append(_parse(tail))
+        return [e for e in entries if e is not None], 0
+
+    def _load_index(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("size") == size:
+                return index
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        # Missing or stale (e.g. a crash between append and index write)
+        return self._rebuild_index(size)
+
+    def _rebuild_index(self, size):
+        index = _empty_index()
+        if size:
+            log.info("Rebuilding run history index for %s", self.path)
+            with open(self.path, "rb") as f:
+                for line in f:
+                    entry = _parse(line)
+                    if entry is not None:
+                        _add_to_index(index, entry)
+        index["size"] = size
+        self._write_index(index)
+        return index
+
+    def _write_index(self, index):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index_path)
+
+    def _migrate_legacy(self):
+        legacy = os.path.splitext(self.path)[0] + ".json"
+        if legacy == self.path or not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, encoding="utf-8") as f:
+                history = json.load(f)
+        except json.JSONDecodeError:
+            history = []
+        # Older runs go first so read_recent() keeps newest-first order
+        existing = b""
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                existing = f.read()
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            for entry in history:
+                f.write(json.dumps(entry).encode("utf-8") + b"\n")
+            f.write(existing)
+        os.replace(tmp, self.path)
+        os.replace(legacy, legacy + ".migrated")
+        log.info("Migrated %d runs from %s", len(history), legacy)
+        self._rebuild_index(os.path.getsize(self.path))
+
+
+def _parse(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        log.warning("Skipping unreadable run history line")
+        return None
+
+
+def _rate(emails, seconds):
+    return round(emails / seconds, 2) if seconds else 0.0
+
+
+def _add_to_index(index, entry):
+    # Emails this run classified, so a mailbox resumed N times is not counted
+    # N times; entries from before "classified" existed only have "total"
+    emails = entry.get("classified", entry.get("total", 0))
+    duration = entry.get("duration_seconds", 0) or 0
+    index["runs"] += 1
+    index["emails"] += emails
+    index["important"] += entry.get("important", 0)
+    index["low_priority"] += entry.get("low_priority", 0)
+    index["duration_seconds"] += duration
+    status = entry.get("status", "unknown")
+    index["statuses"][status] = index["statuses"].get(status, 0) + 1
+    q = index["queries"].setdefault(
+        entry.get("query", ""), {"runs": 0, "emails": 0, "duration_seconds": 0.0, "last_run": None}
+    )
+    q["runs"] += 1
+    q["emails"] += emails
+    q["duration_seconds"] += duration
+    q["last_run"] = entry.get("date")
+    index["recent"] = (index["recent"] + [[emails, duration]])[-RUN_HISTORY_WINDOW:]
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+
+from config import CHECKPOINT_FSYNC, STATE_DB_FILE
+
+_SYNCHRONOUS = {"always": "FULL", "snapshot": "NORMAL", "never": "OFF"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    verdict TEXT,
+    labeled INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_messages_status ON messages (verdict, labeled);
+CREATE INDEX IF NOT EXISTS idx_messages_unprocessed ON messages (seq) WHERE verdict IS NULL;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_PAGE = 1000
+
+
+class SqliteRunState:
+    """RunState backed by SQLite, for mailboxes too large to hold in memory.
+
+    Messages are rows indexed by verdict and label state, so "unprocessed",
+    "classified but unlabeled" and per-class counts are index lookups rather
+    than scans. Changes are buffered in the open transaction until save().
+    """
+
+    def __init__(self, path=None):
+        self.path = path or STATE_DB_FILE
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={_SYNCHRONOUS.get(CHECKPOINT_FSYNC, 'NORMAL')}")
+        self._db.executescript(_SCHEMA)
+        self._total = self._scalar("SELECT COUNT(*) FROM messages")
+        self._processed = self._scalar("SELECT COUNT(*) FROM messages WHERE verdict IS NOT NULL")
+
+    def _scalar(self, sql, params=()):
+        return self._db.execute(sql, params).fetchone()[0]
+
+    # --- Mutation ---
+
+    def set_message_ids(self, ids):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO messages (id) VALUES (?)", ((mid,) for mid in ids)
+            )
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('listed', '1')")
+            self._total = self._scalar("SELECT COUNT(*) FROM messages")
+            self._processed = 0
+
+    def record_verdicts(self, verdicts):
+        """Store {id: classification} results; returns the processed count."""
+        with self._lock:
+            cur = self._db.executemany(
+                "UPDATE messages SET verdict = ? WHERE id = ? AND verdict IS NULL",
+                ((cls, mid) for mid, cls in verdicts.items()),
+            )
+            self._processed += max(cur.rowcount, 0)
+            return self._processed
+
+    def mark_labeled(self, ids):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE messages SET labeled = 1 WHERE id = ?", ((mid,) for mid in ids)
+            )
+
+    def save(self):
+        with self._lock:
+            self._db.commit()
+
+    # --- Queries ---
+
+    def total(self):
+        return self._total
+
+    def processed_count(self):
+        return self._processed
+
+    def has_message_ids(self):
+        with self._lock:
+            return self._scalar("SELECT COUNT(*) FROM meta WHERE key = 'listed'") > 0
+
+    def unprocessed_ids(self):
+        """Yield unprocessed IDs in listing order, a page at a time."""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT seq, id FROM messages WHERE verdict IS NULL AND seq > ? "
+                    "ORDER BY seq LIMIT ?",
+                    (last, _PAGE),
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            for _, mid in rows:
+                yield mid
+
+    def verdict(self, mid):
+        with self._lock:
+            row = self._db.execute("SELECT verdict FROM messages WHERE id = ?", (mid,)).fetchone()
+        return row[0] if row else None
+
+    def iter_verdicts(self):
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT seq, id, verdict FROM messages WHERE verdict IS NOT NULL AND seq > ? "
+                    "ORDER BY seq LIMIT ?",
+                    (last, _PAGE),
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            for _, mid, cls in rows:
+                yield mid, cls
+
+    def classified_unlabeled(self, cls):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM messages WHERE verdict = ? AND labeled = 0 ORDER BY seq", (cls,)
+            ).fetchall()
+        return [mid for (mid,) in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT verdict, COUNT(*) FROM messages WHERE verdict IS NOT NULL GROUP BY verdict"
+            ).fetchall()
+        counts = {"important": 0, "low_priority": 0}
+        counts.update(rows)
+        return counts
+
+    # --- Lifecycle ---
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    @classmethod
+    def load(cls):
+        if not os.path.exists(STATE_DB_FILE):
+            return None
+        state = cls()
+        if not state.has_message_ids():
+            state.close()
+            return None
+        return state
+
+    @classmethod
+    def clear(cls):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(STATE_DB_FILE + suffix):
+                os.remove(STATE_DB_FILE + suffix)
@@ -0,0 +1,41 @@
+"""Startup timing: milestones since process start and durations of heavy steps."""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+_T0 = time.perf_counter()
+_lock = threading.Lock()
+_timings = {}
+
+
+def mark(name):
+    """Record a milestone as seconds since this module was first imported."""
+    with _lock:
+        _timings.setdefault(name, round(time.perf_counter() - _T0, 4))
+
+
+@contextmanager
+def timed(name):
+    """Record how long the block took (the first time only, e.g. a lazy import)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _timings.setdefault(name, round(time.perf_counter() - start, 4))
+
+
+def timings():
+    with _lock:
+        return dict(_timings)
+
+
+def log_timings():
+    log.info(
+        "Startup timings (s): %s",
+        ", ".join(f"{k}={v}" for k, v in timings().items()),
+    )
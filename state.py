@@ -1,27 +1,175 @@
 import json
+import logging
 import os
+import threading
+import time
 from dataclasses import dataclass, field
 
-from config import CHECKPOINT_FILE
+import metrics
+from config import (
+    CHECKPOINT_FILE,
+    CHECKPOINT_COMPACT_EVERY,
+    CHECKPOINT_FSYNC,
+    CHECKPOINT_INTERVAL,
+    CHECKPOINT_MAX_SECONDS,
+    STATE_BACKEND,
+)
+from compact_state import CompactRunState
+from sqlite_state import SqliteRunState
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_SECONDS = metrics.histogram("checkpoint_save_seconds", "Time to write one checkpoint")
+CHECKPOINTS_COALESCED = metrics.counter(
+    "checkpoint_coalesced_total", "Checkpoint requests folded into an already queued save"
+)
+
+
+def _journal_file():
+    return CHECKPOINT_FILE + ".journal"
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
 
 
 @dataclass
 class RunState:
+    """Run progress, checkpointed as a JSON snapshot plus an append-only journal.
+
+    save() appends only the verdicts and labels recorded since the previous
+    save to the journal; the full snapshot is rewritten when the message IDs
+    change and every CHECKPOINT_COMPACT_EVERY journal records. Changes must go
+    through set_message_ids/record_verdicts/mark_labeled to be journaled.
+    """
+
     all_message_ids: list = field(default_factory=list)
     processed: dict = field(default_factory=dict)   # id -> "important" | "low_priority"
     labeled: set = field(default_factory=set)
+    # Pipeline stages update state from several threads; _lock guards the
+    # containers and _save_lock serializes checkpoint writes.
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _save_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _pending_verdicts: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _pending_labeled: list = field(default_factory=list, init=False, repr=False, compare=False)
+    _needs_snapshot: bool = field(default=True, init=False, repr=False, compare=False)
+    _journal_records: int = field(default=0, init=False, repr=False, compare=False)
+
+    def set_message_ids(self, ids):
+        with self._lock:
+            self.all_message_ids = ids
+            self._needs_snapshot = True
+
+    def record_verdicts(self, verdicts):
+        """Store {id: classification} results; returns the processed count."""
+        with self._lock:
+            self.processed.update(verdicts)
+            self._pending_verdicts.update(verdicts)
+            return len(self.processed)
+
+    def mark_labeled(self, ids):
+        with self._lock:
+            self.labeled.update(ids)
+            self._pending_labeled.extend(ids)
+
+    # --- Queries (shared with SqliteRunState) ---
+
+    def total(self):
+        return len(self.all_message_ids)
+
+    def processed_count(self):
+        return len(self.processed)
+
+    def has_message_ids(self):
+        return bool(self.all_message_ids)
+
+    def unprocessed_ids(self):
+        with self._lock:
+            return [mid for mid in self.all_message_ids if mid not in self.processed]
+
+    def verdict(self, mid):
+        return self.processed.get(mid)
+
+    def iter_verdicts(self):
+        with self._lock:
+            return list(self.processed.items())
+
+    def classified_unlabeled(self, cls):
+        with self._lock:
+            return [
+                mid for mid, c in self.processed.items() if c == cls and mid not in self.labeled
+            ]
+
+    def counts(self):
+        counts = {"important": 0, "low_priority": 0}
+        with self._lock:
+            for cls in self.processed.values():
+                counts[cls] = counts.get(cls, 0) + 1
+        return counts
+
+    def close(self):
+        pass
 
     def save(self):
-        os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
-        data = {
-            "all_message_ids": self.all_message_ids,
-            "processed": self.processed,
-            "labeled": list(self.labeled),
-        }
+        with self._save_lock:
+            os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
+            with self._lock:
+                compact = (
+                    self._needs_snapshot
+                    or self._journal_records >= CHECKPOINT_COMPACT_EVERY
+                    or not os.path.exists(CHECKPOINT_FILE)
+                )
+                if compact:
+                    data = {
+                        "all_message_ids": list(self.all_message_ids),
+                        "processed": dict(self.processed),
+                        "labeled": list(self.labeled),
+                    }
+                else:
+                    record = {}
+                    if self._pending_verdicts:
+                        record["processed"] = self._pending_verdicts
+                    if self._pending_labeled:
+                        record["labeled"] = self._pending_labeled
+                verdicts, labeled = self._pending_verdicts, self._pending_labeled
+                self._pending_verdicts = {}
+                self._pending_labeled = []
+                self._needs_snapshot = False
+
+            try:
+                if compact:
+                    self._write_snapshot(data)
+                elif record:
+                    self._append_journal(record)
+            except Exception:
+                # Keep the changes for the next save, which rewrites the
+                # snapshot in case a journal append was left half-written
+                with self._lock:
+                    self._pending_verdicts = {**verdicts, **self._pending_verdicts}
+                    self._pending_labeled = labeled + self._pending_labeled
+                    self._needs_snapshot = True
+                raise
+
+    def _write_snapshot(self, data):
         tmp = CHECKPOINT_FILE + ".tmp"
         with open(tmp, "w") as f:
             json.dump(data, f)
+            if CHECKPOINT_FSYNC != "never":
+                _fsync(f)
         os.replace(tmp, CHECKPOINT_FILE)
+        # Replaying a stale journal over the new snapshot would be harmless
+        # (updates are idempotent), so a crash between these steps is safe.
+        if os.path.exists(_journal_file()):
+            os.remove(_journal_file())
+        self._journal_records = 0
+
+    def _append_journal(self, record):
+        with open(_journal_file(), "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            if CHECKPOINT_FSYNC == "always":
+                _fsync(f)
+        self._journal_records += 1
 
     @classmethod
     def load(cls):
@@ -34,9 +182,139 @@ class RunState:
             processed=data["processed"],
             labeled=set(data.get("labeled", [])),
         )
+        state._journal_records, torn = state._replay_journal()
+        # Appending after a torn record would corrupt the next one, so start
+        # over from a fresh snapshot in that case.
+        state._needs_snapshot = torn
         return state
 
+    def _replay_journal(self):
+        if not os.path.exists(_journal_file()):
+            return 0, False
+        count = 0
+        with open(_journal_file()) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append
+                    log.warning("Ignoring truncated checkpoint journal record")
+                    return count, True
+                self.processed.update(record.get("processed", {}))
+                self.labeled.update(record.get("labeled", []))
+                count += 1
+        return count, False
+
     @classmethod
     def clear(cls):
-        if os.path.exists(CHECKPOINT_FILE):
-            os.remove(CHECKPOINT_FILE)
+        for path in (CHECKPOINT_FILE, _journal_file()):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+STATE_BACKENDS = {"json": RunState, "compact": CompactRunState, "sqlite": SqliteRunState}
+
+
+def get_state_class(name=None):
+    name = name or STATE_BACKEND
+    try:
+        return STATE_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown state backend '{name}'. Available: {sorted(STATE_BACKENDS)}"
+        ) from None
+
+
+class CheckpointWriter:
+    """Saves a run state on a background thread so disk latency never stalls the pipeline.
+
+    Callers report changes with note(); a save is started once `interval`
+    changes have accumulated or `max_seconds` have passed with unsaved
+    changes. Requests arriving while a save is running are coalesced into a
+    single follow-up save. Each save snapshots the state under its lock and
+    writes outside it, so stages keep going while the file is written.
+    close() flushes the last changes, and must be called on stop and on error.
+    """
+
+    def __init__(self, state, interval=CHECKPOINT_INTERVAL, max_seconds=CHECKPOINT_MAX_SECONDS):
+        self.state = state
+        self.interval = max(1, interval)
+        self.max_seconds = max_seconds
+        self.saves = 0
+        self.coalesced = 0
+        self.save_seconds = 0.0
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._requested = 0      # generation of the newest save request
+        self._started = 0        # generation the running save covers
+        self._completed = 0      # generation covered by the last finished save
+        self._closed = False
+        self._dirty_since = None  # when the oldest unsaved change was noted
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def note(self, changes=1):
+        with self._cond:
+            first = not self._pending
+            if first:
+                self._dirty_since = time.monotonic()
+            self._pending += changes
+            if self._pending >= self.interval:
+                self._request()
+            elif first:
+                self._cond.notify_all()  # start the max_seconds timer
+
+    def _request(self):
+        if self._requested > self._started:
+            # A save is already queued and will pick these changes up
+            self.coalesced += 1
+            CHECKPOINTS_COALESCED.inc()
+        else:
+            self._requested += 1
+        self._pending = 0
+        self._cond.notify_all()
+
+    def flush(self):
+        """Save any outstanding changes and wait until they are on disk."""
+        with self._cond:
+            self._requested += 1
+            self._pending = 0
+            target = self._requested
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._completed >= target or not self._thread.is_alive())
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._requested <= self._completed and not self._closed:
+                    timeout = None
+                    if self._pending and self.max_seconds:
+                        timeout = self._dirty_since + self.max_seconds - time.monotonic()
+                        if timeout <= 0:
+                            self._request()
+                            break
+                    self._cond.wait(timeout)
+                if self._requested <= self._completed and self._closed:
+                    return
+                target = self._started = self._requested
+
+            started = time.monotonic()
+            try:
+                self.state.save()
+            except Exception:
+                log.exception("Background checkpoint failed")
+
+            seconds = time.monotonic() - started
+            with self._cond:
+                self.saves += 1
+                self.save_seconds += seconds
+                CHECKPOINT_SECONDS.observe(seconds)
+                self._completed = target
+                self._cond.notify_all()
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from benchmarks.evaluate import evaluate, load_dataset, mailbox_dataset, main, pick, score, write_dataset
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+class TestEvaluate:
+    def test_score_and_pick(self):
+        labels = {"a": "important", "b": "important", "c": "low_priority", "d": "low_priority"}
+        # "b" has no verdict and counts as important, like a failed LLM call
+        result = score(labels, {"a": "important", "c": "important", "d": "low_priority"})
+        assert (result["tp"], result["fp"], result["fn"], result["tn"]) == (2, 1, 0, 1)
+        assert (result["precision"], result["recall"], result["accuracy"]) == (0.6667, 1.0, 0.75)
+        # Nothing important found: the worst configuration scores F1 0, not "unknown"
+        worst = score(labels, {"a": "low_priority", "b": "low_priority", "c": "important"})
+        assert (worst["precision"], worst["recall"], worst["f1"]) == (0.0, 0.0, 0.0)
+
+        results = [
+            {"precision": 0.9, "recall": 1.0, "emails_per_second": 10},
+            {"precision": 0.8, "recall": 0.95, "emails_per_second": 50},
+            {"precision": 0.95, "recall": 0.99, "emails_per_second": 30},
+        ]
+        assert pick(results, min_recall=0.98) is results[2]
+        assert pick(results) is results[1]
+        assert pick(results, min_precision=0.99) is None
+
+    def test_dataset_round_trip_and_validation(self, tmp_path):
+        path = str(tmp_path / "eval.jsonl")
+        emails = mailbox_dataset(50, seed=3)
+        write_dataset(emails, path)
+        assert load_dataset(path) == emails
+        assert {e["label"] for e in emails} == {"important", "low_priority"}
+
+        bad = tmp_path / "bad.jsonl"
+        bad.write_text(json.dumps(dict(emails[0], label="spam")) + "\n")
+        with pytest.raises(ValueError, match="bad.jsonl:1: unknown label 'spam'"):
+            load_dataset(str(bad))
+
+    def test_grid_against_fake_server(self, tmp_path, capsys):
+        emails = mailbox_dataset(120)
+        with FakeOllamaServer(latency="fixed:0.001", slots=4) as server:
+            result = evaluate(emails, url=server.url, template="compact", concurrency=4)
+            out = str(tmp_path / "eval.json")
+            code = main([
+                "--mailbox", "60", "--llm-url", server.url, "--templates", "default,compact",
+                "--concurrency", "1,2", "--min-recall", "0.9", "--out", out,
+            ])
+
+        assert result["config"]["concurrency"] == 4
+        assert result["tp"] + result["fp"] + result["fn"] + result["tn"] == 120
+        assert result["recall"] >= 0.9 and result["errors"] == 0
+        assert result["latency_ms"]["count"] == 120
+        assert result["emails_per_second"] > 0
+
+        assert code == 0
+        with open(out) as f:
+            data = json.load(f)
+        assert len(data["results"]) == 4
+        assert data["chosen"] is not None
+        assert "Fastest configuration meeting the bar" in capsys.readouterr().out
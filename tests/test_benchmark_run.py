@@ -0,0 +1,44 @@
+import json
+
+import classifier_engine
+import config
+
+from benchmarks.run import compare, main, parse_size, run_benchmark
+
+
+class TestBenchmarkRun:
+    def test_parse_size(self):
+        assert [parse_size(s) for s in ("500", "10k", "1.5k", "1m")] == [500, 10_000, 1_500, 1_000_000]
+
+    def test_end_to_end_run(self, tmp_path):
+        result = run_benchmark(300, str(tmp_path), slots=4)
+
+        assert result["status"] == "completed"
+        assert result["llm_requests"] == 300
+        assert result["verdicts"]["important"] + result["verdicts"]["low_priority"] == 300
+        assert result["gmail"]["api_requests"]["messages.get"] == 300
+        assert result["gmail"]["labeled"] == 300
+        assert result["stages"]["classify"]["batches"] == 12
+        assert result["emails_per_second"] > 0
+        assert result["peak_rss_mb"] > 0
+        assert result["checkpoint_write_bytes"] is None or result["checkpoint_write_bytes"] > 0
+        # Everything went to the scratch directory, and the real paths are back
+        assert (tmp_path / "report.html").exists()
+        assert classifier_engine.REPORT_FILE == config.REPORT_FILE
+
+    def test_results_file_and_compare(self, tmp_path, capsys):
+        before, after = str(tmp_path / "before.json"), str(tmp_path / "after.json")
+        assert main(["--sizes", "60,100", "--in-process", "--out", before]) == 0
+        assert capsys.readouterr().out.count("emails/s") == 1  # one header for all sizes
+        assert main(["--sizes", "100", "--in-process", "--out", after]) == 0
+
+        with open(before) as f:
+            data = json.load(f)
+        assert data["options"]["slots"] == 4
+        assert [r["size"] for r in data["results"]] == [60, 100]
+        with open(after) as f:
+            rows = compare(data, json.load(f))
+        assert {key for _, key, _, _, _ in rows} >= {"emails_per_second", "gmail_http_calls"}
+
+        assert main(["--compare", before, after]) == 0
+        assert "emails_per_second" in capsys.readouterr().out
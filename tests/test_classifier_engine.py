@@ -1,3 +1,4 @@
+import json
 import os
 import threading
 from unittest.mock import MagicMock, patch, PropertyMock
@@ -5,6 +6,8 @@ from unittest.mock import MagicMock, patch, PropertyMock
 import pytest
 
 from classifier_engine import ClassifierEngine
+from details_store import DetailsStore
+from msg_trace import read_trace
 from state import RunState
 
 
@@ -13,6 +16,7 @@ def engine_deps(mock_gmail_service, tmp_checkpoint, tmp_path, monkeypatch):
     """Set up a ClassifierEngine with mocked dependencies."""
     report_file = str(tmp_path / "report.html")
     monkeypatch.setattr("classifier_engine.REPORT_FILE", report_file)
+    monkeypatch.setattr("classifier_engine.RUN_HISTORY_FILE", str(tmp_path / "run_history.jsonl"))
 
     logs = []
     progress = []
@@ -59,6 +63,13 @@ class TestClassifierEnginePipeline:
         assert os.path.exists(report_file)
         assert any("Done!" in msg for msg in logs)
 
+        snap = engine.snapshot()
+        assert (snap["done"], snap["total"]) == (2, 2)
+        assert snap["stages"]["fetch"]["total"] == 2
+        assert snap["stages"]["classify"]["total"] == 2
+        assert snap["stages"]["label"]["total"] == 2
+        assert snap["eta_seconds"] is None
+
     @patch("classifier_engine.classify_batch")
     def test_resume_with_checkpoint(self, mock_classify_batch, engine_deps, tmp_checkpoint):
         engine, logs, progress, report_file = engine_deps
@@ -87,6 +98,7 @@ class TestClassifierEnginePipeline:
         # Only m2 should have been classified (one batch call)
         assert mock_classify_batch.call_count == 1
         assert any("Resumed" in msg for msg in logs)
+        assert (engine.last_summary["total"], engine.last_summary["classified"]) == (2, 1)
 
     @patch("classifier_engine.classify_batch")
     def test_resume_no_checkpoint_starts_fresh(self, mock_classify_batch, engine_deps, tmp_checkpoint):
@@ -151,6 +163,27 @@ class TestClassifierEnginePipeline:
         assert any("No messages found" in msg for msg in logs)
         mock_classify_batch.assert_not_called()
 
+    @patch("classifier_engine.classify_batch")
+    def test_error_closes_state_and_details(self, mock_classify_batch, engine_deps, monkeypatch):
+        engine, logs, progress, report_file = engine_deps
+        close, close_details = MagicMock(), MagicMock()
+        monkeypatch.setattr(RunState, "close", close)
+        monkeypatch.setattr(DetailsStore, "close", close_details)
+        mock_classify_batch.side_effect = RuntimeError("LLM crashed")
+        engine.gmail.fetch_message_ids = MagicMock(return_value=["m1"])
+        engine.gmail.ensure_labels_exist = MagicMock()
+        engine.gmail._label_ids = {"AI/Important": "L1", "AI/Low Priority": "L2"}
+        engine.gmail.fetch_message_details_batch = MagicMock(
+            return_value={"m1": {"id": "m1", "from": "a@t.com", "subject": "Hi", "date": "", "snippet": ""}}
+        )
+
+        engine.start()
+        engine.join()
+
+        assert engine.status == "error"
+        close.assert_called_once()
+        close_details.assert_called_once()
+
     @patch("classifier_engine.classify_batch")
     def test_report_generation(self, mock_classify_batch, engine_deps):
         engine, logs, progress, report_file = engine_deps
@@ -181,3 +214,164 @@ class TestClassifierEnginePipeline:
         # Report should use cached details, not re-fetch
         # fetch_message_details_batch called once for classification, not again for report
         assert engine.gmail.fetch_message_details_batch.call_count == 1
+
+    @patch("classifier_engine.classify_batch")
+    def test_run_summary_includes_prompt_tokens(self, mock_classify_batch, engine_deps, tmp_path):
+        from run_history import RunHistory
+
+        engine, logs, progress, report_file = engine_deps
+
+        def classify(emails, usage=None, **kwargs):
+            for _ in emails:
+                usage.record({"prompt_eval_count": 150, "total_duration": 50_000_000}, wall=0.06)
+            return {e["id"]: "important" for e in emails}
+
+        mock_classify_batch.side_effect = classify
+
+        engine.gmail.fetch_message_ids = MagicMock(return_value=["m1"])
+        engine.gmail.ensure_labels_exist = MagicMock()
+        engine.gmail._label_ids = {"AI/Important": "L1", "AI/Low Priority": "L2"}
+        engine.gmail.fetch_message_details_batch = MagicMock(
+            return_value={
+                "m1": {"id": "m1", "from": "a@t.com", "subject": "Hi", "date": "2025-01-01", "snippet": "Hello"},
+            }
+        )
+        engine.gmail.apply_label_batch = MagicMock()
+
+        engine._pipeline(resume=False)
+
+        history, _ = RunHistory(str(tmp_path / "run_history.jsonl")).read_recent(1)
+        assert history[0]["prompt_tokens"]["emails"] == 1
+        assert history[0]["prompt_tokens"]["mean"] == 150
+        assert history[0]["llm_cost"]["latency_ms"]["wall"]["p95"] == 60.0
+        assert history[0]["memory"]["details"]["entries"] == 1
+        assert history[0]["memory"]["details"]["spilled"] is False
+
+    @patch("classifier_engine.classify_batch")
+    def test_labels_applied_while_classifying(self, mock_classify_batch, engine_deps):
+        engine, logs, progress, report_file = engine_deps
+        first_label_applied = threading.Event()
+
+        def classify(emails, **kwargs):
+            if emails[0]["id"] == "m3":
+                # Labels for earlier batches must land before the run ends
+                assert first_label_applied.wait(timeout=5)
+            return {e["id"]: "low_priority" for e in emails}
+
+        mock_classify_batch.side_effect = classify
+
+        engine.gmail.fetch_message_ids = MagicMock(return_value=["m1", "m2", "m3"])
+        engine.gmail.ensure_labels_exist = MagicMock()
+        engine.gmail._label_ids = {"AI/Important": "L1", "AI/Low Priority": "L2"}
+        engine.gmail.fetch_message_details_batch = MagicMock(
+            side_effect=lambda ids: {
+                mid: {"id": mid, "from": "x@t.com", "subject": mid, "date": "2025-01-01", "snippet": ""}
+                for mid in ids
+            }
+        )
+        engine.gmail.apply_label_batch = MagicMock(
+            side_effect=lambda ids, label_id: first_label_applied.set()
+        )
+
+        with patch("classifier_engine.BATCH_SIZE", 1):
+            engine._pipeline(resume=False)
+
+        assert engine.state.labeled == {"m1", "m2", "m3"}
+        assert engine.gmail.apply_label_batch.call_count == 3
+        assert len(progress) == 3
+        assert [p[0] for p in progress] == [1, 2, 3]
+
+    @patch("classifier_engine.classify_batch")
+    def test_trace_written(self, mock_classify_batch, engine_deps, tmp_path):
+        engine, logs, progress, report_file = engine_deps
+        engine.trace_file = str(tmp_path / "trace.jsonl")
+        mock_classify_batch.side_effect = lambda emails, **kwargs: {e["id"]: "important" for e in emails}
+
+        engine.gmail.fetch_message_ids = MagicMock(return_value=["m1", "m2"])
+        engine.gmail.ensure_labels_exist = MagicMock()
+        engine.gmail._label_ids = {"AI/Important": "L1", "AI/Low Priority": "L2"}
+        engine.gmail.fetch_message_details_batch = MagicMock(
+            side_effect=lambda ids: {
+                mid: {"id": mid, "from": "x@t.com", "subject": mid, "date": "2025-01-01", "snippet": ""}
+                for mid in ids
+            }
+        )
+        engine.gmail.apply_label_batch = MagicMock()
+
+        engine.start()
+        assert engine.join(timeout=10)
+
+        records = {r["id"]: r for r in read_trace(engine.trace_file)}
+        assert set(records) == {"m1", "m2"}
+        assert all(r["listed"] <= r["fetched"] <= r["labeled"] for r in records.values())
+        assert mock_classify_batch.call_args.kwargs["trace"] is not None
+        assert any("Trace saved" in msg for msg in logs)
+
+    @patch("classifier_engine.classify_batch")
+    def test_profiled_run(self, mock_classify_batch, engine_deps, tmp_path, monkeypatch):
+        engine, logs, progress, report_file = engine_deps
+        monkeypatch.setattr("profiling.PROFILE_DIR", str(tmp_path / "profiles"))
+        engine.profile, engine.profile_memory = "sample", True
+        mock_classify_batch.return_value = {"m1": "important"}
+
+        engine.gmail.fetch_message_ids = MagicMock(return_value=["m1"])
+        engine.gmail.ensure_labels_exist = MagicMock()
+        engine.gmail._label_ids = {"AI/Important": "L1", "AI/Low Priority": "L2"}
+        engine.gmail.fetch_message_details_batch = MagicMock(
+            return_value={"m1": {"id": "m1", "from": "a@t.com", "subject": "Hi", "date": "", "snippet": ""}}
+        )
+        engine.gmail.apply_label_batch = MagicMock()
+
+        engine.start()
+        assert engine.join(timeout=10)
+
+        out = engine.last_summary["profile"]
+        assert sorted(os.listdir(out)) == ["memory.json", "profile.json", "samples.folded", "samples.txt"]
+        with open(os.path.join(out, "memory.json")) as f:
+            marks = [m["mark"] for m in json.load(f)]
+        assert marks == ["ids_listed", "classified", "labeled", "report_written", "end"]
+        assert any("Profile saved" in msg for msg in logs)
+
+
+class TestStateBackends:
+    @pytest.mark.parametrize("backend", ["sqlite", "compact"])
+    @patch("classifier_engine.classify_batch")
+    def test_run_and_resume(self, mock_classify_batch, backend, mock_gmail_service, tmp_path, monkeypatch):
+        from state import get_state_class
+
+        monkeypatch.setattr("sqlite_state.STATE_DB_FILE", str(tmp_path / "state.sqlite3"))
+        monkeypatch.setattr("compact_state.COMPACT_CHECKPOINT_FILE", str(tmp_path / "checkpoint.bin"))
+        monkeypatch.setattr("classifier_engine.REPORT_FILE", str(tmp_path / "report.html"))
+        monkeypatch.setattr("classifier_engine.RUN_HISTORY_FILE", str(tmp_path / "run_history.jsonl"))
+
+        m1, m2 = "18c2f0a1b2c3d4e5", "18c2f0a1b2c3d4e6"
+        state_cls = get_state_class(backend)
+        state = state_cls()
+        state.set_message_ids([m1, m2])
+        state.record_verdicts({m1: "important"})
+        state.save()
+        state.close()
+
+        logs = []
+        engine = ClassifierEngine(
+            service=mock_gmail_service, log_cb=logs.append, state_backend=backend
+        )
+        mock_classify_batch.return_value = {m2: "low_priority"}
+        engine.gmail.ensure_labels_exist = MagicMock()
+        engine.gmail._label_ids = {"AI/Important": "L1", "AI/Low Priority": "L2"}
+        engine.gmail.fetch_message_details_batch = MagicMock(
+            return_value={
+                m2: {"id": m2, "from": "c@t.com", "subject": "Sale", "date": "2025-01-01", "snippet": "Buy now"},
+            }
+        )
+        engine.gmail.apply_label_batch = MagicMock()
+
+        engine._pipeline(resume=True)
+
+        assert any("Resumed: 1/2" in msg for msg in logs)
+        engine.gmail.fetch_message_details_batch.assert_called_once_with([m2])
+        # m2 labeled by the pipeline, m1 by the final sweep
+        labeled = {tuple(c.args[0]) for c in engine.gmail.apply_label_batch.call_args_list}
+        assert labeled == {(m2,), (m1,)}
+        assert any("Done!" in msg for msg in logs)
+        assert state_cls.load() is None
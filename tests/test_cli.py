@@ -0,0 +1,111 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+import cli
+
+
+def _args(*argv):
+    return cli.build_parser().parse_args(list(argv))
+
+
+class FakeEngine:
+    instances = []
+
+    def __init__(self, service, progress_cb, log_cb, **kwargs):
+        self.progress_cb = progress_cb
+        self.log_cb = log_cb
+        self.kwargs = kwargs
+        self.status = None
+        self.last_summary = None
+        FakeEngine.instances.append(self)
+
+    def start(self, resume=False):
+        self.resume = resume
+        self.progress_cb(1, 1, "important")
+        self.log_cb("Done!")
+        self.status = "completed"
+        self.last_summary = {"total": 1, "important": 1, "low_priority": 0}
+
+    def join(self, timeout=None):
+        return True
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    FakeEngine.instances = []
+    backend = MagicMock()
+    backend.describe.return_value = "fake"
+    backend.check_available.return_value = (True, "ok")
+    monkeypatch.setattr(cli, "create_backend", MagicMock(return_value=backend))
+    monkeypatch.setattr(cli, "set_backend", MagicMock())
+    monkeypatch.setattr(cli, "ClassifierEngine", FakeEngine)
+    return backend
+
+
+class TestCli:
+    def test_parser_options(self):
+        args = _args("--query", "in:inbox", "--resume", "--llm-workers", "8", "--json")
+        assert args.query == "in:inbox"
+        assert args.resume and args.json
+        assert args.llm_workers == 8
+
+    def test_json_progress_lines(self, fake_run):
+        out = io.StringIO()
+        code = cli.run_once(
+            _args("--json", "--fetch-workers", "3"), cli.Reporter(True, out), threading.Event(), service=MagicMock()
+        )
+
+        assert code == cli.EXIT_OK
+        events = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [e["event"] for e in events] == ["startup", "run_started", "progress", "log", "run_finished"]
+        assert "llm" in events[0]["preflight"]
+        assert events[2]["classification"] == "important"
+        assert events[-1]["status"] == "completed"
+        assert events[-1]["important"] == 1
+        assert FakeEngine.instances[0].kwargs["fetch_workers"] == 3
+
+    def test_backend_uses_config_defaults(self, fake_run, monkeypatch):
+        monkeypatch.setattr(cli, "LLM_CONCURRENCY", 6)
+        for argv, concurrency in (([], 6), (["--llm-workers", "8"], 8)):
+            cli.run_once(_args("--model", "m", *argv), cli.Reporter(True, io.StringIO()), threading.Event(),
+                         service=MagicMock())
+            cli.create_backend.assert_called_with(
+                cli.LLM_BACKEND, url=cli.LLM_URL, model="m", concurrency=concurrency
+            )
+
+    def test_backend_unavailable(self, fake_run):
+        fake_run.check_available.return_value = (False, "Cannot connect")
+        out = io.StringIO()
+        code = cli.run_once(_args("--json"), cli.Reporter(True, out), threading.Event(), service=MagicMock())
+
+        assert code == cli.EXIT_UNAVAILABLE
+        assert json.loads(out.getvalue())["message"] == "Cannot connect"
+        assert FakeEngine.instances == []
+
+    def test_daemon_runs_on_schedule_and_resumes(self, fake_run):
+        out = io.StringIO()
+        args = _args("--daemon", "--interval", "0", "--max-runs", "3")
+        args.resume = True
+        code = cli.run_daemon(args, cli.Reporter(False, out), threading.Event(), service=MagicMock())
+
+        assert code == cli.EXIT_OK
+        assert len(FakeEngine.instances) == 3
+        assert all(engine.resume for engine in FakeEngine.instances)
+        assert out.getvalue().count("[sleeping]") == 2
+
+    def test_does_not_import_tk(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, cli; print(any(m in sys.modules for m in ('tkinter', 'gui', 'pystray')))"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(cli.__file__)),
+        )
+        assert result.stdout.strip() == "False"
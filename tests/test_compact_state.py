@@ -0,0 +1,101 @@
+import os
+import tracemalloc
+
+import pytest
+
+from compact_state import CompactRunState
+from state import RunState
+
+HEX_IDS = [f"{i:016x}" for i in (0x18c2f0a1b2c3d4e5, 0x18c2f0a1b2c3d4e6, 0x0000000000000abc, 0x1000000000000000)]
+
+
+@pytest.fixture
+def tmp_compact(tmp_path, monkeypatch):
+    cp = str(tmp_path / "checkpoint.bin")
+    monkeypatch.setattr("compact_state.COMPACT_CHECKPOINT_FILE", cp)
+    return cp
+
+
+class TestCompactRunState:
+    def test_ids_round_trip_at_api_boundary(self):
+        state = CompactRunState()
+        state.set_message_ids(HEX_IDS + ["legacy-id"])
+        assert list(state.unprocessed_ids()) == HEX_IDS + ["legacy-id"]
+
+    def test_verdicts_labels_and_counts(self):
+        state = CompactRunState()
+        state.set_message_ids(HEX_IDS + ["legacy-id"])
+        assert state.record_verdicts({HEX_IDS[0]: "important", "legacy-id": "low_priority"}) == 2
+        state.mark_labeled([HEX_IDS[0]])
+
+        assert state.verdict(HEX_IDS[0]) == "important"
+        assert state.verdict(HEX_IDS[1]) is None
+        assert state.verdict("unknown") is None
+        assert state.counts() == {"important": 1, "low_priority": 1}
+        assert state.classified_unlabeled("important") == []
+        assert state.classified_unlabeled("low_priority") == ["legacy-id"]
+        assert dict(state.iter_verdicts()) == {HEX_IDS[0]: "important", "legacy-id": "low_priority"}
+
+    def test_save_load_round_trip(self, tmp_compact):
+        state = CompactRunState()
+        state.set_message_ids(HEX_IDS + ["legacy-id"])
+        state.save()
+        state.record_verdicts({HEX_IDS[2]: "low_priority", "legacy-id": "important"})
+        state.mark_labeled(["legacy-id"])
+        state.save()
+
+        loaded = CompactRunState.load()
+        assert loaded.total() == 5
+        assert loaded.processed_count() == 2
+        assert loaded.verdict(HEX_IDS[2]) == "low_priority"
+        assert loaded.classified_unlabeled("important") == []
+        assert list(loaded.unprocessed_ids()) == [HEX_IDS[0], HEX_IDS[1], HEX_IDS[3]]
+
+    def test_incremental_save_rewrites_in_place(self, tmp_compact, monkeypatch):
+        state = CompactRunState()
+        state.set_message_ids(HEX_IDS)
+        state.save()
+
+        replaced = []
+        monkeypatch.setattr("os.replace", lambda src, dst: replaced.append(dst))
+        size = os.path.getsize(tmp_compact)
+        state.record_verdicts({HEX_IDS[1]: "important"})
+        state.save()
+
+        assert replaced == []
+        assert os.path.getsize(tmp_compact) == size
+        assert CompactRunState.load().verdict(HEX_IDS[1]) == "important"
+
+    def test_load_missing_and_clear(self, tmp_compact):
+        assert CompactRunState.load() is None
+        state = CompactRunState()
+        state.set_message_ids(HEX_IDS)
+        state.save()
+        CompactRunState.clear()
+        assert CompactRunState.load() is None
+
+    def test_order_of_magnitude_smaller_than_run_state(self):
+        n = 20_000
+
+        def ids():
+            return [f"{0x18c2f0a100000000 + i:016x}" for i in range(n)]
+
+        def traced(build):
+            tracemalloc.start()
+            try:
+                state = build(ids())
+                return tracemalloc.get_traced_memory()[0], state
+            finally:
+                tracemalloc.stop()
+
+        def fill(state, mids):
+            state.set_message_ids(mids)
+            state.record_verdicts({mid: "important" for mid in mids})
+            state.mark_labeled(mids)
+            return state
+
+        legacy_bytes, _ = traced(lambda mids: fill(RunState(), mids))
+        compact_bytes, compact = traced(lambda mids: fill(CompactRunState(), mids))
+
+        assert compact.memory_bytes() / n < 22
+        assert compact_bytes * 8 < legacy_bytes
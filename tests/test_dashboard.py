@@ -0,0 +1,16 @@
+from dashboard import format_duration, sparkline_points
+
+
+class TestDashboardHelpers:
+    def test_sparkline_scales_to_box(self):
+        points = sparkline_points([0, 5, 10], width=104, height=24, pad=2)
+        assert points == [2, 22.0, 52.0, 12.0, 102.0, 2.0]
+
+    def test_sparkline_skips_gaps_and_short_series(self):
+        assert sparkline_points([None, 3], 100, 20) == []
+        assert len(sparkline_points([1, None, 2, 3], 100, 20)) == 6
+
+    def test_format_duration(self):
+        assert format_duration(None) == "-"
+        assert format_duration(75) == "1m 15s"
+        assert format_duration(3 * 3600 + 120) == "3h 02m"
@@ -0,0 +1,41 @@
+import os
+
+from details_store import DetailsStore
+
+
+def _details(start, n):
+    return {
+        f"m{i:05d}": {"from": f"s{i}@t.com", "subject": f"Subject {i}", "date": "2025-01-01", "snippet": "x" * 100}
+        for i in range(start, start + n)
+    }
+
+
+class TestDetailsStore:
+    def test_stays_in_memory_under_budget(self, tmp_path):
+        store = DetailsStore(budget_mb=1, path=str(tmp_path / "details.sqlite3"))
+        store.update(_details(0, 10))
+
+        assert len(store) == 10
+        assert not store.spilled
+        assert dict(store.items())["m00003"] == {"date": "2025-01-01", "from": "s3@t.com", "subject": "Subject 3"}
+        assert not os.path.exists(tmp_path / "details.sqlite3")
+
+    def test_spills_past_budget(self, tmp_path):
+        path = str(tmp_path / "details.sqlite3")
+        store = DetailsStore(budget_mb=0.01, path=path)  # ~10 KB
+        for start in range(0, 3000, 25):
+            store.update(_details(start, 25))
+        store.update(_details(0, 25))  # repeats are not double counted
+
+        assert store.spilled
+        assert os.path.exists(path)
+        assert len(store) == 3000
+        items = dict(store.items())
+        assert len(items) == 3000
+        assert items["m02999"]["subject"] == "Subject 2999"
+        # Memory stopped growing at the budget
+        assert store.stats()["memory_high_water_mb"] < 0.02
+
+        store.close()
+        assert not os.path.exists(path)
+        assert len(store) == 0
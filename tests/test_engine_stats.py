@@ -0,0 +1,67 @@
+from llm_classifier import LLMUsage
+from engine_stats import EngineStats, RateTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateTracker:
+    def test_rate_over_window(self):
+        clock = FakeClock()
+        tracker = RateTracker(window=10, clock=clock)
+        for _ in range(10):
+            tracker.add(5)
+            clock.now += 1
+
+        assert tracker.total == 50
+        assert tracker.rate() == 5.0
+
+    def test_old_buckets_expire(self):
+        clock = FakeClock()
+        tracker = RateTracker(window=5, clock=clock)
+        tracker.add(100)
+        clock.now += 30
+
+        assert tracker.rate() == 0.0
+        assert tracker.total == 100
+
+    def test_young_tracker_uses_covered_time(self):
+        clock = FakeClock()
+        tracker = RateTracker(window=60, clock=clock)
+        tracker.add(20)
+        clock.now += 2
+        tracker.add(20)
+
+        assert tracker.rate() == 20.0
+
+
+class TestEngineStats:
+    def test_snapshot_eta_and_latency(self):
+        clock = FakeClock()
+        stats = EngineStats(window=10, clock=clock)
+        for _ in range(10):
+            stats.add("fetch", 10)
+            stats.add("classify", 10)
+            clock.now += 1
+        usage = LLMUsage()
+        for ms in (100, 200, 300):
+            usage.record({"prompt_eval_count": 10}, wall=ms / 1000)
+
+        snap = stats.snapshot(done=100, total=1100, usage=usage, queues={"classify": 2})
+
+        assert snap["emails_per_second"] == 10.0
+        assert snap["eta_seconds"] == 100
+        assert snap["stages"]["fetch"] == {"per_second": 10.0, "total": 100}
+        assert snap["stages"]["label"]["total"] == 0
+        assert snap["queues"] == {"classify": 2}
+        assert snap["llm_latency_ms"]["p50"] == 200.0
+
+    def test_snapshot_without_progress(self):
+        snap = EngineStats().snapshot(done=0, total=10)
+        assert snap["eta_seconds"] is None
+        assert snap["llm_latency_ms"] is None
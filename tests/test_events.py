@@ -0,0 +1,57 @@
+import threading
+
+from events import EventBus
+
+
+class TestEventBus:
+    def test_drain_aggregates_progress(self):
+        bus = EventBus()
+        bus.progress(1, 10, "important")
+        bus.progress(3, 10, "low_priority")
+        bus.progress(2, 10, "low_priority")  # finished out of order
+        bus.log("first")
+        bus.log("second")
+
+        frame = bus.drain()
+        assert frame.done == 3
+        assert frame.total == 10
+        assert frame.counts == {"important": 1, "low_priority": 2}
+        assert frame.logs == ["first", "second"]
+        assert not bus.drain()
+
+    def test_log_lines_are_capped_per_frame(self):
+        bus = EventBus(max_log_lines=5)
+        for i in range(100):
+            bus.log(f"line {i}")
+
+        frame = bus.drain()
+        assert frame.logs == [f"line {i}" for i in range(95, 100)]
+        assert frame.skipped_logs == 95
+
+    def test_concurrent_publishers_lose_nothing(self):
+        bus = EventBus()
+        totals = {"important": 0, "low_priority": 0}
+        stop = threading.Event()
+
+        def consume():
+            while not stop.is_set():
+                for cls, n in bus.drain().counts.items():
+                    totals[cls] += n
+
+        def publish(cls):
+            for i in range(5000):
+                bus.progress(i, 20000, cls)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        producers = [threading.Thread(target=publish, args=(cls,)) for cls in ("important", "low_priority") * 2]
+        for t in producers:
+            t.start()
+        for t in producers:
+            t.join()
+        stop.set()
+        consumer.join()
+        for cls, n in bus.drain().counts.items():
+            totals[cls] += n
+
+        assert totals == {"important": 10000, "low_priority": 10000}
@@ -0,0 +1,63 @@
+from collections import Counter
+
+import pytest
+
+from benchmarks.fake_gmail import FakeGmailError, FakeGmailService
+from benchmarks.mailbox import Mailbox
+from gmail_client import GmailClient
+
+
+class TestMailbox:
+    def test_deterministic_by_index_and_seed(self):
+        a, b = Mailbox(100, seed=3), Mailbox(100, seed=3)
+        assert a.message(42) == b.message(42)
+        assert a.message(42) != Mailbox(100, seed=4).message(42)
+        assert Mailbox.index_of(a.message(42)["id"]) == 42
+        with pytest.raises(KeyError):
+            a.message(100)
+
+    def test_category_mix_and_sender_skew(self):
+        mailbox = Mailbox(5000)
+        categories = Counter(mailbox.category(i) for i in range(5000))
+        assert 0.33 < categories["marketing"] / 5000 < 0.43
+        assert 0.10 < categories["personal"] / 5000 < 0.20
+
+        senders = Counter(m["from"] for m in mailbox if "shop" in m["from"])
+        top, *rest = senders.most_common()
+        # Zipf-like: the busiest shop sends far more than the median one
+        assert top[1] > 3 * rest[len(rest) // 2][1]
+
+
+class TestFakeGmailService:
+    def test_gmail_client_round_trip(self):
+        service = FakeGmailService(Mailbox(1200))
+        client = GmailClient(service)
+
+        ids = client.fetch_message_ids("is:unread")
+        assert len(ids) == 1200 and len(set(ids)) == 1200
+
+        details = client.fetch_message_details_batch(ids[:30])
+        assert details[ids[0]] == Mailbox(1200).message(0)
+
+        client.ensure_labels_exist()
+        client.apply_label_batch(ids[:30], client.get_label_id("AI/Important"))
+
+        stats = service.stats()
+        assert stats["http_calls"]["messages.list"] == 3
+        assert stats["http_calls"]["batch"] == 4  # 2 fetch + 2 label batches of 25
+        assert stats["api_requests"]["messages.get"] == 30
+        assert stats["labeled"] == 30
+
+    def test_batch_limit_and_unknown_ids(self):
+        service = FakeGmailService(Mailbox(10))
+        batch = service.new_batch_http_request()
+        errors = []
+        batch.add(service.users().messages().get(id="ffff"), callback=lambda rid, resp, err: errors.append(err))
+        batch.execute()
+        assert isinstance(errors[0], KeyError)
+
+        big = service.new_batch_http_request()
+        for i in range(101):
+            big.add(service.users().messages().get(id=Mailbox.message_id(0)))
+        with pytest.raises(FakeGmailError):
+            big.execute()
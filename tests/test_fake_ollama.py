@@ -0,0 +1,98 @@
+import json
+import random
+import time
+
+import pytest
+import requests
+
+from benchmarks.fake_ollama import FakeOllamaServer, LatencyModel, keyword_verdict
+from llm_backends import OllamaBackend, OpenAICompatibleBackend
+from llm_classifier import classify_batch, classify_email
+
+
+@pytest.fixture
+def fake_server():
+    with FakeOllamaServer(model="test-model") as server:
+        yield server
+
+
+class TestLatencyModel:
+    def test_fixed(self):
+        assert LatencyModel("fixed:0.25").sample(random.Random(0)) == 0.25
+
+    def test_seeded_samples_are_deterministic(self):
+        model = LatencyModel("lognormal:0.3,0.5")
+        a = [model.sample(random.Random(1)) for _ in range(3)]
+        b = [model.sample(random.Random(1)) for _ in range(3)]
+        assert a == b
+        assert all(v >= 0 for v in a)
+
+    def test_unknown_distribution_raises(self):
+        with pytest.raises(ValueError):
+            LatencyModel("pareto:1")
+
+
+class TestFakeOllamaServer:
+    def test_tags_lists_model(self, fake_server):
+        ok, msg = OllamaBackend(url=fake_server.url, model="test-model").check_available()
+        assert ok is True
+
+    def test_classify_is_deterministic(self, fake_server):
+        backend = OllamaBackend(url=fake_server.url, model="test-model")
+        assert classify_email("shop@x.com", "50% off today", "Big sale", backend=backend) == "low_priority"
+        assert classify_email("bob@x.com", "Lunch?", "Are you free", backend=backend) == "important"
+        assert keyword_verdict("<email_data>Weekly newsletter") == "UNIMPORTANT"
+
+    def test_non_streaming_reports_timings(self, fake_server):
+        r = requests.post(
+            f"{fake_server.url}/api/chat",
+            json={"model": "test-model", "messages": [{"role": "user", "content": "hi there"}], "stream": False},
+        )
+        data = r.json()
+        assert data["done"] is True
+        assert data["prompt_eval_count"] >= 1
+        assert "eval_duration" in data
+
+    def test_streaming_chat(self, fake_server):
+        r = requests.post(
+            f"{fake_server.url}/api/chat",
+            json={"model": "test-model", "messages": [{"role": "user", "content": "hello"}]},
+            stream=True,
+        )
+        chunks = [json.loads(line) for line in r.iter_lines() if line]
+        assert chunks[-1]["done"] is True
+        assert "".join(c["message"]["content"] for c in chunks) == "IMPORTANT"
+
+    def test_embeddings(self, fake_server):
+        r = requests.post(f"{fake_server.url}/api/embed", json={"input": ["a", "b"]})
+        embeddings = r.json()["embeddings"]
+        assert len(embeddings) == 2
+        assert len(embeddings[0]) == fake_server.embedding_dim
+        legacy = requests.post(f"{fake_server.url}/api/embeddings", json={"prompt": "a"}).json()
+        assert legacy["embedding"] == embeddings[0]
+
+    def test_openai_endpoint(self, fake_server):
+        backend = OpenAICompatibleBackend(url=fake_server.url, model="test-model")
+        assert backend.check_available() == (True, "OK")
+        result = backend.chat("sys", "<email_data>Newsletter")
+        assert result.content == "UNIMPORTANT"
+        assert result.usage["prompt_eval_count"] >= 1
+
+
+class TestSimulation:
+    def test_slot_limit_serializes_requests(self, sample_emails):
+        with FakeOllamaServer(latency="fixed:0.05", slots=1) as server:
+            backend = OllamaBackend(url=server.url, concurrency=3)
+            start = time.perf_counter()
+            classify_batch(sample_emails, backend=backend)
+            elapsed = time.perf_counter() - start
+
+        assert server.stats["max_in_flight"] == 1
+        assert server.stats["max_waiting"] >= 1
+        assert elapsed >= 0.15
+
+    def test_error_rate_falls_back_to_important(self):
+        with FakeOllamaServer(error_rate=1.0) as server:
+            backend = OllamaBackend(url=server.url)
+            assert classify_email("shop@x.com", "Sale", "50% off", backend=backend) == "important"
+        assert server.stats["errors"] == 1
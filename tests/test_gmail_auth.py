@@ -3,7 +3,8 @@ from unittest.mock import MagicMock, mock_open, patch
 
 import pytest
 
-from gmail_auth import get_gmail_service
+import gmail_auth
+from gmail_auth import build_service, get_gmail_service
 
 
 @pytest.fixture
@@ -17,8 +18,8 @@ def mock_creds():
 
 
 class TestGetGmailService:
-    @patch("gmail_auth.build")
-    @patch("gmail_auth.Credentials.from_authorized_user_file")
+    @patch("gmail_auth.build_service")
+    @patch("google.oauth2.credentials.Credentials.from_authorized_user_file")
     @patch("gmail_auth.os.path.exists")
     def test_valid_token_loads_service(self, mock_exists, mock_from_file, mock_build, mock_creds):
         mock_exists.return_value = True
@@ -28,11 +29,11 @@ class TestGetGmailService:
         service = get_gmail_service()
 
         mock_from_file.assert_called_once()
-        mock_build.assert_called_once_with("gmail", "v1", credentials=mock_creds)
+        mock_build.assert_called_once_with(mock_creds)
         assert service is not None
 
-    @patch("gmail_auth.build")
-    @patch("gmail_auth.Credentials.from_authorized_user_file")
+    @patch("gmail_auth.build_service")
+    @patch("google.oauth2.credentials.Credentials.from_authorized_user_file")
     @patch("gmail_auth.os.path.exists")
     def test_expired_token_refreshes(self, mock_exists, mock_from_file, mock_build, mock_creds):
         mock_creds.valid = False
@@ -45,8 +46,8 @@ class TestGetGmailService:
 
         mock_creds.refresh.assert_called_once()
 
-    @patch("gmail_auth.build")
-    @patch("gmail_auth.InstalledAppFlow.from_client_secrets_file")
+    @patch("gmail_auth.build_service")
+    @patch("google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file")
     @patch("gmail_auth.os.path.exists")
     def test_no_token_triggers_browser_flow(self, mock_exists, mock_flow_cls, mock_build):
         # First call: token file doesn't exist; second call: client_secret exists
@@ -71,8 +72,8 @@ class TestGetGmailService:
         with pytest.raises(FileNotFoundError, match="client_secret"):
             get_gmail_service()
 
-    @patch("gmail_auth.build")
-    @patch("gmail_auth.InstalledAppFlow.from_client_secrets_file")
+    @patch("gmail_auth.build_service")
+    @patch("google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file")
     @patch("gmail_auth.os.path.exists")
     def test_token_saved_after_fresh_auth(self, mock_exists, mock_flow_cls, mock_build):
         mock_exists.side_effect = [False, True]
@@ -90,3 +91,35 @@ class TestGetGmailService:
 
         # Verify token was written
         m().write.assert_called_once_with('{"token": "saved"}')
+
+
+class TestDiscoveryCache:
+    @pytest.fixture(autouse=True)
+    def cache_file(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "gmail.v1.discovery.json")
+        monkeypatch.setattr("gmail_auth.DISCOVERY_CACHE_FILE", path)
+        monkeypatch.setattr("gmail_auth._discovery", {})
+        return path
+
+    def test_seeds_cache_from_bundled_document(self, cache_file):
+        doc = gmail_auth.discovery_document()
+
+        assert doc["name"] == "gmail"
+        assert os.path.exists(cache_file)
+
+    def test_loads_cached_document_once(self, cache_file):
+        with open(cache_file, "w") as f:
+            f.write('{"name": "gmail", "cached": true}')
+
+        with patch("builtins.open", wraps=open) as opened:
+            assert gmail_auth.discovery_document()["cached"] is True
+            assert gmail_auth.discovery_document()["cached"] is True
+        assert opened.call_count == 1
+
+    @patch("googleapiclient.discovery.build_from_document")
+    def test_build_service_uses_static_document(self, mock_build_from_document, mock_creds):
+        build_service(mock_creds)
+
+        doc = mock_build_from_document.call_args.args[0]
+        assert doc["name"] == "gmail"
+        assert mock_build_from_document.call_args.kwargs["credentials"] is mock_creds
@@ -0,0 +1,55 @@
+import time
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from http_pool import PoolAdapter, build_session
+from llm_backends import OllamaBackend
+from llm_classifier import classify_batch
+
+
+def _emails(n):
+    return [
+        {"id": f"m{i}", "from": "a@b.com", "subject": f"Hello {i}", "snippet": "text"}
+        for i in range(n)
+    ]
+
+
+class TestBuildSession:
+    def test_per_endpoint_adapters(self):
+        session = build_session("http://llm.test", "/api/chat", pool_size=6)
+        hot = session.get_adapter("http://llm.test/api/chat")
+        cold = session.get_adapter("http://llm.test/api/tags")
+        assert isinstance(hot, PoolAdapter) and hot.pool_size == 6
+        assert isinstance(cold, PoolAdapter) and cold.pool_size == 2
+
+    def test_ensure_capacity_grows_pool(self):
+        session = build_session("http://llm.test", "/api/chat", pool_size=2)
+        session.ensure_capacity("http://llm.test/api/chat", 8)
+        assert session.get_adapter("http://llm.test/api/chat").pool_size == 8
+        assert session.connection_stats()["pool_sizes"]["http://llm.test/api/chat"] == 8
+
+
+class TestConnectionReuse:
+    def test_connections_reused_across_batches(self):
+        with FakeOllamaServer(latency="fixed:0.01", slots=4) as server:
+            backend = OllamaBackend(url=server.url, concurrency=4)
+            classify_batch(_emails(8), backend=backend)
+            classify_batch(_emails(8), backend=backend)
+            stats = backend.connection_stats()
+
+        assert stats["requests"] == 16
+        assert stats["connections_opened"] <= 4
+        assert stats["connections_reused"] >= 12
+        assert stats["reuse_ratio"] >= 0.75
+
+    def test_idle_connections_reaped(self):
+        with FakeOllamaServer() as server:
+            backend = OllamaBackend(url=server.url)
+            backend.session.idle_timeout = 0.01
+            classify_batch(_emails(1), backend=backend)
+            time.sleep(0.05)
+            classify_batch(_emails(1), backend=backend)
+            stats = backend.connection_stats()
+
+        assert stats["idle_reaps"] == 1
+        assert stats["requests"] == 2
+        assert stats["connections_opened"] == 2
@@ -0,0 +1,138 @@
+import pytest
+import requests
+import responses
+
+from config import LLM_BACKEND_URLS
+from llm_backends import (
+    BACKENDS,
+    InferenceBackend,
+    LlamaCppBackend,
+    OllamaBackend,
+    OpenAICompatibleBackend,
+    create_backend,
+)
+from llm_classifier import classify_batch, classify_email
+
+URL = "http://llm.test"
+
+
+class TestCreateBackend:
+    def test_known_backends(self):
+        assert isinstance(create_backend("ollama", url=URL), OllamaBackend)
+        assert isinstance(create_backend("llamacpp", url=URL), LlamaCppBackend)
+        assert isinstance(create_backend("openai", url=URL), OpenAICompatibleBackend)
+
+    def test_unknown_backend_raises(self):
+        with pytest.raises(ValueError):
+            create_backend("nope")
+
+    def test_capabilities(self):
+        assert OllamaBackend(url=URL).continuous_batching is False
+        assert OpenAICompatibleBackend(url=URL).continuous_batching is True
+        assert create_backend("openai", url=URL, concurrency=3).max_concurrency == 3
+
+    def test_config_lists_every_backend(self):
+        # The GUI lists backends from config so it does not import requests at startup
+        assert {name: cls.default_url for name, cls in BACKENDS.items()} == LLM_BACKEND_URLS
+
+    def test_base_class_is_abstract(self):
+        with pytest.raises(TypeError):
+            InferenceBackend(url=URL)
+
+
+class TestOpenAICompatibleBackend:
+    @responses.activate
+    def test_chat_normalizes_usage(self):
+        responses.add(
+            responses.POST,
+            f"{URL}/v1/chat/completions",
+            json={
+                "choices": [{"message": {"content": "UNIMPORTANT"}}],
+                "usage": {"prompt_tokens": 80, "completion_tokens": 2},
+            },
+            status=200,
+        )
+        backend = OpenAICompatibleBackend(url=URL, model="m", api_key="secret")
+        result = backend.chat("sys", "user")
+
+        assert result.content == "UNIMPORTANT"
+        assert result.usage == {"prompt_eval_count": 80, "eval_count": 2}
+        assert responses.calls[0].request.headers["Authorization"] == "Bearer secret"
+
+    @responses.activate
+    def test_check_available_model_missing(self):
+        responses.add(
+            responses.GET, f"{URL}/v1/models", json={"data": [{"id": "other"}]}, status=200
+        )
+        ok, msg = OpenAICompatibleBackend(url=URL, model="m").check_available()
+        assert ok is False
+        assert "not found" in msg
+
+    @responses.activate
+    def test_classify_email_through_backend(self):
+        responses.add(
+            responses.POST,
+            f"{URL}/v1/chat/completions",
+            json={"choices": [{"message": {"content": "UNIMPORTANT"}}]},
+            status=200,
+        )
+        backend = OpenAICompatibleBackend(url=URL, model="m")
+        assert classify_email("a@b.com", "Sale", "Buy", backend=backend) == "low_priority"
+
+
+class TestLlamaCppBackend:
+    @responses.activate
+    def test_timings_converted_to_nanoseconds(self):
+        responses.add(
+            responses.POST,
+            f"{URL}/v1/chat/completions",
+            json={
+                "choices": [{"message": {"content": "IMPORTANT"}}],
+                "timings": {"prompt_n": 90, "prompt_ms": 12.5, "predicted_n": 1, "predicted_ms": 4.0},
+            },
+            status=200,
+        )
+        result = LlamaCppBackend(url=URL).chat("sys", "user")
+        assert result.usage["prompt_eval_count"] == 90
+        assert result.usage["prompt_eval_duration"] == 12_500_000
+        assert result.usage["total_duration"] == 16_500_000
+
+    @responses.activate
+    def test_loading_model_is_unavailable(self):
+        responses.add(responses.GET, f"{URL}/health", json={}, status=503)
+        ok, msg = LlamaCppBackend(url=URL).check_available()
+        assert ok is False
+        assert "loading" in msg
+
+    @responses.activate
+    def test_connection_refused(self):
+        responses.add(
+            responses.GET, f"{URL}/health", body=requests.ConnectionError("refused")
+        )
+        ok, msg = LlamaCppBackend(url=URL).check_available()
+        assert ok is False
+        assert "Cannot connect" in msg
+
+
+class TestClassifyBatchConcurrency:
+    @responses.activate
+    def test_uses_backend_concurrency(self, sample_emails, monkeypatch):
+        responses.add(
+            responses.POST,
+            f"{URL}/v1/chat/completions",
+            json={"choices": [{"message": {"content": "IMPORTANT"}}]},
+            status=200,
+        )
+        seen = []
+        real_pool = __import__("llm_classifier").ThreadPoolExecutor
+
+        def tracking_pool(max_workers):
+            seen.append(max_workers)
+            return real_pool(max_workers=max_workers)
+
+        monkeypatch.setattr("llm_classifier.ThreadPoolExecutor", tracking_pool)
+        backend = OpenAICompatibleBackend(url=URL, concurrency=7)
+        results = classify_batch(sample_emails, backend=backend)
+
+        assert seen == [7]
+        assert set(results.values()) == {"important"}
@@ -4,7 +4,13 @@ import pytest
 import requests
 import responses
 
-from llm_classifier import check_ollama_available, classify_email, classify_batch
+from llm_classifier import (
+    LLMUsage,
+    check_ollama_available,
+    classify_email,
+    classify_batch,
+    get_prompt_template,
+)
 from config import OLLAMA_URL, OLLAMA_MODEL
 
 
@@ -139,3 +145,130 @@ class TestClassifyBatch:
         assert len(results) == 3
         assert all(v == "important" for v in results.values())
         assert set(results.keys()) == {"msg001", "msg002", "msg003"}
+
+
+class TestPromptTemplates:
+    def test_compact_template_is_shorter(self):
+        default = get_prompt_template("default")
+        compact = get_prompt_template("compact")
+        args = ('"Shop Deals" <news@shop.com>', "Sale", "A" * 300)
+        assert len(compact.system) + len(compact.render(*args)) < (
+            len(default.system) + len(default.render(*args))
+        )
+        assert "Shop Deals <news@shop.com>" in compact.render(*args)
+
+    def test_unknown_template_raises(self):
+        with pytest.raises(ValueError):
+            get_prompt_template("nope")
+
+    @responses.activate
+    def test_template_selects_system_prompt(self):
+        captured = []
+
+        def request_callback(request):
+            import json
+            captured.append(json.loads(request.body))
+            return (200, {}, '{"message": {"content": "IMPORTANT"}}')
+
+        responses.add_callback(
+            responses.POST, f"{OLLAMA_URL}/api/chat", callback=request_callback
+        )
+        classify_email("x@test.com", "Test", "Body", template="compact")
+
+        system = captured[0]["messages"][0]["content"]
+        assert system == get_prompt_template("compact").system
+
+
+class TestTokenBudget:
+    @responses.activate
+    def test_budget_trims_snippet_and_records_usage(self):
+        captured = []
+
+        def request_callback(request):
+            import json
+            captured.append(json.loads(request.body))
+            return (200, {}, '{"message": {"content": "IMPORTANT"}, "prompt_eval_count": 120}')
+
+        responses.add_callback(
+            responses.POST, f"{OLLAMA_URL}/api/chat", callback=request_callback
+        )
+        usage = LLMUsage()
+        classify_email(
+            "x@test.com", "Subject", "B" * 200, template="compact", token_budget=100, usage=usage
+        )
+
+        user_msg = captured[0]["messages"][1]["content"]
+        assert "B" * 120 not in user_msg
+        summary = usage.summary()
+        assert summary["emails"] == 1
+        assert summary["total"] == 120
+        assert summary["trimmed"] == 1
+
+    @responses.activate
+    def test_no_budget_keeps_full_snippet(self):
+        responses.add(
+            responses.POST,
+            f"{OLLAMA_URL}/api/chat",
+            json={"message": {"content": "IMPORTANT"}, "prompt_eval_count": 90},
+            status=200,
+        )
+        usage = LLMUsage()
+        classify_email("x@test.com", "Test", "Body", token_budget=0, usage=usage)
+        assert usage.summary()["trimmed"] == 0
+
+
+    def test_same_input_gets_same_prompt_across_runs(self):
+        from llm_backends import ChatResult
+
+        prompts = []
+        # Reported token counts vary from run to run; the trimming must not
+        reported = iter([30, 500, 12, 900, 45, 250])
+        backend = MagicMock(max_concurrency=2)
+        backend.chat.side_effect = lambda system, user, **kw: (
+            prompts.append(user) or ChatResult("IMPORTANT", {"prompt_eval_count": next(reported)})
+        )
+        emails = [
+            {"id": str(i), "from": "x@test.com", "subject": "S" * 40, "snippet": "B" * 300} for i in range(3)
+        ]
+        runs = []
+        for _ in range(2):
+            prompts.clear()
+            usage = LLMUsage()
+            classify_batch(emails, usage=usage, backend=backend, template="compact", token_budget=60)
+            runs.append(sorted(prompts))
+            assert usage.summary()["trimmed"] == 3
+        assert runs[0] == runs[1]
+        assert usage.summary()["chars_per_token"] > 0
+
+
+class TestCostAccounting:
+    def test_cost_summary_from_timing_fields(self):
+        usage = LLMUsage()
+        for i in range(1, 5):
+            usage.record(
+                {
+                    "total_duration": 100_000_000,
+                    "load_duration": 0,
+                    "prompt_eval_count": 200,
+                    "prompt_eval_duration": 80_000_000,
+                    "eval_count": 2,
+                    "eval_duration": 20_000_000,
+                },
+                wall=0.1 + i * 0.01,
+            )
+        cost = usage.cost_summary()
+
+        assert cost["emails"] == 4
+        assert cost["latency_ms"]["prompt_eval"]["p50"] == 80.0
+        assert cost["latency_ms"]["queue"]["max"] == 40.0
+        assert cost["prefill_tokens_per_sec"] == 2500.0
+        assert cost["decode_tokens_per_sec"] == 100.0
+        assert cost["time_share"]["prefill"] > cost["time_share"]["decode"]
+
+    @responses.activate
+    def test_errors_counted(self):
+        responses.add(responses.POST, f"{OLLAMA_URL}/api/chat", json={}, status=500)
+        usage = LLMUsage()
+        classify_email("x@test.com", "Test", "Body", usage=usage)
+        assert usage.cost_summary()["errors"] == 1
+        assert usage.cost_summary()["emails"] == 0
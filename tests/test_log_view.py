@@ -0,0 +1,52 @@
+from log_view import LogBuffer, parse_line
+
+
+class TestParseLine:
+    def test_levels_and_verdicts(self):
+        assert parse_line(1, "ERROR: boom").level == "error"
+        assert parse_line(1, "Warning: slow").level == "warning"
+        line = parse_line(1, "[3/10] LOW_PRIORITY: Sale")
+        assert (line.level, line.verdict) == ("info", "low_priority")
+        assert parse_line(1, "Done!").verdict == ""
+
+
+class TestLogBuffer:
+    def test_capacity_drops_oldest(self):
+        buf = LogBuffer(capacity=3)
+        buf.extend(f"line {i}" for i in range(5))
+
+        assert len(buf) == 3
+        assert buf.dropped == 2
+        assert [l.text for l in buf.window(0, 10)] == ["line 2", "line 3", "line 4"]
+
+    def test_filters(self):
+        buf = LogBuffer(capacity=10)
+        buf.extend([
+            "[1/3] IMPORTANT: Invoice",
+            "[2/3] LOW_PRIORITY: Newsletter",
+            "ERROR: timeout",
+            "[3/3] IMPORTANT: Meeting",
+        ])
+
+        buf.set_filter(verdict="important")
+        assert [l.text for l in buf.window(0, 10)] == ["[1/3] IMPORTANT: Invoice", "[3/3] IMPORTANT: Meeting"]
+        buf.set_filter(verdict="", levels=("error",))
+        assert [l.text for l in buf.window(0, 10)] == ["ERROR: timeout"]
+        buf.set_filter(levels=("info", "warning", "error"), search="news")
+        assert [l.text for l in buf.window(0, 10)] == ["[2/3] LOW_PRIORITY: Newsletter"]
+
+    def test_filtered_view_tracks_eviction(self):
+        buf = LogBuffer(capacity=4)
+        buf.set_filter(verdict="important")
+        for i in range(20):
+            buf.append(f"[{i}/20] {'IMPORTANT' if i % 2 else 'LOW_PRIORITY'}: m{i}")
+
+        # Only the 4 newest lines are kept; 2 of them are important
+        assert [l.text for l in buf.window(0, 10)] == ["[17/20] IMPORTANT: m17", "[19/20] IMPORTANT: m19"]
+
+    def test_window_is_a_slice_of_the_view(self):
+        buf = LogBuffer(capacity=1000)
+        buf.extend(f"line {i}" for i in range(1000))
+
+        assert [l.text for l in buf.window(500, 3)] == ["line 500", "line 501", "line 502"]
+        assert len(buf.window(998, 10)) == 2
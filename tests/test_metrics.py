@@ -0,0 +1,101 @@
+import json
+import urllib.request
+
+import pytest
+
+import metrics
+from gmail_client import API_REQUESTS, BATCH_SIZES, GmailClient
+from pipeline import STAGE_ITEMS, Pipeline, Stage
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+class TestMetrics:
+    def test_counter_and_gauge_labels(self, registry):
+        calls = registry.counter("calls_total", "Calls", ("method",))
+        calls.inc(method="get")
+        calls.inc(3, method="get")
+        depth = registry.gauge("depth", "Depth")
+        depth.set(5)
+        depth.dec()
+
+        assert calls.value(method="get") == 4
+        assert calls.value(method="list") == 0
+        assert depth.value() == 4
+        assert registry.counter("calls_total", "Calls", ("method",)) is calls
+        with pytest.raises(ValueError):
+            calls.inc(stage="x")
+        with pytest.raises(ValueError):
+            registry.gauge("calls_total", "Calls", ("method",))
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        seconds = registry.histogram("op_seconds", "Op time", buckets=(0.1, 1))
+        for v in (0.05, 0.5, 0.7, 3):
+            seconds.observe(v)
+
+        value = seconds.value()
+        assert value["count"] == 4
+        assert value["sum"] == pytest.approx(4.25)
+        assert value["buckets"] == {"0.1": 1, "1": 3, "+Inf": 4}
+
+    def test_render_prometheus(self, registry):
+        registry.counter("calls_total", "Calls", ("method",)).inc(method='we"ird')
+        registry.histogram("op_seconds", "Op time", buckets=(1,)).observe(0.5)
+        text = registry.render_prometheus()
+
+        assert "# TYPE calls_total counter" in text
+        assert 'calls_total{method="we\\"ird"} 1' in text
+        assert "# TYPE op_seconds histogram" in text
+        assert 'op_seconds_bucket{le="1"} 1' in text
+        assert 'op_seconds_bucket{le="+Inf"} 1' in text
+        assert "op_seconds_count 1" in text
+
+    def test_snapshot_writer(self, registry, tmp_path):
+        registry.counter("calls_total", "Calls", ("method",)).inc(method="get")
+        path = str(tmp_path / "metrics.json")
+        writer = metrics.SnapshotWriter(path, interval=60, registry=registry).start()
+        writer.stop()  # writes a final snapshot
+
+        with open(path) as f:
+            data = json.load(f)
+        assert data["metrics"]["calls_total"] == [{"method": "get", "value": 1}]
+
+    def test_exporters_off_unless_configured(self, tmp_path):
+        assert metrics.start_exporters() == []
+
+        path = str(tmp_path / "metrics.json")
+        exporters = metrics.start_exporters(snapshot_file=path)
+        assert [type(e) for e in exporters] == [metrics.SnapshotWriter]
+        metrics.stop_exporters(exporters)
+        with open(path) as f:
+            assert "metrics" in json.load(f)
+
+    def test_http_endpoint(self, registry):
+        registry.gauge("depth", "Depth").set(2)
+        server = metrics.MetricsServer(port=0, host="127.0.0.1", registry=registry).start()
+        try:
+            base = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(base + "/metrics") as resp:
+                assert resp.headers["Content-Type"].startswith("text/plain")
+                assert "depth 2" in resp.read().decode()
+            with urllib.request.urlopen(base + "/metrics.json") as resp:
+                assert json.load(resp) == {"depth": 2}
+        finally:
+            server.stop()
+
+    def test_gmail_batches_are_counted(self, mock_gmail_service):
+        before = API_REQUESTS.value(method="messages.get")
+        batches = BATCH_SIZES.value(method="messages.get")["count"]
+        GmailClient(mock_gmail_service).fetch_message_details_batch([f"m{i}" for i in range(30)])
+
+        assert API_REQUESTS.value(method="messages.get") - before == 30
+        assert BATCH_SIZES.value(method="messages.get")["count"] - batches == 2
+
+    def test_pipeline_stage_items(self):
+        before = STAGE_ITEMS.value(stage="metrics-test")
+        Pipeline([Stage("metrics-test", lambda item: None)]).run(range(5))
+
+        assert STAGE_ITEMS.value(stage="metrics-test") - before == 5
@@ -0,0 +1,70 @@
+import json
+from itertools import count
+from unittest.mock import MagicMock
+
+from llm_classifier import classify_batch
+from llm_backends import ChatResult
+from msg_trace import EVENTS, MessageTrace, analyze, main, read_trace, stage_latencies
+
+
+def _trace(tmp_path):
+    ticks = count()
+    return MessageTrace(str(tmp_path / "trace.jsonl"), backend="fake", clock=lambda: float(next(ticks)))
+
+
+class TestMessageTrace:
+    def test_one_record_per_labeled_message(self, tmp_path):
+        trace = _trace(tmp_path)
+        trace.listed()                           # t=0
+        trace.mark(["m1", "m2"], "fetched")      # t=1
+        trace.mark(["m1", "m2"], "classify_queued")
+        trace.mark(["m1"], "classify_started")
+        trace.add_retries("m1", 2)
+        trace.mark(["m1"], "classified")
+        trace.finish(["m1"])
+        trace.close()  # m2 never got labeled
+
+        records = {r["id"]: r for r in read_trace(trace.path)}
+        assert set(records) == {"m1", "m2"}
+        m1 = records["m1"]
+        assert [m1[e] for e in EVENTS] == [0, 1, 2, 3, 4, 5]
+        assert m1["backend"] == "fake" and m1["retries"] == 2
+        assert "labeled" not in records["m2"]
+
+    def test_classify_batch_marks_llm_events(self, tmp_path):
+        backend = MagicMock(max_concurrency=2)
+        backend.chat.return_value = ChatResult("IMPORTANT", {})
+        trace = _trace(tmp_path)
+        emails = [{"id": f"m{i}", "from": "a@t.com", "subject": "s", "snippet": ""} for i in range(3)]
+
+        classify_batch(emails, backend=backend, trace=trace)
+        trace.close()
+
+        for record in read_trace(trace.path):
+            assert record["classify_queued"] <= record["classify_started"] < record["classified"]
+
+
+class TestAnalyze:
+    def test_stage_breakdown_and_slowest(self, tmp_path, capsys):
+        records = [
+            {"id": "fast", "listed": 0, "fetched": 1, "classify_queued": 1, "classify_started": 1,
+             "classified": 2, "labeled": 2},
+            {"id": "slow", "listed": 0, "fetched": 1, "classify_queued": 3, "classify_started": 4,
+             "classified": 94, "labeled": 95, "retries": 1},
+            {"id": "stopped", "listed": 0, "fetched": 2},
+        ]
+        assert stage_latencies(records[2]) == {"fetch": 2}
+
+        result = analyze(records, top=2)
+        assert result["messages"] == 3
+        assert result["stages_ms"]["fetch"]["count"] == 3
+        assert result["stages_ms"]["llm"]["max"] == 90000
+        assert [s["id"] for s in result["slowest"]] == ["slow", "fast"]
+        assert result["slowest"][0]["stages_ms"]["llm"] == 90000
+        assert result["slowest"][0]["retries"] == 1
+
+        path = tmp_path / "trace.jsonl"
+        path.write_text("".join(json.dumps(r) + "\n" for r in records))
+        assert main([str(path), "--top", "1"]) == 0
+        out = capsys.readouterr().out
+        assert "3 messages" in out and "slow" in out
@@ -0,0 +1,19 @@
+from perf_stats import percentile, summarize
+
+
+class TestPercentile:
+    def test_interpolates(self):
+        assert percentile([1, 2, 3, 4], 50) == 2.5
+        assert percentile([10], 99) == 10
+
+    def test_empty(self):
+        assert percentile([], 50) is None
+
+
+class TestSummarize:
+    def test_scaled_summary(self):
+        summary = summarize([3_000_000, 1_000_000, 2_000_000], scale=1e6)
+        assert summary == {"count": 3, "mean": 2.0, "p50": 2.0, "p95": 2.9, "p99": 3.0, "max": 3.0}
+
+    def test_empty(self):
+        assert summarize([]) == {"count": 0}
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from pipeline import Pipeline, Stage
+
+
+class TestPipeline:
+    def test_items_flow_through_all_stages(self):
+        results = []
+        lock = threading.Lock()
+
+        def collect(x):
+            with lock:
+                results.append(x)
+
+        pipeline = Pipeline([
+            Stage("double", lambda x: x * 2, workers=3),
+            Stage("inc", lambda x: x + 1, workers=2),
+            Stage("collect", collect),
+        ])
+        pipeline.run(range(50))
+
+        assert sorted(results) == [x * 2 + 1 for x in range(50)]
+        assert [s.processed for s in pipeline.stages] == [50, 50, 50]
+
+    def test_none_result_is_not_forwarded(self):
+        seen = []
+        pipeline = Pipeline([
+            Stage("filter", lambda x: x if x % 2 else None),
+            Stage("collect", seen.append),
+        ])
+        pipeline.run(range(6))
+        assert sorted(seen) == [1, 3, 5]
+
+    def test_bounded_queue_applies_backpressure(self):
+        fed = []
+        release = threading.Event()
+
+        def slow(x):
+            release.wait()
+
+        def source():
+            for i in range(20):
+                fed.append(i)
+                yield i
+
+        pipeline = Pipeline([Stage("slow", slow)], queue_size=2)
+        t = threading.Thread(target=pipeline.run, args=(source(),))
+        t.start()
+        time.sleep(0.1)
+        # One item in the worker, two queued, one blocked in put()
+        assert len(fed) <= 4
+        release.set()
+        t.join()
+        assert len(fed) == 20
+
+    def test_stop_skips_remaining_but_drains_final_stage(self):
+        stop = threading.Event()
+        classified = []
+        labeled = []
+
+        def classify(x):
+            classified.append(x)
+            if x == 0:
+                stop.set()
+            return x
+
+        pipeline = Pipeline(
+            [Stage("classify", classify), Stage("label", labeled.append, skip_on_stop=False)],
+            stop_event=stop,
+        )
+        pipeline.run(range(10))
+
+        assert classified[0] == 0
+        assert len(classified) < 10
+        assert labeled == classified
+
+    def test_stage_error_is_raised(self):
+        def boom(x):
+            if x == 3:
+                raise RuntimeError("boom")
+            return x
+
+        pipeline = Pipeline([Stage("boom", boom, workers=2), Stage("sink", lambda x: None)])
+        with pytest.raises(RuntimeError, match="boom"):
+            pipeline.run(range(100))
@@ -0,0 +1,85 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from preflight import Preflight, PreflightError, Step, run_steps
+
+
+def _sleep_then(seconds, value):
+    def fn(deps):
+        time.sleep(seconds)
+        return value
+    return fn
+
+
+class TestPreflight:
+    def test_independent_steps_run_concurrently(self):
+        preflight = Preflight([
+            Step("a", _sleep_then(0.2, 1)),
+            Step("b", _sleep_then(0.2, 2)),
+        ])
+        started = time.monotonic()
+        assert preflight.start().wait(timeout=2)
+        # Slowest step, not the sum
+        assert time.monotonic() - started < 0.35
+        assert preflight.results == {"a": 1, "b": 2}
+
+    def test_dependencies_get_results(self):
+        preflight = Preflight([
+            Step("gmail", _sleep_then(0.05, "service")),
+            Step("profile", lambda deps: deps["gmail"] + ":me", after=("gmail",)),
+        ])
+        assert preflight.start().wait(timeout=2)
+        assert preflight.results["profile"] == "service:me"
+
+    def test_failure_skips_dependents(self):
+        def fail(deps):
+            raise PreflightError("no token")
+
+        preflight = Preflight([
+            Step("gmail", fail),
+            Step("profile", lambda deps: "x", after=("gmail",), required=False),
+            Step("llm", _sleep_then(0, True)),
+        ])
+        assert not preflight.start().wait(timeout=2)
+        deadline = time.monotonic() + 2
+        while not preflight.finished() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert preflight.failures() == {"gmail": "no token"}
+        assert preflight.state["profile"] == "skipped"
+        assert preflight.state["llm"] == "ok"
+
+    def test_optional_step_does_not_block_ready(self):
+        release = threading.Event()
+        preflight = Preflight([
+            Step("llm", _sleep_then(0, True)),
+            Step("profile", lambda deps: release.wait(2), required=False),
+        ])
+        assert preflight.start().wait(timeout=1)
+        assert not preflight.finished()
+        release.set()
+
+    def test_cancel_discards_blocked_step(self):
+        release = threading.Event()
+        preflight = Preflight([Step("gmail", lambda deps: release.wait(2) and "service")]).start()
+        time.sleep(0.05)
+        preflight.cancel()
+
+        assert not preflight.wait(timeout=1)
+        assert preflight.state["gmail"] == "cancelled"
+        release.set()
+        time.sleep(0.05)
+        assert preflight.state["gmail"] == "cancelled"
+        assert "gmail" not in preflight.results
+
+    def test_run_steps_reports_llm_error(self):
+        backend = MagicMock()
+        backend.check_available.return_value = (False, "Cannot connect to Ollama")
+        service = MagicMock()
+        service.users().getProfile().execute.return_value = {"emailAddress": "me@t.com"}
+
+        preflight = Preflight(run_steps(backend, service)).start()
+        preflight.wait(timeout=2)
+
+        assert preflight.failures() == {"llm": "Cannot connect to Ollama"}
+        assert preflight.results["gmail"] is service
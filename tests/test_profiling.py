@@ -0,0 +1,70 @@
+import json
+import os
+import pstats
+import threading
+
+import pytest
+
+from profiling import RunProfiler, StackSampler, _CProfileCollector
+
+
+def _busy(n=200000):
+    return sum(i * i for i in range(n))
+
+
+def _run_workers(n=2):
+    threads = [threading.Thread(target=_busy, name=f"fetch-{i}") for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class TestRunProfiler:
+    def test_cprofile_covers_worker_threads(self, tmp_path):
+        profiler = RunProfiler("cprofile", out_dir=str(tmp_path)).start()
+        _run_workers()
+        out = profiler.finish()
+
+        stats = pstats.Stats(os.path.join(out, "cpu.prof"))
+        calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+        assert calls["_busy"] == 2
+        assert "_busy" in (tmp_path / "cpu.txt").read_text()
+
+    def test_sampler_writes_folded_stacks(self, tmp_path):
+        profiler = RunProfiler("sample", out_dir=str(tmp_path), interval=0.001).start()
+        _run_workers()
+        profiler.finish()
+
+        folded = (tmp_path / "samples.folded").read_text().splitlines()
+        assert any(line.startswith("fetch;") and "_busy" in line for line in folded)
+        meta = json.loads((tmp_path / "profile.json").read_text())
+        assert meta["mode"] == "sample"
+        assert meta["files"] == ["samples.folded", "samples.txt"]
+
+    def test_memory_marks(self, tmp_path):
+        profiler = RunProfiler(memory=True, out_dir=str(tmp_path)).start()
+        kept = [str(i) * 10 for i in range(20000)]
+        profiler.mark("built")
+        profiler.finish()
+
+        marks = json.loads((tmp_path / "memory.json").read_text())
+        assert [m["mark"] for m in marks] == ["built", "end"]
+        assert marks[0]["top_growth"][0]["size_kb"] > 100
+        assert len(kept) == 20000
+
+    def test_disabled_and_unknown_modes(self):
+        assert not RunProfiler()
+        with pytest.raises(ValueError, match="Unknown profile mode"):
+            RunProfiler("perf")
+
+    def test_cprofile_without_stats_writes_nothing(self, tmp_path):
+        assert _CProfileCollector().write(str(tmp_path)) == []
+        assert not (tmp_path / "cpu.prof").exists()
+
+    def test_sampler_top_functions(self):
+        sampler = StackSampler()
+        sampler.stacks.update({"fetch;run;fetch_batch": 3, "classify;run;chat": 5})
+        top = {fn: (own, total) for fn, own, total in sampler.top()}
+        assert top["run"] == (0, 8)
+        assert top["chat"] == (5, 5)
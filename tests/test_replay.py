@@ -0,0 +1,211 @@
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import classifier_engine
+import cli
+import llm_classifier
+import state
+from benchmarks.fake_gmail import FakeGmailService
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.mailbox import Mailbox
+from gmail_client import GmailClient
+from llm_backends import ChatResult
+from state import RunState
+from replay import (
+    Archive,
+    Recorder,
+    RecordingBackend,
+    RecordingGmailService,
+    ReplayBackend,
+    ReplayError,
+    ReplayGmailService,
+    _prompt_key,
+    isolated_output,
+    run_archive_path,
+)
+
+
+@pytest.fixture
+def cli_stubs(monkeypatch):
+    backend = MagicMock(max_concurrency=2)
+    backend.describe.return_value = "fake"
+    backend.check_available.return_value = (True, "ok")
+    engine = MagicMock(status="completed", last_summary={})
+    engine.join.return_value = True
+    monkeypatch.setattr(cli, "create_backend", MagicMock(return_value=backend))
+    monkeypatch.setattr(cli, "set_backend", MagicMock())
+    monkeypatch.setattr(cli, "ClassifierEngine", MagicMock(return_value=engine))
+    return engine
+
+
+def _cli(run, *argv):
+    out = io.StringIO()
+    code = run(cli.build_parser().parse_args(["--json", *argv]), cli.Reporter(True, out), threading.Event(),
+               service=MagicMock())
+    return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def _record_client_session(path):
+    backend = MagicMock(max_concurrency=3)
+    backend.describe.return_value = "fake"
+    backend.chat.side_effect = [ChatResult("UNIMPORTANT", {"eval_count": 2}), RuntimeError("boom")]
+    recorder = Recorder(path, backend)
+    client = GmailClient(RecordingGmailService(FakeGmailService(Mailbox(60)), recorder))
+    ids = client.fetch_message_ids("is:unread")
+    details = client.fetch_message_details_batch(ids[:30])
+    client.ensure_labels_exist()
+    client.apply_label_batch(ids[:5], client.get_label_id("AI/Important"))
+    llm = RecordingBackend(backend, recorder)
+    assert llm.chat("sys", "a").content == "UNIMPORTANT"
+    with pytest.raises(RuntimeError):
+        llm.chat("sys", "b")
+    recorder.close()
+    return ids, details
+
+
+class TestRecordReplay:
+    def test_gmail_and_llm_round_trip(self, tmp_path):
+        path = str(tmp_path / "run.replay.gz")
+        ids, details = _record_client_session(path)
+
+        archive = Archive.load(path)
+        assert archive.header["concurrency"] == 3
+        client = GmailClient(ReplayGmailService(archive, speed=0))
+        assert client.fetch_message_ids("is:unread") == ids
+        assert client.fetch_message_details_batch(ids[:30]) == details
+        client.ensure_labels_exist()
+        client.apply_label_batch(ids[:5], client.get_label_id("AI/Important"))
+
+        backend = ReplayBackend(archive, speed=0)
+        assert backend.max_concurrency == 3
+        result = backend.chat("sys", "a")
+        assert (result.content, result.usage) == ("UNIMPORTANT", {"eval_count": 2})
+        with pytest.raises(ReplayError, match="boom"):
+            backend.chat("sys", "b")
+        assert archive.misses == 0
+
+        with pytest.raises(ReplayError):
+            backend.chat("sys", "never recorded")
+        assert archive.misses == 1
+
+    def test_timing_is_scaled(self, tmp_path):
+        path = str(tmp_path / "slow.replay.gz")
+        recorder = Recorder(path)
+        recorder.record("llm", _prompt_key("sys", "a"), 0.3, response={"content": "IMPORTANT"})
+        recorder.close()
+        archive = Archive.load(path)
+
+        for speed, low, high in ((10, 0.025, 0.2), (0, 0, 0.02)):
+            started = time.perf_counter()
+            assert ReplayBackend(archive, speed=speed).chat("sys", "a").content == "IMPORTANT"
+            assert low <= time.perf_counter() - started < high
+
+    def test_not_an_archive(self, tmp_path):
+        path = tmp_path / "other.gz"
+        with gzip.open(path, "wt") as f:
+            f.write(json.dumps({"format": "something-else"}) + "\n")
+        with pytest.raises(ValueError, match="not a replay archive"):
+            Archive.load(str(path))
+
+    def test_cli_replays_recorded_run(self, tmp_path):
+        archive = str(tmp_path / "run.replay.gz")
+        drifted = str(tmp_path / "drifted.replay.gz")
+        previous_backend = llm_classifier._backend
+
+        def run(workdir, *argv, service=None):
+            out = io.StringIO()
+            os.makedirs(workdir)
+            with isolated_output(workdir):
+                code = cli.run_once(
+                    cli.build_parser().parse_args(["--json", *argv]),
+                    cli.Reporter(True, out),
+                    threading.Event(),
+                    service=service,
+                )
+            return code, {e["event"]: e for e in map(json.loads, out.getvalue().splitlines())}
+
+        try:
+            with FakeOllamaServer() as server:
+                code, recorded = run(
+                    str(tmp_path / "record"), "--llm-url", server.url, "--record", archive,
+                    service=FakeGmailService(Mailbox(150)),
+                )
+            assert code == cli.EXIT_OK
+            code, replayed = run(str(tmp_path / "replay"), "--replay", archive, "--replay-speed", "0")
+            assert code == cli.EXIT_OK
+
+            # Drop three LLM responses: the run completes, but the replay must fail
+            with gzip.open(archive, "rt") as src, gzip.open(drifted, "wt") as dst:
+                dropped = 0
+                for line in src:
+                    if dropped < 3 and '"kind":"llm"' in line:
+                        dropped += 1
+                        continue
+                    dst.write(line)
+            code, mismatched = run(str(tmp_path / "drifted"), "--replay", drifted, "--replay-speed", "0")
+        finally:
+            llm_classifier._backend = previous_backend
+
+        assert recorded["recorded"]["records"] > 150
+        assert "replay of" in replayed["run_started"]["backend"]
+        for key in ("status", "total", "important", "low_priority"):
+            assert replayed["run_finished"][key] == recorded["run_finished"][key]
+        assert recorded["run_finished"]["total"] == 150
+        assert replayed["run_finished"]["misses"] == 0
+
+        assert code == cli.EXIT_ERROR
+        # The fallback verdicts then ask for label calls that were never recorded either
+        misses = mismatched["run_finished"]["misses"]
+        assert misses >= 3
+        assert mismatched["error"]["message"] == f"{misses} requests had no recorded response"
+
+    def test_daemon_records_one_archive_per_run(self, tmp_path, cli_stubs):
+        path = str(tmp_path / "run.replay.gz")
+        code, events = _cli(cli.run_daemon, "--daemon", "--interval", "0", "--max-runs", "2", "--record", path)
+
+        paths = [e["path"] for e in events if e["event"] == "recorded"]
+        assert code == cli.EXIT_OK and len(set(paths)) == 2
+        assert all(os.path.basename(p).startswith("run-") and p.endswith(".replay.gz") for p in paths)
+        assert all(Archive.load(p).header["backend"] == "fake" for p in paths)
+        assert run_archive_path(paths[0]) != paths[0]
+
+    def test_record_failures(self, tmp_path, cli_stubs):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        code, events = _cli(cli.run_once, "--record", str(blocker / "run.replay.gz"))
+        assert code == cli.EXIT_ERROR
+        assert events[-1]["event"] == "error" and "Cannot record" in events[-1]["message"]
+
+        # An engine crash still leaves a complete, loadable archive
+        path = str(tmp_path / "crash.replay.gz")
+        cli_stubs.start.side_effect = RuntimeError("boom")
+        with pytest.raises(RuntimeError):
+            _cli(cli.run_once, "--record", path)
+        assert len(Archive.load(path)) == 0
+
+    def test_replay_leaves_real_run_files_alone(self, tmp_path, tmp_checkpoint, cli_stubs, monkeypatch):
+        history = str(tmp_path / "run_history.jsonl")
+        monkeypatch.setattr(classifier_engine, "RUN_HISTORY_FILE", history)
+        RunState(all_message_ids=["a", "b"], processed={"a": "important"}).save()
+        seen = {}
+
+        def engine(**kwargs):
+            seen["paths"] = (state.CHECKPOINT_FILE, classifier_engine.RUN_HISTORY_FILE)
+            return cli_stubs
+
+        monkeypatch.setattr(cli, "ClassifierEngine", engine)
+        path = str(tmp_path / "run.replay.gz")
+        Recorder(path).close()
+        code, _ = _cli(cli.run_once, "--replay", path, "--replay-speed", "0")
+
+        assert code == cli.EXIT_OK
+        assert tmp_checkpoint not in seen["paths"] and history not in seen["paths"]
+        assert (state.CHECKPOINT_FILE, classifier_engine.RUN_HISTORY_FILE) == (tmp_checkpoint, history)
+        assert RunState.load().processed == {"a": "important"}
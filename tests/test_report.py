@@ -0,0 +1,72 @@
+import csv
+import json
+import os
+
+from report import ReportWriter
+
+
+def _info(i, subject=None):
+    return {"date": "2025-01-01", "from": f"s{i}@t.com", "subject": subject or f"Subject {i}"}
+
+
+class TestReportWriter:
+    def test_small_report_is_inlined(self, tmp_path):
+        path = str(tmp_path / "report.html")
+        writer = ReportWriter(path, page_size=10, formats=["html"])
+        writer.add("m1", _info(1, "<b>Hi</b> & bye"), "important")
+        writer.add("m2", _info(2), "low_priority")
+        writer.add("m3", _info(3), "unknown")
+        files = writer.close({"important": 1, "low_priority": 1}, 2)
+
+        assert files == [path]
+        html = open(path, encoding="utf-8").read()
+        assert "<strong>Important:</strong> 1" in html
+        assert "&lt;b&gt;Hi&lt;/b&gt; &amp; bye" in html
+        assert "Subject 3" in html  # unclassified rows go under low priority
+        assert not os.path.exists(tmp_path / "report_pages")
+
+    def test_large_sections_are_paged(self, tmp_path):
+        path = str(tmp_path / "report.html")
+        writer = ReportWriter(path, page_size=2, formats=["html"])
+        for i in range(5):
+            writer.add(f"m{i}", _info(i), "important")
+        writer.add("x", _info(9), "low_priority")
+        writer.close({"important": 5, "low_priority": 1}, 6)
+
+        index = open(path, encoding="utf-8").read()
+        assert "Subject 0" not in index
+        assert 'href="report_pages/important-0003.html"' in index
+        assert "Subject 9" in index  # the small section stays inline
+        pages = sorted(os.listdir(tmp_path / "report_pages"))
+        assert pages == ["important-0001.html", "important-0002.html", "important-0003.html"]
+        middle = (tmp_path / "report_pages" / "important-0002.html").read_text(encoding="utf-8")
+        assert "Subject 2" in middle and "Subject 3" in middle
+        assert 'href="important-0001.html"' in middle
+        assert 'href="important-0003.html"' in middle
+        last = (tmp_path / "report_pages" / "important-0003.html").read_text(encoding="utf-8")
+        assert "Next" not in last
+
+    def test_stale_pages_are_removed(self, tmp_path):
+        path = str(tmp_path / "report.html")
+        writer = ReportWriter(path, page_size=1, formats=["html"])
+        for i in range(3):
+            writer.add(f"m{i}", _info(i), "important")
+        writer.close({"important": 3, "low_priority": 0}, 3)
+
+        writer = ReportWriter(path, page_size=1, formats=["html"])
+        writer.add("m0", _info(0), "important")
+        writer.close({"important": 1, "low_priority": 0}, 1)
+        assert not os.path.exists(tmp_path / "report_pages")
+
+    def test_csv_and_jsonl_exports(self, tmp_path):
+        path = str(tmp_path / "report.html")
+        writer = ReportWriter(path, formats=["html", "csv", "jsonl"])
+        writer.add("m1", _info(1, 'Quote "me", please'), "important")
+        files = writer.close({"important": 1, "low_priority": 0}, 1)
+
+        assert files == [path, str(tmp_path / "report.csv"), str(tmp_path / "report.jsonl")]
+        with open(tmp_path / "report.csv", newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        assert rows[1] == ["m1", "important", "2025-01-01", "s1@t.com", 'Quote "me", please']
+        record = json.loads((tmp_path / "report.jsonl").read_text(encoding="utf-8"))
+        assert record["id"] == "m1" and record["classification"] == "important"
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from run_history import RunHistory
+
+
+def _entry(i, query="is:unread", status="completed"):
+    return {
+        "date": f"2025-01-{i + 1:02d} 10:00:00",
+        "query": query,
+        "status": status,
+        "total": 10,
+        "important": 3,
+        "low_priority": 7,
+        "duration_seconds": 5.0,
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    return RunHistory(str(tmp_path / "run_history.jsonl"))
+
+
+class TestRunHistory:
+    def test_append_writes_one_line_per_run(self, history):
+        history.append(_entry(0))
+        history.append(_entry(1))
+        with open(history.path) as f:
+            lines = f.read().splitlines()
+        assert [json.loads(l)["date"] for l in lines] == [
+            "2025-01-01 10:00:00",
+            "2025-01-02 10:00:00",
+        ]
+
+    def test_read_recent_pages_newest_first(self, history, monkeypatch):
+        monkeypatch.setattr("run_history._BLOCK", 64)  # force lines across block edges
+        for i in range(7):
+            history.append(_entry(i))
+
+        page, cursor = history.read_recent(3)
+        assert [e["date"][8:10] for e in page] == ["07", "06", "05"]
+        page, cursor = history.read_recent(3, before=cursor)
+        assert [e["date"][8:10] for e in page] == ["04", "03", "02"]
+        page, cursor = history.read_recent(3, before=cursor)
+        assert [e["date"][8:10] for e in page] == ["01"]
+        assert cursor == 0
+
+    def test_read_recent_empty(self, history):
+        assert history.read_recent(10) == ([], 0)
+
+    def test_summary_aggregates(self, history, monkeypatch):
+        monkeypatch.setattr("run_history.RUN_HISTORY_WINDOW", 2)
+        history.append(_entry(0, query="a"))
+        history.append(_entry(1, query="b", status="stopped"))
+        history.append({**_entry(2, query="b"), "total": 40, "duration_seconds": 5.0})
+
+        summary = history.summary()
+        assert summary["runs"] == 3
+        assert summary["emails"] == 60
+        assert summary["statuses"] == {"completed": 2, "stopped": 1}
+        assert summary["queries"]["b"]["runs"] == 2
+        assert summary["queries"]["b"]["emails"] == 50
+        assert summary["emails_per_second"] == 4.0
+        assert summary["recent_emails_per_second"] == 5.0  # last two runs only
+
+    def test_resumed_runs_count_only_their_own_emails(self, history):
+        # One 10-message mailbox: stopped after 4, then resumed to the end
+        history.append({**_entry(0, status="stopped"), "total": 4, "classified": 4, "duration_seconds": 2.0})
+        history.append({**_entry(1), "total": 10, "classified": 6, "duration_seconds": 3.0})
+
+        summary = history.summary()
+        assert summary["emails"] == 10
+        assert summary["queries"]["is:unread"]["emails"] == 10
+        assert summary["emails_per_second"] == 2.0
+        assert summary["recent_emails_per_second"] == 2.0
+
+    def test_stale_index_is_rebuilt(self, history):
+        history.append(_entry(0))
+        # An append whose index write never happened
+        with open(history.path, "a") as f:
+            f.write(json.dumps(_entry(1)) + "\n")
+        assert history.summary()["runs"] == 2
+
+    def test_migrates_legacy_json(self, history, tmp_path):
+        legacy = tmp_path / "run_history.json"
+        legacy.write_text(json.dumps([_entry(0), _entry(1)]))
+
+        history.append(_entry(2))
+
+        page, _ = history.read_recent(10)
+        assert [e["date"][8:10] for e in page] == ["03", "02", "01"]
+        assert history.summary()["runs"] == 3
+        assert not legacy.exists()
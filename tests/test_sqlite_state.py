@@ -0,0 +1,78 @@
+import pytest
+
+from sqlite_state import SqliteRunState
+from state import RunState, get_state_class
+
+
+@pytest.fixture
+def tmp_state_db(tmp_path, monkeypatch):
+    db = str(tmp_path / "state.sqlite3")
+    monkeypatch.setattr("sqlite_state.STATE_DB_FILE", db)
+    return db
+
+
+@pytest.fixture
+def state(tmp_state_db):
+    s = SqliteRunState()
+    s.set_message_ids(["a", "b", "c", "d"])
+    yield s
+    s.close()
+
+
+class TestSqliteRunState:
+    def test_unprocessed_in_listing_order(self, state):
+        state.record_verdicts({"b": "important"})
+        assert list(state.unprocessed_ids()) == ["a", "c", "d"]
+
+    def test_record_verdicts_counts_new_messages_once(self, state):
+        assert state.record_verdicts({"a": "important", "b": "low_priority"}) == 2
+        assert state.record_verdicts({"a": "important"}) == 2
+        assert state.total() == 4
+
+    def test_classified_unlabeled_and_counts(self, state):
+        state.record_verdicts({"a": "important", "b": "low_priority", "c": "important"})
+        state.mark_labeled(["a"])
+        assert state.classified_unlabeled("important") == ["c"]
+        assert state.classified_unlabeled("low_priority") == ["b"]
+        assert state.counts() == {"important": 2, "low_priority": 1}
+        assert state.verdict("b") == "low_priority"
+        assert state.verdict("d") is None
+
+    def test_save_and_load_round_trip(self, state):
+        state.record_verdicts({"a": "important"})
+        state.mark_labeled(["a"])
+        state.save()
+        state.close()
+
+        loaded = SqliteRunState.load()
+        assert loaded.processed_count() == 1
+        assert list(loaded.unprocessed_ids()) == ["b", "c", "d"]
+        assert loaded.classified_unlabeled("important") == []
+        loaded.close()
+
+    def test_load_and_clear(self, tmp_state_db):
+        assert SqliteRunState.load() is None
+        s = SqliteRunState()
+        s.set_message_ids(["a"])
+        s.close()
+        SqliteRunState.clear()
+        assert SqliteRunState.load() is None
+
+    def test_unprocessed_pages_while_updating(self, tmp_state_db, monkeypatch):
+        monkeypatch.setattr("sqlite_state._PAGE", 2)
+        s = SqliteRunState()
+        s.set_message_ids([f"m{i}" for i in range(7)])
+        seen = []
+        for mid in s.unprocessed_ids():
+            seen.append(mid)
+            s.record_verdicts({mid: "important"})
+        assert seen == [f"m{i}" for i in range(7)]
+        s.close()
+
+
+class TestGetStateClass:
+    def test_backends(self):
+        assert get_state_class("json") is RunState
+        assert get_state_class("sqlite") is SqliteRunState
+        with pytest.raises(ValueError):
+            get_state_class("redis")
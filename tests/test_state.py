@@ -1,9 +1,11 @@
 import json
 import os
+import threading
+import time
 
 import pytest
 
-from state import RunState
+from state import CheckpointWriter, RunState
 
 
 class TestRunStateInit:
@@ -84,3 +86,170 @@ class TestRunStateClear:
 
     def test_clear_no_op_when_missing(self, tmp_checkpoint):
         RunState.clear()  # should not raise
+
+
+class TestRunStateJournal:
+    def test_save_appends_only_new_verdicts(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a", "b", "c"])
+        state.save()
+        snapshot_mtime = os.stat(tmp_checkpoint).st_mtime_ns
+
+        state.record_verdicts({"a": "important"})
+        state.save()
+        state.record_verdicts({"b": "low_priority"})
+        state.mark_labeled(["a"])
+        state.save()
+
+        with open(tmp_checkpoint + ".journal") as f:
+            lines = [json.loads(line) for line in f]
+        assert lines == [
+            {"processed": {"a": "important"}},
+            {"processed": {"b": "low_priority"}, "labeled": ["a"]},
+        ]
+        assert os.stat(tmp_checkpoint).st_mtime_ns == snapshot_mtime
+
+    def test_failed_save_keeps_changes(self, tmp_checkpoint, monkeypatch):
+        state = RunState(all_message_ids=["a", "b"])
+        state.save()
+        state.record_verdicts({"a": "important"})
+        state.mark_labeled(["a"])
+
+        def disk_full(record):
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr(state, "_append_journal", disk_full)
+        with pytest.raises(OSError):
+            state.save()
+        monkeypatch.delattr(state, "_append_journal")
+        state.record_verdicts({"b": "low_priority"})
+        state.save()
+
+        loaded = RunState.load()
+        assert loaded.processed == {"a": "important", "b": "low_priority"}
+        assert loaded.labeled == {"a"}
+
+    def test_save_without_changes_writes_nothing(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a"])
+        state.save()
+        state.save()
+        assert not os.path.exists(tmp_checkpoint + ".journal")
+
+    def test_load_replays_journal(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a", "b"])
+        state.save()
+        state.record_verdicts({"a": "important", "b": "low_priority"})
+        state.mark_labeled(["b"])
+        state.save()
+
+        loaded = RunState.load()
+        assert loaded.processed == {"a": "important", "b": "low_priority"}
+        assert loaded.labeled == {"b"}
+
+    def test_compaction_folds_journal_into_snapshot(self, tmp_checkpoint, monkeypatch):
+        monkeypatch.setattr("state.CHECKPOINT_COMPACT_EVERY", 2)
+        state = RunState(all_message_ids=["a", "b", "c"])
+        state.save()
+        for mid in ("a", "b", "c"):
+            state.record_verdicts({mid: "important"})
+            state.save()
+
+        # Third save hit the threshold and rewrote the snapshot
+        assert not os.path.exists(tmp_checkpoint + ".journal")
+        with open(tmp_checkpoint) as f:
+            assert json.load(f)["processed"] == {"a": "important", "b": "important", "c": "important"}
+
+    def test_torn_journal_record_is_ignored(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a", "b"])
+        state.save()
+        state.record_verdicts({"a": "important"})
+        state.save()
+        with open(tmp_checkpoint + ".journal", "a") as f:
+            f.write('{"processed": {"b": "imp')
+
+        loaded = RunState.load()
+        assert loaded.processed == {"a": "important"}
+
+        loaded.record_verdicts({"b": "low_priority"})
+        loaded.save()
+        assert RunState.load().processed == {"a": "important", "b": "low_priority"}
+
+    def test_clear_removes_journal(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a"])
+        state.save()
+        state.record_verdicts({"a": "important"})
+        state.save()
+        RunState.clear()
+        assert not os.path.exists(tmp_checkpoint + ".journal")
+
+
+class TestCheckpointWriter:
+    def test_saves_after_interval_changes(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a", "b", "c"])
+        writer = CheckpointWriter(state, interval=2, max_seconds=0)
+        state.record_verdicts({"a": "important"})
+        writer.note()
+        assert writer.saves == 0
+        state.record_verdicts({"b": "low_priority"})
+        writer.note()
+        deadline = time.monotonic() + 2
+        while writer.saves == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.close()
+        assert RunState.load().processed == {"a": "important", "b": "low_priority"}
+
+    def test_saves_after_max_seconds(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a"])
+        writer = CheckpointWriter(state, interval=100, max_seconds=0.05)
+        state.record_verdicts({"a": "important"})
+        writer.note()
+        deadline = time.monotonic() + 2
+        while writer.saves == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.saves == 1
+        assert RunState.load().processed == {"a": "important"}
+        writer.close()
+
+    def test_max_seconds_counts_from_first_unsaved_change(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a"])
+        writer = CheckpointWriter(state, interval=100, max_seconds=0.2)
+        time.sleep(0.3)  # idle for longer than max_seconds
+        writer.note()
+        time.sleep(0.05)
+        assert writer.saves == 0
+        deadline = time.monotonic() + 2
+        while writer.saves == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.saves == 1
+        writer.close()
+
+    def test_close_flushes_pending_changes(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a"])
+        writer = CheckpointWriter(state, interval=100, max_seconds=0)
+        state.record_verdicts({"a": "low_priority"})
+        state.mark_labeled(["a"])
+        writer.note(2)
+        writer.close()
+        loaded = RunState.load()
+        assert loaded.processed == {"a": "low_priority"}
+        assert loaded.labeled == {"a"}
+
+    def test_requests_during_slow_save_are_coalesced(self, tmp_checkpoint):
+        state = RunState(all_message_ids=["a", "b", "c", "d"])
+        release = threading.Event()
+        real_save = state.save
+
+        def slow_save():
+            release.wait(2)
+            real_save()
+
+        state.save = slow_save
+        writer = CheckpointWriter(state, interval=1, max_seconds=0)
+        for mid in "abcd":
+            state.record_verdicts({mid: "important"})
+            writer.note()
+        release.set()
+        writer.close()
+        # One save in flight, one follow-up covering the rest, plus close()
+        assert writer.saves <= 3
+        assert writer.coalesced >= 1
+        assert RunState.load().processed_count() == 4